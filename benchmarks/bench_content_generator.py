@@ -0,0 +1,52 @@
+"""
+قياس زمن توليد كل قسم في AcademicContentGenerator
+
+التشغيل من جذر المشروع:
+    python benchmarks/bench_content_generator.py --number 20000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.content_generator import AcademicContentGenerator, get_registered_sections
+
+SAMPLE_STUDY = {
+    'studyType': 'master',
+    'fieldOfStudy': 'education',
+    'mainTopic': 'التعلم الإلكتروني في التعليم العالي',
+    'problemDescription': 'ضعف تفاعل الطلاب مع منصات التعلم الإلكتروني',
+    'keywords': 'التعلم الإلكتروني، التفاعل، التعليم العالي'
+}
+
+
+def bench_sections(number: int, repeat: int):
+    """إرجاع أفضل زمن (بالميكروثانية) لتوليد كل قسم مسجل"""
+    generator = AcademicContentGenerator()
+    results = {}
+    for section in get_registered_sections():
+        timings = timeit.repeat(
+            lambda: generator.generate_content(section, SAMPLE_STUDY),
+            number=number,
+            repeat=repeat
+        )
+        results[section] = min(timings) / number * 1e6
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=20000, help='عدد الاستدعاءات في كل تكرار')
+    parser.add_argument('--repeat', type=int, default=5, help='عدد التكرارات (يؤخذ الأفضل)')
+    args = parser.parse_args()
+    
+    results = bench_sections(args.number, args.repeat)
+    print(f"{'section':<14} {'us/call':>10}")
+    for section, micros in results.items():
+        print(f"{section:<14} {micros:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+قياس معدل الكتابة في قاعدة البيانات مع عدد من الكتّاب المتزامنين
+
+يقارن إعدادات SQLite الافتراضية القديمة (rollback journal و synchronous=FULL)
+بالإعدادات الحالية في src/config.py (WAL و synchronous=NORMAL و busy_timeout)
+
+التشغيل من جذر المشروع:
+    python benchmarks/bench_db_writes.py --writers 1 4 16 --requests 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SAMPLE_STUDY = {
+    'studyType': 'master',
+    'fieldOfStudy': 'education',
+    'mainTopic': 'التعلم الإلكتروني في التعليم العالي',
+    'problemDescription': 'ضعف تفاعل الطلاب مع منصات التعلم الإلكتروني'
+}
+
+SECTIONS = ('introduction', 'literature', 'methodology', 'results', 'discussion', 'conclusion')
+
+# متغيرات البيئة لكل وضع - القيمة الفارغة تعني عدم تنفيذ PRAGMA (الإعداد الافتراضي لـ SQLite)
+MODES = {
+    'legacy': {
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_BUSY_TIMEOUT_MS': '',
+        'SQLITE_CACHE_SIZE': '',
+        'SQLITE_MMAP_SIZE': ''
+    },
+    'tuned': {}
+}
+
+
+def run_writers(writers: int, requests: int):
+    """تشغيل الكتّاب على التطبيق الحقيقي وإرجاع (الزمن، عدد الطلبات الناجحة، عدد الأخطاء)"""
+    from src.main import app
+
+    client = app.test_client()
+    study_ids = []
+    for _ in range(writers):
+        response = client.post('/api/generate', json={'section': 'setup', 'data': dict(SAMPLE_STUDY)})
+        study_ids.append(response.get_json()['study_id'])
+
+    results = {'ok': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def writer(study_id):
+        local_client = app.test_client()
+        data = dict(SAMPLE_STUDY, study_id=study_id)
+        for index in range(requests):
+            response = local_client.post('/api/generate', json={
+                'section': SECTIONS[index % len(SECTIONS)],
+                'data': data
+            })
+            with lock:
+                results['ok' if response.status_code == 200 else 'errors'] += 1
+
+    threads = [threading.Thread(target=writer, args=(study_id,)) for study_id in study_ids]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, results['ok'], results['errors']
+
+
+def run_mode(mode: str, writers: int, requests: int):
+    """تشغيل وضع واحد في عملية منفصلة بقاعدة بيانات جديدة"""
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, **MODES[mode])
+        env['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), '--worker', str(writers), str(requests)],
+            env=env, cwd=ROOT
+        )
+        return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--writers', type=int, nargs='+', default=[1, 4, 16], help='عدد الكتّاب المتزامنين')
+    parser.add_argument('--requests', type=int, default=50, help='عدد الطلبات لكل كاتب')
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--worker', type=int, nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        elapsed, ok, errors = run_writers(*args.worker)
+        print(json.dumps({'seconds': elapsed, 'ok': ok, 'errors': errors}))
+        return
+
+    print(f"{'mode':>8} {'writers':>8} {'writes/s':>10} {'errors':>8}")
+    for writers in args.writers:
+        for mode in args.modes:
+            result = run_mode(mode, writers, args.requests)
+            print(f"{mode:>8} {writers:>8} {result['ok'] / result['seconds']:>10.1f} {result['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
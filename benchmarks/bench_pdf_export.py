@@ -0,0 +1,62 @@
+"""
+قياس زمن بناء ملف PDF لدراسة كاملة بأحجام أقسام مختلفة
+
+التشغيل من جذر المشروع:
+    python benchmarks/bench_pdf_export.py --sizes 1 10 50
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.content_generator import AcademicContentGenerator
+from src.services.pdf_exporter import SECTION_TITLES, render_study_pdf
+
+SAMPLE_STUDY = {
+    'studyType': 'master',
+    'fieldOfStudy': 'education',
+    'mainTopic': 'التعلم الإلكتروني في التعليم العالي',
+    'problemDescription': 'ضعف تفاعل الطلاب مع منصات التعلم الإلكتروني'
+}
+
+
+def build_study(size: int):
+    """دراسة يتكرر فيها محتوى كل قسم عدد size من المرات"""
+    generator = AcademicContentGenerator()
+    study = {}
+    for section in ['title', 'abstract'] + list(SECTION_TITLES):
+        study[f'{section}_content'] = ''.join(
+            generator.generate_content(section, SAMPLE_STUDY, seed=seed) for seed in range(size)
+        )
+    return study
+
+
+def bench_export(size: int, repeat: int):
+    """أفضل زمن بناء (بالمللي ثانية) وحجم الملف الناتج"""
+    study = build_study(size)
+    sections = list(SECTION_TITLES)
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        pdf = render_study_pdf(study, sections)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, len(pdf)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50], help='عدد مرات تكرار محتوى كل قسم')
+    parser.add_argument('--repeat', type=int, default=3, help='عدد التكرارات (يؤخذ الأفضل)')
+    args = parser.parse_args()
+    
+    print(f"{'size':>6} {'ms':>10} {'bytes':>10}")
+    for size in args.sizes:
+        millis, pdf_size = bench_export(size, args.repeat)
+        print(f"{size:>6} {millis:>10.1f} {pdf_size:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""
+مولد حمل يعيد تشغيل مسار المعالج الكامل (writer.html) على خادم محلي
+
+كل مستخدم افتراضي ينفذ: setup لإنشاء الدراسة، ثم توليد كل قسم عبر /api/generate،
+ثم /api/export، مع قراءات عرضية من /api/studies و /api/study/<id>.
+يعتمد على المكتبة القياسية فقط (asyncio مع اتصال HTTP/1.1 دائم لكل مستخدم).
+
+التشغيل من جذر المشروع (بعد تشغيل الخادم مثلاً: python src/serve.py):
+    python benchmarks/loadgen.py --url http://127.0.0.1:5000 --users 20 --ramp-up 10 --duration 60
+    python benchmarks/loadgen.py --users 5 --iterations 2 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+SAMPLE_STUDY = {
+    'studyType': 'master',
+    'fieldOfStudy': 'education',
+    'mainTopic': 'التعلم الإلكتروني في التعليم العالي',
+    'problemDescription': 'ضعف تفاعل الطلاب مع منصات التعلم الإلكتروني',
+    'keywords': 'التعلم الإلكتروني، التفاعل، التعليم العالي'
+}
+
+# ترتيب الأقسام كما في writer.html
+SECTIONS = ('title', 'abstract', 'introduction', 'literature', 'methodology',
+            'results', 'discussion', 'conclusion', 'references')
+
+# رسائل أخطاء SQLite الناتجة عن التنافس على الكتابة
+LOCK_ERRORS = (b'database is locked', b'database table is locked', b'SQLITE_BUSY')
+
+
+class HttpError(Exception):
+    pass
+
+
+class Connection:
+    """اتصال HTTP/1.1 دائم (keep-alive) يعاد فتحه تلقائياً عند إغلاقه من الخادم"""
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        head = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', 'Connection: keep-alive']
+        if payload is not None:
+            head += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+        data = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+        # إعادة المحاولة مرة واحدة إذا أغلق الخادم اتصالاً خاملاً
+        for attempt in range(2):
+            reused = self.writer is not None
+            try:
+                if not reused:
+                    self.reader, self.writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), self.timeout)
+                self.writer.write(data)
+                await self.writer.drain()
+                return await asyncio.wait_for(self._read_response(), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError, HttpError):
+                await self.close()
+                if not reused or attempt:
+                    raise
+            except BaseException:
+                await self.close()
+                raise
+
+    async def _read_response(self):
+        status_line = await self.reader.readuntil(b'\r\n')
+        parts = status_line.split(b' ', 2)
+        if len(parts) < 2 or not parts[0].startswith(b'HTTP/'):
+            raise HttpError(f'bad status line: {status_line!r}')
+        status = int(parts[1])
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    # نهاية الأجزاء وترويسات trailer إن وجدت
+                    while await self.reader.readuntil(b'\r\n') != b'\r\n':
+                        pass
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+            headers['connection'] = 'close'
+
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, headers, body
+
+
+class Stats:
+    """أزمنة الاستجابة والأخطاء لكل نقطة نهاية"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.flows = 0
+        self.started = None
+        self.finished = None
+
+    def record(self, endpoint, elapsed, error=None):
+        self.latencies[endpoint].append(elapsed)
+        if error:
+            self.errors[endpoint][error] += 1
+
+    def report(self):
+        duration = max((self.finished or time.perf_counter()) - self.started, 1e-9)
+        endpoints = {}
+        for endpoint, timings in sorted(self.latencies.items()):
+            timings = sorted(timings)
+            errors = dict(self.errors.get(endpoint, {}))
+            endpoints[endpoint] = {
+                'requests': len(timings),
+                'throughput_rps': len(timings) / duration,
+                'p50_ms': percentile(timings, 50) * 1000,
+                'p95_ms': percentile(timings, 95) * 1000,
+                'p99_ms': percentile(timings, 99) * 1000,
+                'max_ms': timings[-1] * 1000,
+                'error_rate': sum(errors.values()) / len(timings),
+                'errors': errors
+            }
+        total = sum(item['requests'] for item in endpoints.values())
+        total_errors = defaultdict(int)
+        for errors in self.errors.values():
+            for kind, count in errors.items():
+                total_errors[kind] += count
+        return {
+            'duration_s': duration,
+            'flows_completed': self.flows,
+            'requests': total,
+            'throughput_rps': total / duration,
+            'error_rate': sum(total_errors.values()) / total if total else 0.0,
+            'errors': dict(total_errors),
+            'endpoints': endpoints
+        }
+
+
+def percentile(values, pct):
+    """النسبة المئوية بطريقة nearest-rank على قائمة مرتبة"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def classify_error(status, body):
+    if any(marker in body for marker in LOCK_ERRORS):
+        return 'sqlite_locked'
+    if status >= 400:
+        return f'http_{status}'
+    return None
+
+
+class VirtualUser:
+    def __init__(self, index, args, stats):
+        self.index = index
+        self.args = args
+        self.stats = stats
+        self.random = random.Random(args.seed + index)
+        url = urlsplit(args.url)
+        self.connection = Connection(url.hostname, url.port or 80, args.timeout)
+
+    async def call(self, endpoint, method, path, payload=None):
+        """تنفيذ طلب وتسجيل زمنه - يعيد JSON الرد أو None عند الخطأ"""
+        started = time.perf_counter()
+        try:
+            status, headers, body = await self.connection.request(method, path, payload)
+        except asyncio.TimeoutError:
+            self.stats.record(endpoint, time.perf_counter() - started, 'timeout')
+            return None
+        except (OSError, asyncio.IncompleteReadError, HttpError):
+            self.stats.record(endpoint, time.perf_counter() - started, 'connection')
+            return None
+        error = classify_error(status, body)
+        self.stats.record(endpoint, time.perf_counter() - started, error)
+        if error or not headers.get('content-type', '').startswith('application/json'):
+            return None if error else {}
+        return json.loads(body)
+
+    async def maybe_read(self, study_id):
+        if self.random.random() >= self.args.read_ratio:
+            return
+        if self.random.random() < 0.5:
+            await self.call('GET /api/studies', 'GET', '/api/studies?limit=20')
+        else:
+            await self.call('GET /api/study/<id>', 'GET', f'/api/study/{study_id}')
+
+    async def flow(self):
+        """مسار المعالج: setup ثم الأقسام بالترتيب ثم التصدير"""
+        data = dict(SAMPLE_STUDY, mainTopic=f"{SAMPLE_STUDY['mainTopic']} {self.index}")
+        result = await self.call('POST /api/generate[setup]', 'POST', '/api/generate',
+                                 {'section': 'setup', 'data': data})
+        if not result or not result.get('study_id'):
+            return False
+        data['study_id'] = result['study_id']
+
+        completed = []
+        for section in SECTIONS:
+            await self.think()
+            if await self.call('POST /api/generate', 'POST', '/api/generate', {'section': section, 'data': data}):
+                completed.append(section)
+            await self.maybe_read(data['study_id'])
+
+        await self.think()
+        await self.call('POST /api/export', 'POST', '/api/export', {'data': data, 'sections': completed})
+        return True
+
+    async def think(self):
+        if self.args.think_time:
+            await asyncio.sleep(self.random.uniform(0, 2 * self.args.think_time))
+
+    async def run(self, deadline):
+        # توزيع بدء المستخدمين بالتساوي على فترة ramp-up
+        if self.args.ramp_up and self.args.users > 1:
+            await asyncio.sleep(self.args.ramp_up * self.index / (self.args.users - 1))
+        iterations = 0
+        try:
+            while time.perf_counter() < deadline:
+                if self.args.iterations and iterations >= self.args.iterations:
+                    break
+                if await self.flow():
+                    self.stats.flows += 1
+                iterations += 1
+        finally:
+            await self.connection.close()
+
+
+async def run(args):
+    stats = Stats()
+    stats.started = time.perf_counter()
+    duration = args.duration if args.duration else float('inf')
+    deadline = stats.started + args.ramp_up + duration
+    users = [VirtualUser(index, args, stats) for index in range(args.users)]
+    await asyncio.gather(*(user.run(deadline) for user in users))
+    stats.finished = time.perf_counter()
+    return stats.report()
+
+
+def print_report(report):
+    print(f"{'endpoint':<28} {'reqs':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for endpoint, item in report['endpoints'].items():
+        print(f"{endpoint:<28} {item['requests']:>6} {item['throughput_rps']:>8.2f} {item['p50_ms']:>9.1f} "
+              f"{item['p95_ms']:>9.1f} {item['p99_ms']:>9.1f} {item['error_rate']:>6.1%}")
+    print(f"\n{report['requests']} requests, {report['flows_completed']} flows in {report['duration_s']:.1f}s "
+          f"({report['throughput_rps']:.2f} req/s), error rate {report['error_rate']:.2%}")
+    for kind, count in sorted(report['errors'].items()):
+        print(f'  {kind}: {count}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='عنوان الخادم المحلي')
+    parser.add_argument('--users', type=int, default=10, help='عدد المستخدمين الافتراضيين المتزامنين')
+    parser.add_argument('--ramp-up', type=float, default=0.0, help='الثواني لبدء جميع المستخدمين')
+    parser.add_argument('--duration', type=float, default=30.0, help='مدة التشغيل بالثواني بعد ramp-up (0 = بلا حد)')
+    parser.add_argument('--iterations', type=int, default=0, help='عدد مرات المسار لكل مستخدم (0 = حتى انتهاء المدة)')
+    parser.add_argument('--read-ratio', type=float, default=0.2, help='احتمال قراءة بعد توليد كل قسم')
+    parser.add_argument('--think-time', type=float, default=0.0, help='متوسط التوقف بين خطوات المعالج بالثواني')
+    parser.add_argument('--timeout', type=float, default=60.0, help='مهلة الطلب الواحد بالثواني')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='مسار ملف JSON للنتائج')
+    args = parser.parse_args()
+    if not args.duration and not args.iterations:
+        parser.error('--duration 0 requires --iterations')
+
+    report = asyncio.run(run(args))
+    report['config'] = {name: getattr(args, name) for name in
+                         ('url', 'users', 'ramp_up', 'duration', 'iterations', 'read_ratio', 'think_time')}
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if report['requests'] == 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+قياس زمن بدء التشغيل البارد: زمن استيراد كل وحدة (python -X importtime) وزمن أول طلب
+
+كل تشغيل يتم في عملية جديدة مع قاعدة SQLite مؤقتة مهيأة مسبقاً (كما في نشر Vercel
+حيث تكون قاعدة البيانات موجودة ويدفع كل تشغيل بارد زمن الاستيراد وأول طلب).
+يفشل (exit 1) إذا تم استيراد وحدة ممنوعة عند البدء أو تراجع الزمن عن baseline.
+
+التشغيل من جذر المشروع:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --output startup.json
+    python benchmarks/startup.py --baseline startup.json --threshold 0.25
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# وحدات ثقيلة يجب أن تحمل عند أول استخدام فقط
+DEFAULT_FORBIDDEN = ('reportlab', 'PIL')
+
+# سطر importtime: "import time: self [us] | cumulative | imported package"
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+_CHILD_CODE = '''
+import json, sys, time
+started = time.perf_counter()
+from src.main import app
+imported = time.perf_counter()
+client = app.test_client()
+response = client.get({path!r})
+finished = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (finished - imported) * 1000,
+    "status": response.status_code,
+    "modules": sorted(sys.modules)
+}}))
+'''
+
+
+def _child_env(workdir):
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+        'PDF_CACHE_DIR': os.path.join(workdir, 'pdf_cache'),
+        'RESPONSE_CACHE_DIR': os.path.join(workdir, 'response_cache'),
+        'PYTHONPATH': ROOT,
+    })
+    return env
+
+
+def run_once(workdir, path):
+    """تشغيل عملية جديدة وإرجاع أزمنتها وأزمنة استيراد الوحدات"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _CHILD_CODE.format(path=path)],
+        cwd=ROOT, env=_child_env(workdir), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules[name] = {'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000,
+                             'depth': len(indent) // 2}
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report['imports'] = modules
+    return report
+
+
+def summarize(runs):
+    """وسيط الأزمنة عبر التشغيلات، لكل وحدة وللمراحل"""
+    modules = {}
+    for name in runs[-1]['imports']:
+        samples = [run['imports'][name] for run in runs if name in run['imports']]
+        modules[name] = {
+            'self_ms': statistics.median(sample['self_ms'] for sample in samples),
+            'cumulative_ms': statistics.median(sample['cumulative_ms'] for sample in samples),
+            'depth': samples[-1]['depth']
+        }
+    return {
+        'import_ms': statistics.median(run['import_ms'] for run in runs),
+        'first_request_ms': statistics.median(run['first_request_ms'] for run in runs),
+        'modules': modules,
+        'loaded_modules': runs[-1]['modules']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='عدد التشغيلات الباردة')
+    parser.add_argument('--top', type=int, default=25, help='عدد الوحدات المعروضة')
+    parser.add_argument('--path', default='/api/studies?limit=20', help='مسار أول طلب بعد الاستيراد')
+    parser.add_argument('--forbid', nargs='*', default=list(DEFAULT_FORBIDDEN),
+                        help='حزم يجب ألا تستورد عند البدء')
+    parser.add_argument('--output', help='مسار ملف JSON للنتائج')
+    parser.add_argument('--baseline', help='ملف نتائج سابق للمقارنة')
+    parser.add_argument('--threshold', type=float, default=0.25, help='نسبة التراجع المسموحة (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='aplus_startup_')
+    try:
+        # التشغيل الأول ينشئ المخطط - لا يدخل في القياس
+        run_once(workdir, args.path)
+        runs = [run_once(workdir, args.path) for _ in range(args.repeat)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    summary = summarize(runs)
+
+    print(f"import src.main: {summary['import_ms']:.1f} ms, first request: {summary['first_request_ms']:.1f} ms\n")
+    print(f"{'module':<48} {'self ms':>9} {'cumul. ms':>10}")
+    ranked = sorted(summary['modules'].items(), key=lambda item: item[1]['cumulative_ms'], reverse=True)
+    for name, stats in ranked[:args.top]:
+        print(f"{'  ' * stats['depth'] + name:<48} {stats['self_ms']:>9.1f} {stats['cumulative_ms']:>10.1f}")
+
+    failed = False
+    forbidden = sorted({name.split('.')[0] for name in summary['loaded_modules']} & set(args.forbid))
+    for package in forbidden:
+        print(f'FORBIDDEN IMPORT at startup: {package}')
+        failed = True
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({key: value for key, value in summary.items() if key != 'loaded_modules'}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        for key in ('import_ms', 'first_request_ms'):
+            previous, current = baseline.get(key), summary[key]
+            if previous and current / previous > 1 + args.threshold:
+                print(f'REGRESSION {key}: {previous:.1f} -> {current:.1f} ms ({current / previous:.2f}x)')
+                failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
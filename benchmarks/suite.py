@@ -0,0 +1,258 @@
+"""
+مجموعة قياسات الأداء الكاملة: التوليد، مسار المعالج، تصدير PDF، وقائمة الدراسات
+
+تعمل دون شبكة عبر test client الخاص بـ Flask وقاعدة SQLite مؤقتة،
+وتكتب النتائج بصيغة JSON ويمكن مقارنتها بنتائج سابقة (baseline) مع حد للتراجع.
+
+التشغيل من جذر المشروع:
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --baseline results.json --threshold 0.25
+    python benchmarks/suite.py --quick
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SAMPLE_STUDY = {
+    'studyType': 'master',
+    'fieldOfStudy': 'education',
+    'mainTopic': 'التعلم الإلكتروني في التعليم العالي',
+    'problemDescription': 'ضعف تفاعل الطلاب مع منصات التعلم الإلكتروني',
+    'keywords': 'التعلم الإلكتروني، التفاعل، التعليم العالي'
+}
+
+# أحجام محتوى التصدير: عدد مرات تكرار محتوى كل قسم
+EXPORT_SIZES = {'small': 1, 'medium': 10, 'large': 50}
+
+LISTING_ROWS = (100, 10000, 100000)
+
+
+def measure(func, repeat, number=1, warmup=1):
+    """تشغيل الدالة وإرجاع إحصائيات زمن الاستدعاء الواحد بالمللي ثانية"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) * 1000 / number)
+    timings.sort()
+    return {
+        'median_ms': statistics.median(timings),
+        'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'min_ms': timings[0],
+        'runs': len(timings)
+    }
+
+
+def _check(response):
+    if response.status_code != 200:
+        raise RuntimeError(f'{response.request.path}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}')
+    return response
+
+
+def bench_generation(repeat):
+    from src.services.content_generator import AcademicContentGenerator, get_registered_sections
+
+    generator = AcademicContentGenerator()
+    return {
+        f'generate.{section}': measure(lambda: generator.generate_content(section, SAMPLE_STUDY), repeat, number=500)
+        for section in get_registered_sections()
+    }
+
+
+def bench_wizard(client, repeat):
+    """مسار المعالج الكامل: إنشاء الدراسة ثم توليد كل قسم بالترتيب حتى المراجع"""
+    from src.services.content_generator import get_registered_sections
+
+    sections = [section for section in get_registered_sections() if section != 'setup']
+
+    def flow():
+        response = _check(client.post('/api/generate', json={'section': 'setup', 'data': dict(SAMPLE_STUDY)}))
+        data = dict(SAMPLE_STUDY, study_id=response.get_json()['study_id'])
+        for section in sections:
+            _check(client.post('/api/generate', json={'section': section, 'data': data}))
+
+    return {'wizard.full_flow': measure(flow, repeat)}
+
+
+def bench_export(client, repeat):
+    from src.models.study import StudySection, db
+    from src.services.content_generator import AcademicContentGenerator
+    from src.services.pdf_cache import pdf_cache
+    from src.services.pdf_exporter import SECTION_TITLES
+
+    generator = AcademicContentGenerator()
+    sections = list(SECTION_TITLES)
+    results = {}
+    for label, size in EXPORT_SIZES.items():
+        study_id = _check(client.post('/api/generate', json={
+            'section': 'setup', 'data': dict(SAMPLE_STUDY)
+        })).get_json()['study_id']
+        with client.application.app_context():
+            for section in ['title', 'abstract'] + sections:
+                content = ''.join(generator.generate_content(section, SAMPLE_STUDY, seed=seed) for seed in range(size))
+                StudySection.upsert(study_id, section, content)
+            db.session.commit()
+
+        def export():
+            # حذف الملف المخزن حتى يقاس بناء PDF نفسه
+            pdf_cache.invalidate(study_id)
+            _check(client.post('/api/export', json={'data': {'study_id': study_id}, 'sections': sections}))
+
+        results[f'export.{label}'] = measure(export, max(1, repeat // size) if size > 1 else repeat)
+    return results
+
+
+def _seed_studies(count):
+    """إضافة دراسات مع ثلاثة أقسام لكل منها حتى يصل العدد إلى count"""
+    from src.models.codec import compress_text
+    from src.models.study import Study, StudySection, db
+
+    existing = db.session.query(db.func.count(Study.id)).scalar()
+    if existing >= count:
+        return
+    content = compress_text('<p>' + SAMPLE_STUDY['problemDescription'] * 20 + '</p>')
+    started = datetime.utcnow() - timedelta(days=365)
+    study_types = ('master', 'phd', 'research')
+    batch = 5000
+    for offset in range(existing, count, batch):
+        size = min(batch, count - offset)
+        studies = [{
+            'study_type': study_types[index % len(study_types)],
+            'field_of_study': 'education',
+            'main_topic': f"{SAMPLE_STUDY['mainTopic']} {index}",
+            'problem_description': SAMPLE_STUDY['problemDescription'],
+            'keywords': SAMPLE_STUDY['keywords'],
+            'created_at': started + timedelta(seconds=index),
+            'updated_at': started + timedelta(seconds=index),
+            'seed': index
+        } for index in range(offset, offset + size)]
+        db.session.execute(Study.__table__.insert(), studies)
+        ids = [row[0] for row in db.session.query(Study.id).order_by(Study.id.desc()).limit(size)]
+        db.session.execute(StudySection.__table__.insert(), [{
+            'study_id': study_id,
+            'section': section,
+            'content_zlib': content,
+            'revision': 1,
+            'updated_at': started
+        } for study_id in ids for section in ('title', 'abstract', 'introduction')])
+        db.session.commit()
+
+
+def bench_listing(client, repeat, row_counts):
+    results = {}
+    for count in row_counts:
+        with client.application.app_context():
+            _seed_studies(count)
+        cursor = _check(client.get('/api/studies?limit=20')).get_json()['next_cursor']
+        cases = {
+            'summary': '/api/studies?limit=20',
+            'full': '/api/studies?limit=20&view=full',
+            'filtered': '/api/studies?limit=20&study_type=phd',
+            'next_page': f'/api/studies?limit=20&cursor={cursor}'
+        }
+        for case, url in cases.items():
+            results[f'listing.{count}.{case}'] = measure(lambda: _check(client.get(url)), repeat)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """القياسات التي زاد وسيطها عن baseline بأكثر من threshold"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or not previous.get('median_ms'):
+            continue
+        ratio = current['median_ms'] / previous['median_ms']
+        if ratio > 1 + threshold:
+            regressions.append((name, previous['median_ms'], current['median_ms'], ratio))
+    return regressions
+
+
+def run(args, workdir):
+    # يجب ضبط البيئة قبل استيراد التطبيق
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['PDF_CACHE_DIR'] = os.path.join(workdir, 'pdf_cache')
+    os.environ['RESPONSE_CACHE_DIR'] = os.path.join(workdir, 'response_cache')
+    # قياس مسار قاعدة البيانات نفسه وليس ذاكرة الردود المؤقتة
+    os.environ['RESPONSE_CACHE_SIZE'] = '0'
+
+    from src.main import app, init_schema
+    init_schema()
+    client = app.test_client()
+
+    groups = set(args.only or ('generation', 'wizard', 'export', 'listing'))
+    results = {}
+    if 'generation' in groups:
+        results.update(bench_generation(args.repeat))
+    if 'wizard' in groups:
+        results.update(bench_wizard(client, args.repeat))
+    if 'export' in groups:
+        results.update(bench_export(client, args.repeat))
+    if 'listing' in groups:
+        results.update(bench_listing(client, args.repeat, args.rows))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='مسار ملف JSON للنتائج')
+    parser.add_argument('--baseline', help='ملف نتائج سابق للمقارنة')
+    parser.add_argument('--threshold', type=float, default=0.25, help='نسبة التراجع المسموحة في الوسيط (0.25 = 25%%)')
+    parser.add_argument('--repeat', type=int, default=10, help='عدد مرات تشغيل كل قياس')
+    parser.add_argument('--rows', type=int, nargs='+', default=list(LISTING_ROWS), help='أعداد الدراسات لقياس القائمة')
+    parser.add_argument('--only', nargs='+', choices=('generation', 'wizard', 'export', 'listing'))
+    parser.add_argument('--quick', action='store_true', help='تشغيل سريع: تكرارات أقل وحتى 10k دراسة')
+    args = parser.parse_args()
+    if args.quick:
+        args.repeat = min(args.repeat, 3)
+        args.rows = [rows for rows in args.rows if rows <= 10000]
+
+    workdir = tempfile.mkdtemp(prefix='aplus_bench_')
+    try:
+        results = run(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+
+    print(f"{'benchmark':<32} {'median ms':>10} {'p95 ms':>10}")
+    for name, stats in results.items():
+        print(f"{name:<32} {stats['median_ms']:>10.3f} {stats['p95_ms']:>10.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, previous, current, ratio in regressions:
+            print(f'REGRESSION {name}: {previous:.3f} -> {current:.3f} ms ({ratio:.2f}x)')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import functools
+import os
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# قاعدة البيانات الافتراضية عند عدم تحديد DATABASE_URL
+DEFAULT_DATABASE_URI = f"sqlite:///{os.path.join('/tmp', 'app.db')}"
+
+# مفتاح محرك القراءة في SQLALCHEMY_BINDS
+READ_BIND_KEY = 'read'
+
+# إعدادات SQLite لكل اتصال - يمكن تعديل كل منها عبر متغير بيئة بنفس الاسم
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'SQLITE_JOURNAL_MODE', 'WAL'),
+    ('synchronous', 'SQLITE_SYNCHRONOUS', 'NORMAL'),
+    ('busy_timeout', 'SQLITE_BUSY_TIMEOUT_MS', '5000'),
+    ('cache_size', 'SQLITE_CACHE_SIZE', '-20000'),  # القيمة السالبة بالكيلوبايت (~20MB)
+    ('mmap_size', 'SQLITE_MMAP_SIZE', '268435456'),
+)
+
+# إعدادات مجمع الاتصالات: (اسم الخيار في SQLAlchemy، متغير البيئة، النوع)
+POOL_SETTINGS = (
+    ('pool_size', 'DB_POOL_SIZE', int),
+    ('max_overflow', 'DB_MAX_OVERFLOW', int),
+    ('pool_timeout', 'DB_POOL_TIMEOUT', float),
+    ('pool_recycle', 'DB_POOL_RECYCLE', int),
+)
+
+
+def _normalize_uri(uri):
+    """توحيد صيغة postgres:// القديمة التي تستخدمها بعض منصات الاستضافة"""
+    if uri and uri.startswith('postgres://'):
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def _is_memory_sqlite(uri):
+    return uri.startswith('sqlite') and (uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri)
+
+
+def _engine_options(uri):
+    """خيارات المحرك من متغيرات البيئة"""
+    options = {}
+    if _is_memory_sqlite(uri):
+        # قاعدة SQLite في الذاكرة تستخدم اتصالاً واحداً ولا تقبل إعدادات المجمع
+        return options
+    for option, env_name, cast in POOL_SETTINGS:
+        value = os.environ.get(env_name)
+        if value:
+            options[option] = cast(value)
+    if not uri.startswith('sqlite'):
+        options['pool_pre_ping'] = True
+    return options
+
+
+def database_config():
+    """إعدادات Flask-SQLAlchemy المبنية من متغيرات البيئة"""
+    uri = _normalize_uri(os.environ.get('DATABASE_URL')) or DEFAULT_DATABASE_URI
+    config = {
+        'SQLALCHEMY_DATABASE_URI': uri,
+        'SQLALCHEMY_ENGINE_OPTIONS': _engine_options(uri),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+    }
+
+    read_uri = _normalize_uri(os.environ.get('DATABASE_READ_URL'))
+    if read_uri:
+        config['SQLALCHEMY_BINDS'] = {
+            READ_BIND_KEY: {'url': read_uri, **_engine_options(read_uri)}
+        }
+    return config
+
+
+def _sqlite_pragmas(read_only):
+    pragmas = [(name, os.environ.get(env_name, default)) for name, env_name, default in SQLITE_PRAGMAS]
+    if read_only:
+        pragmas.append(('query_only', 'ON'))
+    return [(name, value) for name, value in pragmas if value != '']
+
+
+def _on_sqlite_connect(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def init_database(app, db):
+    """ربط قاعدة البيانات بالتطبيق وتطبيق إعدادات SQLite على كل اتصال جديد"""
+    app.config.update(database_config())
+    db.init_app(app)
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name == 'sqlite':
+                pragmas = _sqlite_pragmas(read_only=key == READ_BIND_KEY)
+                event.listen(engine, 'connect', _on_sqlite_connect(pragmas))
+
+
+class RoutingSession(Session):
+    """جلسة توجه استعلامات نقاط القراءة فقط إلى محرك القراءة إن وجد"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('use_read_engine'):
+            engine = self._db.engines.get(READ_BIND_KEY)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """تشغيل نقطة API للقراءة فقط على محرك القراءة (DATABASE_READ_URL)"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_read_engine = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.use_read_engine = False
+    return wrapper
@@ -1,12 +1,20 @@
 import os
 import sys
+import threading
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+import click
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-from src.models.study import db
+from src.config import init_database
+from src.models.study import Study, StudySection, db, schema_is_current, upgrade_schema
 from src.routes.api import api_bp
+from src.services.compression import init_compression
+from src.services.metrics import init_metrics
+from src.services.profiling import init_profiling
+from src.services.response_cache import track_invalidation
+from src.services.static_assets import AssetManifest, IMMUTABLE_MAX_AGE, PLAIN_MAX_AGE
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'aplus_academy_secret_key_2024'
@@ -17,38 +25,100 @@ CORS(app)
 # Register API blueprint
 app.register_blueprint(api_bp, url_prefix='/api')
 
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join('/tmp', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+# قياس زمن الطلبات ومراحلها (Server-Timing و /api/metrics) - يسجل قبل الضغط ليشمله الزمن الكلي
+init_metrics(app, db.session)
 
-# Create database tables
-with app.app_context():
-    db.create_all()
+# ضغط ردود JSON و HTML (gzip/deflate)
+init_compression(app)
+
+# Database configuration (DATABASE_URL, DATABASE_READ_URL, DB_POOL_* - see src/config.py)
+init_database(app, db)
+
+# إبطال ذاكرة ردود القراءة بعد كل commit يعدل الدراسات أو أقسامها
+track_invalidation(db.session, (Study, StudySection))
+
+# تحليل الطلبات بـ cProfile عند الطلب (ترويسة X-Profile أو PROFILE_ALL أو PROFILE_SAMPLE_RATE)
+init_profiling(app)
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+def init_schema():
+    """
+    إنشاء الجداول وترقية المخطط - يستدعيها الخادم مرة واحدة قبل تشغيل العمال
+    يتم تخطيها عندما يكون إصدار المخطط في قاعدة البيانات محدثاً (SCHEMA_VERSION)
+    """
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with app.app_context():
+            if not schema_is_current():
+                db.create_all()
+                upgrade_schema()
+        _schema_ready = True
+
+@app.before_request
+def ensure_schema():
+    """تهيئة المخطط عند أول طلب إذا لم يتم تشغيل التطبيق عبر src/serve.py"""
+    if not _schema_ready and request.endpoint != 'healthz':
+        init_schema()
+
+@app.route('/healthz')
+def healthz():
+    """فحص حالة العملية دون الوصول إلى قاعدة البيانات"""
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+# الملفات الثابتة تبنى مرة واحدة في الذاكرة (أسماء مبصومة ونسخ gzip)
+assets = AssetManifest(app.static_folder)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
     """Serve static files and handle routing"""
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
+    asset = assets.lookup(path)
+    if asset is None:
+        return "index.html not found", 404
 
-    # Handle specific routes
-    if path == 'writer':
-        return send_from_directory(static_folder_path, 'writer.html')
-    
-    # Serve static files
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
+    use_gzip = asset.gzip_body is not None and 'gzip' in request.accept_encodings
+    etag = f'{asset.etag}-gz' if use_gzip else asset.etag
+    if asset.immutable:
+        cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    elif asset.mimetype.startswith('text/html'):
+        cache_control = 'no-cache'
+    else:
+        cache_control = f'public, max-age={PLAIN_MAX_AGE}'
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
     else:
-        # Default to index.html
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+        response = Response(asset.gzip_body if use_gzip else asset.body, mimetype=asset.mimetype)
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    if asset.gzip_body is not None:
+        response.vary.add('Accept-Encoding')
+    return response
+
+@app.cli.command('import-studies')
+@click.argument('source', type=click.File('rb'))
+@click.option('--batch-size', type=int, default=None, help='عدد الدراسات في كل عملية إدراج (IMPORT_BATCH_SIZE)')
+def import_studies_command(source, batch_size):
+    """استيراد دراسات من ملف JSONL (أو - للإدخال القياسي): flask --app src.main import-studies studies.jsonl"""
+    from src.routes.api import content_generator
+    from src.services.study_import import import_studies
+    
+    init_schema()
+    with app.app_context():
+        report = import_studies(source, content_generator.get_missing_setup_fields, batch_size=batch_size)
+    for error in report.errors:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    click.echo(f'imported {report.imported}, failed {report.failed}')
+    if report.failed:
+        sys.exit(1)
 
 if __name__ == '__main__':
+    init_schema()
     app.run(host='0.0.0.0', port=5000, debug=True)
 
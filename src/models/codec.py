@@ -0,0 +1,34 @@
+import zlib
+from typing import Optional
+
+# مستوى الضغط - توازن بين حجم التخزين وزمن الكتابة
+COMPRESSION_LEVEL = 6
+
+
+def compress_text(text: Optional[str]) -> Optional[bytes]:
+    """ضغط نص بترميز UTF-8 باستخدام zlib"""
+    if text is None:
+        return None
+    return zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL)
+
+
+def decompress_text(data: Optional[bytes]) -> Optional[str]:
+    """فك ضغط نص مخزن بواسطة compress_text"""
+    if data is None:
+        return None
+    return zlib.decompress(data).decode('utf-8')
+
+
+def encode_delta(text: str, previous: str) -> bytes:
+    """
+    ترميز نص كفرق مضغوط عن النص السابق
+    النص السابق يستخدم كقاموس مسبق لـ zlib فتتحول الأجزاء المتكررة إلى مراجع قصيرة
+    """
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=previous.encode('utf-8'))
+    return compressor.compress(text.encode('utf-8')) + compressor.flush()
+
+
+def decode_delta(data: bytes, previous: str) -> str:
+    """استرجاع النص من فرق مضغوط والنص السابق"""
+    decompressor = zlib.decompressobj(zdict=previous.encode('utf-8'))
+    return (decompressor.decompress(data) + decompressor.flush()).decode('utf-8')
@@ -1,11 +1,70 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm.collections import attribute_keyed_dict
 from datetime import datetime
+from src.config import RoutingSession
+from src.models.codec import compress_text, decompress_text, encode_delta, decode_delta
 import json
+import random
+import time
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# أقسام المحتوى بالترتيب المعتمد في الدراسة
+SECTION_NAMES = ('title', 'abstract', 'introduction', 'literature', 'methodology',
+                 'results', 'discussion', 'conclusion', 'references')
+
+# إصدار مخطط قاعدة البيانات - يجب زيادته عند إضافة جدول أو عمود أو فهرس أو ترحيل بيانات
+# حتى تعيد upgrade_schema تشغيل الترقية على قواعد البيانات الموجودة
+SCHEMA_VERSION = 3
+
+# قيمة تميز "عدم تعديل المدخلات" عن تمرير None
+_UNSET = object()
+
+# عدد محاولات الكتابة عند التعارض مع طلب متزامن
+CONFLICT_RETRIES = 5
+
+
+class ConcurrentUpdateError(Exception):
+    """يطلق عندما يعدل طلب آخر نفس القسم أو الدراسة بين القراءة والكتابة"""
+
+
+class _SectionContent:
+    """واصف يحافظ على واجهة الأعمدة القديمة *_content فوق جدول study_sections"""
+    
+    def __init__(self, section):
+        self.section = section
+    
+    def __get__(self, study, owner):
+        if study is None:
+            return self
+        row = study.sections.get(self.section)
+        return row.content if row else None
+    
+    def __set__(self, study, value):
+        study.set_section(self.section, value)
 
-db = SQLAlchemy()
 
 class Study(db.Model):
     __tablename__ = 'studies'
+    __table_args__ = (
+        db.Index('ix_studies_created_at_id', 'created_at', 'id'),
+        db.Index('ix_studies_study_type_created_at', 'study_type', 'created_at'),
+        db.Index('ix_studies_field_of_study_created_at', 'field_of_study', 'created_at'),
+    )
+    
+    # الأعمدة المستخدمة في قائمة الدراسات المختصرة (بدون محتوى الأقسام)
+    SUMMARY_COLUMNS = ('id', 'study_type', 'field_of_study', 'main_topic', 'keywords',
+                       'created_at', 'updated_at')
+    
+    # الحقول التي يمكن طلبها عبر ?fields= (نفس مفاتيح to_dict)
+    SCALAR_FIELDS = ('id', 'study_type', 'field_of_study', 'main_topic', 'problem_description',
+                     'keywords', 'seed', 'version', 'created_at', 'updated_at')
+    FIELDS = SCALAR_FIELDS + tuple(f'{name}_content' for name in SECTION_NAMES) + (
+        'additional_inputs', 'completed_sections')
     
     id = db.Column(db.Integer, primary_key=True)
     study_type = db.Column(db.String(50), nullable=False)  # master, phd, research
@@ -14,53 +73,128 @@ class Study(db.Model):
     problem_description = db.Column(db.Text, nullable=False)
     keywords = db.Column(db.Text)
     
-    # Generated content for each section
-    title_content = db.Column(db.Text)
-    abstract_content = db.Column(db.Text)
-    introduction_content = db.Column(db.Text)
-    literature_content = db.Column(db.Text)
-    methodology_content = db.Column(db.Text)
-    results_content = db.Column(db.Text)
-    discussion_content = db.Column(db.Text)
-    conclusion_content = db.Column(db.Text)
-    references_content = db.Column(db.Text)
-    
-    # Additional inputs for each section
-    additional_inputs = db.Column(db.Text)  # JSON string
+    # Generated content and additional inputs for each section (study_sections)
+    sections = db.relationship(
+        'StudySection',
+        collection_class=attribute_keyed_dict('section'),
+        cascade='all, delete-orphan',
+        backref='study'
+    )
+    title_content = _SectionContent('title')
+    abstract_content = _SectionContent('abstract')
+    introduction_content = _SectionContent('introduction')
+    literature_content = _SectionContent('literature')
+    methodology_content = _SectionContent('methodology')
+    results_content = _SectionContent('results')
+    discussion_content = _SectionContent('discussion')
+    conclusion_content = _SectionContent('conclusion')
+    references_content = _SectionContent('references')
     
     # Metadata
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    completed_sections = db.Column(db.Text)  # JSON array of completed section names
+    seed = db.Column(db.Integer)  # بذرة توليد المحتوى لضمان قابلية التكرار
+    # يزداد مع كل تعديل - تعديلات ORM تتحقق منه (compare-and-swap) وتطلق StaleDataError عند التعارض
+    version = db.Column(db.Integer, nullable=False, default=1)
+    
+    __mapper_args__ = {'version_id_col': version}
     
     def __init__(self, **kwargs):
         super(Study, self).__init__(**kwargs)
-        self.additional_inputs = json.dumps({})
-        self.completed_sections = json.dumps([])
+        if self.seed is None:
+            self.seed = random.SystemRandom().getrandbits(31)
+    
+    def set_section(self, section, content, section_input=_UNSET):
+        """تعديل محتوى قسم (ومدخلاته) عبر الكائنات المحملة في الجلسة"""
+        row = self.sections.get(section)
+        if row is None:
+            row = self.sections[section] = StudySection(section=section)
+        row.content = content
+        if section_input is not _UNSET:
+            row.input = section_input
+        self.updated_at = datetime.utcnow()
     
     def get_additional_inputs(self):
-        try:
-            return json.loads(self.additional_inputs or '{}')
-        except:
-            return {}
+        return {
+            f'{name}_input': row.input
+            for name, row in self.sections.items()
+            if row.input is not None
+        }
     
     def set_additional_inputs(self, inputs):
-        self.additional_inputs = json.dumps(inputs)
+        for key, value in inputs.items():
+            if key.endswith('_input'):
+                section = key[:-len('_input')]
+                row = self.sections.get(section)
+                if row is None:
+                    row = self.sections[section] = StudySection(section=section)
+                row.input = value
     
     def get_completed_sections(self):
-        try:
-            return json.loads(self.completed_sections or '[]')
-        except:
-            return []
+        return _ordered_sections(name for name, row in self.sections.items() if row.content is not None)
     
-    def set_completed_sections(self, sections):
-        self.completed_sections = json.dumps(sections)
+    def get_setup_data(self):
+        """بيانات الإعداد بنفس صيغة المدخلات القادمة من الواجهة"""
+        return {
+            'study_id': self.id,
+            'studyType': self.study_type,
+            'fieldOfStudy': self.field_of_study,
+            'mainTopic': self.main_topic,
+            'problemDescription': self.problem_description,
+            'keywords': self.keywords
+        }
+    
+    def to_summary_dict(self, completed_sections=None):
+        """بيانات مختصرة للقوائم لا تحتاج إلى تحميل محتوى الأقسام"""
+        if completed_sections is None:
+            completed_sections = self.get_completed_sections()
+        return {
+            'id': self.id,
+            'study_type': self.study_type,
+            'field_of_study': self.field_of_study,
+            'main_topic': self.main_topic,
+            'keywords': self.keywords,
+            'completed_sections': completed_sections,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
     
-    def add_completed_section(self, section):
-        sections = self.get_completed_sections()
-        if section not in sections:
-            sections.append(section)
-            self.set_completed_sections(sections)
+    @classmethod
+    def get_fields(cls, study_id, fields):
+        """
+        قراءة الحقول المطلوبة فقط: الأعمدة المطلوبة من جدول الدراسات
+        ومحتوى الأقسام المطلوبة فقط من study_sections
+        """
+        scalar_fields = [name for name in cls.SCALAR_FIELDS if name in fields]
+        row = db.session.query(*[getattr(cls, name) for name in scalar_fields or ['id']]).filter(
+            cls.id == study_id
+        ).first()
+        if row is None:
+            return None
+        
+        result = {}
+        for name in scalar_fields:
+            value = getattr(row, name)
+            result[name] = value.isoformat() if isinstance(value, datetime) else value
+        
+        sections = [name for name in SECTION_NAMES if f'{name}_content' in fields]
+        if sections:
+            result.update({f'{name}_content': None for name in sections})
+            rows = db.session.query(StudySection.section, StudySection.content_zlib).filter(
+                StudySection.study_id == study_id, StudySection.section.in_(sections)
+            )
+            for section, content_zlib in rows:
+                result[f'{section}_content'] = decompress_text(content_zlib)
+        
+        if 'additional_inputs' in fields:
+            rows = db.session.query(StudySection.section, StudySection.input).filter(
+                StudySection.study_id == study_id, StudySection.input.isnot(None)
+            )
+            result['additional_inputs'] = {f'{section}_input': value for section, value in rows}
+        
+        if 'completed_sections' in fields:
+            result['completed_sections'] = StudySection.completed_sections_for([study_id])[study_id]
+        return result
     
     def to_dict(self):
         return {
@@ -81,7 +215,337 @@ class Study(db.Model):
             'references_content': self.references_content,
             'additional_inputs': self.get_additional_inputs(),
             'completed_sections': self.get_completed_sections(),
+            'seed': self.seed,
+            'version': self.version,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+
+class StudySection(db.Model):
+    __tablename__ = 'study_sections'
+    
+    study_id = db.Column(db.Integer, db.ForeignKey('studies.id', ondelete='CASCADE'), primary_key=True)
+    section = db.Column(db.String(50), primary_key=True)
+    content_zlib = db.Column(db.LargeBinary)  # محتوى القسم مضغوطاً بـ zlib
+    input = db.Column(db.Text)
+    revision = db.Column(db.Integer, default=0)  # رقم آخر مراجعة محفوظة
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def content(self):
+        return decompress_text(self.content_zlib)
+    
+    @content.setter
+    def content(self, value):
+        self.content_zlib = compress_text(value)
+    
+    @classmethod
+    def upsert(cls, study_id, section, content, section_input=_UNSET):
+        """
+        كتابة قسم واحد بعملية insert-or-update صغيرة دون قراءة صف الدراسة
+        الكتابة مشروطة برقم المراجعة المقروء (compare-and-swap): إذا كتب طلب آخر
+        نفس القسم في هذه الأثناء تطلق ConcurrentUpdateError (انظر retry_on_conflict)
+        تضاف مراجعة جديدة مرمزة كفرق عن المحتوى السابق
+        يزداد version و updated_at للدراسة ذرياً دون شرط حتى لا تتعارض الأقسام المختلفة
+        """
+        now = datetime.utcnow()
+        current = db.session.query(cls.content_zlib, cls.revision).filter_by(
+            study_id=study_id, section=section
+        ).first()
+        previous = decompress_text(current.content_zlib) if current else None
+        expected = current.revision if current else None
+        revision = (expected or 0) + 1
+        
+        values = {
+            'study_id': study_id,
+            'section': section,
+            'content_zlib': compress_text(content),
+            'revision': revision,
+            'updated_at': now
+        }
+        if section_input is not _UNSET:
+            values['input'] = section_input
+        
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+            statement = insert(cls).values(**values)
+            statement = statement.on_conflict_do_update(
+                index_elements=['study_id', 'section'],
+                set_={key: value for key, value in values.items() if key not in ('study_id', 'section')},
+                # عند وجود الصف لا يعدل إلا إذا بقي على المراجعة المقروءة
+                where=cls.__table__.c.revision == expected if expected is not None else db.false()
+            )
+            written = db.session.execute(statement).rowcount
+        elif current is not None:
+            written = db.session.execute(db.update(cls).where(
+                cls.study_id == study_id, cls.section == section, cls.revision == expected
+            ).values(**values)).rowcount
+        else:
+            # إدراج متزامن لنفس القسم يفشل بقيد المفتاح الأساسي عند الـ flush
+            db.session.add(cls(**values))
+            written = 1
+        if not written:
+            raise ConcurrentUpdateError(f'Section {section} of study {study_id} was modified concurrently')
+        
+        StudySectionRevision.record(study_id, section, revision, content, previous, now)
+        db.session.execute(db.update(Study).where(Study.id == study_id).values(
+            updated_at=now, version=Study.version + 1
+        ))
+        return revision
+    
+    @classmethod
+    def completed_sections_for(cls, study_ids):
+        """الأقسام المكتملة لعدة دراسات في استعلام واحد دون تحميل المحتوى"""
+        completed = {study_id: [] for study_id in study_ids}
+        if not completed:
+            return completed
+        rows = db.session.query(cls.study_id, cls.section).filter(
+            cls.study_id.in_(completed), cls.content_zlib.isnot(None)
+        )
+        for study_id, section in rows:
+            completed[study_id].append(section)
+        return {study_id: _ordered_sections(names) for study_id, names in completed.items()}
+
+
+class StudySectionRevision(db.Model):
+    __tablename__ = 'study_section_revisions'
+    __table_args__ = (
+        db.UniqueConstraint('study_id', 'section', 'revision', name='uq_study_section_revision'),
+    )
+    
+    # كل KEYFRAME_INTERVAL مراجعات تحفظ مراجعة كاملة حتى لا تطول سلسلة الفروق
+    KEYFRAME_INTERVAL = 10
+    
+    id = db.Column(db.Integer, primary_key=True)
+    study_id = db.Column(db.Integer, db.ForeignKey('studies.id', ondelete='CASCADE'), nullable=False)
+    section = db.Column(db.String(50), nullable=False)
+    revision = db.Column(db.Integer, nullable=False)
+    is_delta = db.Column(db.Boolean, nullable=False, default=False)
+    data = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @classmethod
+    def record(cls, study_id, section, revision, content, previous, created_at=None):
+        """إضافة مراجعة كاملة أو فرق عن المراجعة السابقة"""
+        is_delta = (
+            content is not None and previous is not None
+            and revision % cls.KEYFRAME_INTERVAL != 1
+        )
+        data = encode_delta(content, previous) if is_delta else compress_text(content)
+        db.session.add(cls(
+            study_id=study_id,
+            section=section,
+            revision=revision,
+            is_delta=is_delta,
+            data=data,
+            created_at=created_at or datetime.utcnow()
+        ))
+    
+    @classmethod
+    def list_for(cls, study_id, section):
+        """قائمة مراجعات قسم بدون فك ضغطها"""
+        return cls.query.filter_by(study_id=study_id, section=section).order_by(cls.revision.desc()).all()
+    
+    @classmethod
+    def get_content(cls, study_id, section, revision):
+        """إعادة بناء محتوى مراجعة بدءاً من أقرب مراجعة كاملة قبلها"""
+        rows = cls.query.filter(
+            cls.study_id == study_id,
+            cls.section == section,
+            cls.revision <= revision,
+            cls.revision > revision - cls.KEYFRAME_INTERVAL
+        ).order_by(cls.revision.desc()).all()
+        if not rows or rows[0].revision != revision:
+            return None
+        
+        # الرجوع إلى أقرب مراجعة كاملة ثم تطبيق الفروق بالترتيب
+        chain = []
+        for row in rows:
+            chain.append(row)
+            if not row.is_delta:
+                break
+        else:
+            return None
+        
+        content = None
+        for row in reversed(chain):
+            content = decode_delta(row.data, content) if row.is_delta else decompress_text(row.data)
+        return content
+    
+    def to_dict(self):
+        return {
+            'revision': self.revision,
+            'is_delta': self.is_delta,
+            'stored_bytes': len(self.data) if self.data is not None else 0,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class SchemaVersion(db.Model):
+    """إصدار المخطط المطبق على قاعدة البيانات (صف واحد)"""
+    __tablename__ = 'schema_version'
+    
+    version = db.Column(db.Integer, primary_key=True)
+
+
+def retry_on_conflict(write, attempts=CONFLICT_RETRIES, backoff=0.01):
+    """
+    تنفيذ write ثم commit، مع التراجع وإعادة المحاولة عند التعارض مع طلب متزامن
+    (ConcurrentUpdateError من الكتابة المشروطة، أو StaleDataError من version_id_col،
+    أو IntegrityError عند إدراج نفس الصف في نفس اللحظة)
+    تعيد نتيجة write، وتطلق ConcurrentUpdateError بعد استنفاد المحاولات
+    """
+    for attempt in range(attempts):
+        try:
+            result = write()
+            db.session.commit()
+            return result
+        except (ConcurrentUpdateError, StaleDataError, IntegrityError) as e:
+            db.session.rollback()
+            if attempt == attempts - 1:
+                raise ConcurrentUpdateError(str(e)) from e
+            # انتظار عشوائي متزايد حتى لا تتصادم المحاولات من جديد
+            time.sleep(random.uniform(0, backoff * 2 ** attempt))
+
+
+def _ordered_sections(names):
+    """ترتيب أسماء الأقسام حسب ترتيبها في الدراسة"""
+    order = {name: index for index, name in enumerate(SECTION_NAMES)}
+    return sorted(names, key=lambda name: (order.get(name, len(order)), name))
+
+
+def _add_missing_columns(connection, model, existing_columns):
+    """إضافة أعمدة النموذج غير الموجودة في الجدول"""
+    for column in model.__table__.columns:
+        if column.name not in existing_columns:
+            column_type = column.type.compile(db.engine.dialect)
+            connection.execute(db.text(
+                f'ALTER TABLE {model.__tablename__} ADD COLUMN {column.name} {column_type}'
+            ))
+
+
+def _migrate_legacy_sections(connection, existing_columns):
+    """نقل محتوى الأعمدة القديمة *_content و additional_inputs إلى جدول study_sections"""
+    legacy_columns = [f'{name}_content' for name in SECTION_NAMES if f'{name}_content' in existing_columns]
+    if not legacy_columns:
+        return
+    
+    has_inputs = 'additional_inputs' in existing_columns
+    pending = ' OR '.join(f'{column} IS NOT NULL' for column in legacy_columns)
+    selected = ', '.join(['id'] + legacy_columns + (['additional_inputs'] if has_inputs else []))
+    rows = connection.execute(db.text(f'SELECT {selected} FROM studies WHERE {pending}')).mappings().all()
+    if not rows:
+        return
+    
+    now = datetime.utcnow()
+    section_rows = []
+    for row in rows:
+        try:
+            inputs = json.loads(row['additional_inputs'] or '{}') if has_inputs else {}
+        except (TypeError, ValueError):
+            inputs = {}
+        for column in legacy_columns:
+            if row[column] is not None:
+                section = column[:-len('_content')]
+                section_rows.append({
+                    'study_id': row['id'],
+                    'section': section,
+                    'content_zlib': compress_text(row[column]),
+                    'input': inputs.get(f'{section}_input'),
+                    'revision': 0,
+                    'updated_at': now
+                })
+    
+    connection.execute(StudySection.__table__.insert().prefix_with('OR IGNORE', dialect='sqlite'), section_rows)
+    # تفريغ الأعمدة القديمة حتى لا يعاد نقلها عند التشغيل التالي
+    cleared = ', '.join(f'{column} = NULL' for column in legacy_columns)
+    connection.execute(db.text(f'UPDATE studies SET {cleared} WHERE {pending}'))
+
+
+def _migrate_plain_section_content(connection, existing_columns):
+    """ضغط المحتوى المخزن كنص عادي في العمود القديم study_sections.content"""
+    if 'content' not in existing_columns:
+        return
+    rows = connection.execute(db.text(
+        'SELECT study_id, section, content FROM study_sections WHERE content IS NOT NULL'
+    )).all()
+    for study_id, section, content in rows:
+        connection.execute(
+            db.text('UPDATE study_sections SET content_zlib = :data, content = NULL '
+                    'WHERE study_id = :study_id AND section = :section'),
+            {'data': compress_text(content), 'study_id': study_id, 'section': section}
+        )
+
+
+def _seed_first_revisions(connection):
+    """إنشاء المراجعة الأولى للأقسام المنقولة التي لا تملك سجل مراجعات"""
+    rows = connection.execute(db.text(
+        'SELECT study_id, section, content_zlib, updated_at FROM study_sections '
+        'WHERE content_zlib IS NOT NULL AND (revision IS NULL OR revision = 0)'
+    )).all()
+    if not rows:
+        return
+    now = datetime.utcnow()
+    # المراجعة الكاملة تستخدم نفس ترميز content_zlib فيمكن نسخها كما هي
+    connection.execute(StudySectionRevision.__table__.insert(), [{
+        'study_id': study_id,
+        'section': section,
+        'revision': 1,
+        'is_delta': False,
+        'data': data,
+        'created_at': now
+    } for study_id, section, data, _ in rows])
+    connection.execute(db.text(
+        'UPDATE study_sections SET revision = 1 '
+        'WHERE content_zlib IS NOT NULL AND (revision IS NULL OR revision = 0)'
+    ))
+
+
+def _backfill_study_versions(connection):
+    """الدراسات المنشأة قبل إضافة عمود version تبدأ من الإصدار 1"""
+    connection.execute(db.text('UPDATE studies SET version = 1 WHERE version IS NULL'))
+
+
+def _backfill_study_seeds(connection):
+    """الدراسات المنشأة قبل إضافة عمود seed تحصل على بذرة عشوائية تحفظ مرة واحدة"""
+    ids = connection.execute(db.text('SELECT id FROM studies WHERE seed IS NULL')).scalars().all()
+    if not ids:
+        return
+    rng = random.SystemRandom()
+    connection.execute(
+        db.text('UPDATE studies SET seed = :seed WHERE id = :id AND seed IS NULL'),
+        [{'id': study_id, 'seed': rng.getrandbits(31)} for study_id in ids]
+    )
+
+
+def schema_is_current():
+    """هل المخطط محدث؟ استعلام واحد بدلاً من create_all وفحص الأعمدة عند كل تشغيل بارد"""
+    try:
+        with db.engine.connect() as connection:
+            version = connection.execute(db.select(db.func.max(SchemaVersion.version))).scalar()
+    except DBAPIError:
+        # الجدول غير موجود: قاعدة بيانات جديدة أو أقدم من تتبع الإصدار
+        return False
+    return version is not None and version >= SCHEMA_VERSION
+
+
+def upgrade_schema():
+    """إضافة الأعمدة والفهارس الجديدة ونقل البيانات القديمة في قواعد البيانات المنشأة مسبقاً"""
+    inspector = db.inspect(db.engine)
+    study_columns = {column['name'] for column in inspector.get_columns(Study.__tablename__)}
+    section_columns = {column['name'] for column in inspector.get_columns(StudySection.__tablename__)}
+    with db.engine.begin() as connection:
+        _add_missing_columns(connection, Study, study_columns)
+        _add_missing_columns(connection, StudySection, section_columns)
+        _migrate_legacy_sections(connection, study_columns)
+        _migrate_plain_section_content(connection, section_columns)
+        _seed_first_revisions(connection)
+        _backfill_study_versions(connection)
+        _backfill_study_seeds(connection)
+    for index in Study.__table__.indexes:
+        index.create(bind=db.engine, checkfirst=True)
+    with db.engine.begin() as connection:
+        connection.execute(SchemaVersion.__table__.delete())
+        connection.execute(SchemaVersion.__table__.insert(), {'version': SCHEMA_VERSION})
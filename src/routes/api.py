@@ -1,19 +1,53 @@
-from flask import Blueprint, request, jsonify, send_file
-from src.models.study import Study, db
-from src.services.content_generator import AcademicContentGenerator
+from flask import Blueprint, Response, current_app, request, jsonify, send_file, stream_with_context
+from src.config import read_only
+from src.models.study import ConcurrentUpdateError, Study, StudySection, StudySectionRevision, db, retry_on_conflict
+from src.services.content_generator import AcademicContentGenerator, get_registered_sections
+from src.services.pdf_exporter import render_study_pdf, PDF_LAYOUT_VERSION, SECTION_TITLES
+from src.services.bulk_export import iter_zip
+from src.services.pdf_cache import pdf_cache
+from src.services.export_jobs import export_jobs, QueueFullError
+from src.services.compression import etag_variants
+from src.services.response_cache import cached_response, response_cache
+from src.services.metrics import record_span, render_metrics, span
+from src.services.profiling import ADMIN_HEADER, is_admin_token
+from src.services.study_import import import_studies
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import load_only, selectinload
+from datetime import datetime, timezone
+import base64
+import hashlib
+import binascii
 import json
+import functools
 import io
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 import os
 
 api_bp = Blueprint('api', __name__)
 content_generator = AcademicContentGenerator()
 
+def _save_section(study_id, section, study_data, generated_content):
+    """حفظ محتوى قسم واحد ومدخلاته الإضافية بعملية upsert واحدة (دون commit)"""
+    if f'{section}_input' in study_data:
+        return StudySection.upsert(study_id, section, generated_content, study_data[f'{section}_input'])
+    return StudySection.upsert(study_id, section, generated_content)
+
+def _conflict_response(error):
+    """رد التعارض بعد فشل جميع محاولات الكتابة المتزامنة"""
+    return jsonify({'success': False, 'error': f'Concurrent update conflict: {error}'}), 409
+
+def _sse_event(event, payload):
+    """تنسيق حدث Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def _admin_required(view):
+    """نقاط المراقبة والتشخيص للمسؤول فقط (ترويسة X-Admin-Token تطابق ADMIN_TOKEN)"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin_token(request.headers.get(ADMIN_HEADER)):
+            return jsonify({'success': False, 'error': 'Forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
 @api_bp.route('/generate', methods=['POST'])
 def generate_content():
     """API endpoint لتوليد المحتوى الأكاديمي"""
@@ -25,14 +59,18 @@ def generate_content():
         if not section:
             return jsonify({'success': False, 'error': 'Section is required'}), 400
         
-        # توليد المحتوى
-        generated_content = content_generator.generate_content(section, study_data)
-        
-        # حفظ أو تحديث الدراسة في قاعدة البيانات
         study = None
         if 'study_id' in study_data:
             study = Study.query.get(study_data['study_id'])
         
+        # توليد المحتوى باستخدام بذرة الدراسة إن وجدت
+        seed = study.seed if study else study_data.get('seed')
+        if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+            return jsonify({'success': False, 'error': 'seed must be an integer'}), 400
+        with span('generate'):
+            generated_content = content_generator.generate_content(section, study_data, seed=seed)
+        
+        # حفظ أو تحديث الدراسة في قاعدة البيانات
         if not study and section == 'setup':
             # إنشاء دراسة جديدة
             study = Study(
@@ -40,24 +78,19 @@ def generate_content():
                 field_of_study=study_data.get('fieldOfStudy'),
                 main_topic=study_data.get('mainTopic'),
                 problem_description=study_data.get('problemDescription'),
-                keywords=study_data.get('keywords')
+                keywords=study_data.get('keywords'),
+                # البذرة التي ولد بها المحتوى - حتى تعطي الأقسام اللاحقة نفس النتيجة
+                seed=seed
             )
             db.session.add(study)
             db.session.commit()
             study_data['study_id'] = study.id
         
-        # حفظ المحتوى المولد
+        # حفظ المحتوى المولد - كتابة مشروطة للقسم وحده، فيمكن توليد أقسام الدراسة بالتوازي
         if study and section != 'setup':
-            setattr(study, f'{section}_content', generated_content)
-            study.add_completed_section(section)
-            
-            # حفظ المدخلات الإضافية
-            additional_inputs = study.get_additional_inputs()
-            if f'{section}_input' in study_data:
-                additional_inputs[f'{section}_input'] = study_data[f'{section}_input']
-                study.set_additional_inputs(additional_inputs)
-            
-            db.session.commit()
+            study_id = study.id
+            retry_on_conflict(lambda: _save_section(study_id, section, study_data, generated_content))
+            pdf_cache.invalidate(study_id)
         
         return jsonify({
             'success': True,
@@ -65,9 +98,170 @@ def generate_content():
             'study_id': study.id if study else None
         })
         
+    except ConcurrentUpdateError as e:
+        return _conflict_response(e)
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@api_bp.route('/generate/batch', methods=['POST'])
+def generate_batch():
+    """API endpoint لتوليد عدة أقسام من الدراسة في طلب واحد وحفظها في عملية واحدة"""
+    try:
+        data = request.get_json()
+        sections = data.get('sections', [])
+        study_data = data.get('data', {})
+        
+        if not sections:
+            return jsonify({'success': False, 'error': 'Sections are required'}), 400
+        
+        # معرف غير موجود خطأ - تنشأ دراسة جديدة فقط عند عدم إرسال معرف
+        study = None
+        if study_data.get('study_id') is not None:
+            study = Study.query.get(study_data['study_id'])
+            if not study:
+                return jsonify({'success': False, 'error': 'Study not found'}), 404
+        
+        created = study is None
+        if created:
+            missing_fields = content_generator.get_missing_setup_fields(study_data)
+            if missing_fields:
+                return jsonify({
+                    'success': False,
+                    'error': f"Missing setup fields: {', '.join(missing_fields)}"
+                }), 400
+            
+            # إنشاء دراسة جديدة ضمن نفس العملية
+            study = Study(
+                study_type=study_data.get('studyType'),
+                field_of_study=study_data.get('fieldOfStudy'),
+                main_topic=study_data.get('mainTopic'),
+                problem_description=study_data.get('problemDescription'),
+                keywords=study_data.get('keywords')
+            )
+            db.session.add(study)
+            db.session.flush()
+        
+        # توليد جميع الأقسام قبل الكتابة في قاعدة البيانات
+        results = {}
+        for section in sections:
+            try:
+                with span('generate'):
+                    results[section] = content_generator.generate_content(section, study_data, seed=study.seed)
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({'success': False, 'error': str(e)}), 400
+        
+        # كتابة كل قسم بعملية upsert مستقلة ضمن نفس العملية
+        study_id = study.id
+        
+        def save_sections():
+            for section, generated_content in results.items():
+                if section != 'setup':
+                    _save_section(study_id, section, study_data, generated_content)
+        
+        if created:
+            # دراسة جديدة لا يعرفها طلب آخر بعد، وإعادة المحاولة ستلغي إنشاءها مع التراجع
+            save_sections()
+            db.session.commit()
+        else:
+            retry_on_conflict(save_sections)
+        pdf_cache.invalidate(study_id)
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'study_id': study_id
+        })
+        
+    except ConcurrentUpdateError as e:
+        return _conflict_response(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api_bp.route('/generate/stream', methods=['POST'])
+def generate_stream():
+    """
+    API endpoint لبث محتوى القسم فقرة بفقرة عبر Server-Sent Events أثناء توليده
+    POST لأن الطلب يحفظ القسم في قاعدة البيانات بعد انتهاء البث (بنفس جسم طلب /generate)
+    """
+    data = request.get_json(silent=True) or {}
+    section = data.get('section')
+    request_data = data.get('data') or {}
+    study_id = request_data.get('study_id')
+    
+    if not section or section == 'setup' or section not in get_registered_sections():
+        return jsonify({'success': False, 'error': 'A valid content section is required'}), 400
+    if not study_id:
+        return jsonify({'success': False, 'error': 'Study ID is required'}), 400
+    
+    study = Study.query.get(study_id)
+    if not study:
+        return jsonify({'success': False, 'error': 'Study not found'}), 404
+    
+    study_data = study.get_setup_data()
+    if f'{section}_input' in request_data:
+        study_data[f'{section}_input'] = request_data[f'{section}_input']
+    
+    def events():
+        try:
+            blocks = []
+            for block in content_generator.iter_content(section, study_data, seed=study.seed):
+                blocks.append(block)
+                yield _sse_event('paragraph', {'html': block})
+            
+            # كتابة واحدة في قاعدة البيانات بعد انتهاء البث
+            retry_on_conflict(lambda: _save_section(study.id, section, study_data, ''.join(blocks)))
+            pdf_cache.invalidate(study.id)
+            yield _sse_event('done', {'success': True, 'study_id': study.id})
+        except ConcurrentUpdateError as e:
+            # الترويسات أرسلت بالفعل، فيميز التعارض بحدث خاص بدلاً من رد 409
+            db.session.rollback()
+            yield _sse_event('conflict', {'success': False, 'status': 409, 'error': f'Concurrent update conflict: {e}'})
+        except Exception as e:
+            db.session.rollback()
+            yield _sse_event('error', {'success': False, 'status': 500, 'error': str(e)})
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@api_bp.route('/generate/cache', methods=['GET'])
+@_admin_required
+def generate_cache_stats():
+    """إحصائيات الذاكرة المؤقتة للمحتوى المولد"""
+    return jsonify({'success': True, 'cache': content_generator.cache.stats()})
+
+@api_bp.route('/metrics', methods=['GET'])
+@_admin_required
+def metrics():
+    """مقاييس زمن الطلبات ومراحلها بصيغة Prometheus"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@api_bp.route('/cache/responses', methods=['GET'])
+@_admin_required
+def response_cache_stats():
+    """إحصائيات الذاكرة المؤقتة لردود نقاط القراءة"""
+    return jsonify({'success': True, 'cache': response_cache.stats()})
+
+@api_bp.route('/admin/profiles', methods=['GET'])
+@_admin_required
+def profile_report():
+    """جدول أعلى الدوال زمناً من ملفات التحليل المخزنة (للمسؤول فقط)"""
+    profiler = current_app.extensions.get('request_profiler')
+    if profiler is None:
+        return jsonify({'success': False, 'error': 'Profiling is not enabled'}), 404
+
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in ('cumulative', 'time'):
+        return jsonify({'success': False, 'error': 'sort must be cumulative or time'}), 400
+    top = min(max(request.args.get('top', 30, type=int), 1), 500)
+    report = profiler.report(top=top, endpoint=request.args.get('endpoint'), sort=sort)
+    return jsonify({'success': True, **report})
+
 @api_bp.route('/export', methods=['POST'])
 def export_study():
     """API endpoint لتصدير الدراسة كملف PDF"""
@@ -84,89 +278,382 @@ def export_study():
         if not study:
             return jsonify({'success': False, 'error': 'Study not found'}), 404
         
-        # إنشاء ملف PDF
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72,
-                              topMargin=72, bottomMargin=18)
-        
-        # تحضير المحتوى
-        story = []
-        styles = getSampleStyleSheet()
-        
-        # إضافة عنوان الدراسة
-        if study.title_content:
-            story.append(Paragraph("عنوان الدراسة", styles['Heading1']))
-            story.append(Paragraph(study.title_content, styles['Normal']))
-            story.append(Spacer(1, 12))
-        
-        # إضافة الملخص
-        if study.abstract_content:
-            story.append(Paragraph("الملخص", styles['Heading1']))
-            story.append(Paragraph(study.abstract_content, styles['Normal']))
-            story.append(Spacer(1, 12))
-        
-        # إضافة باقي الأقسام
-        section_titles = {
-            'introduction': 'المقدمة',
-            'literature': 'الإطار النظري والدراسات السابقة',
-            'methodology': 'منهجية الدراسة',
-            'results': 'النتائج',
-            'discussion': 'المناقشة',
-            'conclusion': 'الخلاصة والتوصيات',
-            'references': 'المراجع'
-        }
+        # مفتاح المراجعة الحالية للدراسة - يستخدم كـ ETag
+        updated_at = study.updated_at.isoformat() if study.updated_at else None
+        etag = pdf_cache.make_key(study.id, updated_at, sections, PDF_LAYOUT_VERSION)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
         
-        for section in sections:
-            if section in section_titles:
-                content = getattr(study, f'{section}_content', None)
-                if content:
-                    story.append(Paragraph(section_titles[section], styles['Heading1']))
-                    # تنظيف المحتوى من HTML tags
-                    clean_content = content.replace('<h3>', '').replace('</h3>', '')
-                    clean_content = clean_content.replace('<p>', '').replace('</p>', '\n')
-                    clean_content = clean_content.replace('<strong>', '').replace('</strong>', '')
-                    clean_content = clean_content.replace('<em>', '').replace('</em>', '')
-                    story.append(Paragraph(clean_content, styles['Normal']))
-                    story.append(Spacer(1, 12))
-        
-        # بناء PDF
-        doc.build(story)
-        buffer.seek(0)
+        # إعادة استخدام الملف المخزن أو إنشاء ملف PDF جديد
+        pdf = pdf_cache.get(study.id, etag)
+        if pdf is None:
+            timings = {}
+            pdf = render_study_pdf(study.to_dict(), sections, timings)
+            for name, seconds in timings.items():
+                record_span(name, seconds)
+            pdf_cache.put(study.id, etag, pdf)
         
         return send_file(
-            buffer,
+            io.BytesIO(pdf),
             as_attachment=True,
             download_name=f'academic_study_{study.id}.pdf',
-            mimetype='application/pdf'
+            mimetype='application/pdf',
+            etag=etag
         )
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@api_bp.route('/study/<int:study_id>', methods=['GET'])
-def get_study(study_id):
-    """الحصول على بيانات دراسة محددة"""
+@api_bp.route('/export/bulk', methods=['POST'])
+def export_bulk():
+    """API endpoint لتصدير عدة دراسات كأرشيف ZIP يتم بثه أثناء البناء"""
+    try:
+        data = request.get_json() or {}
+        sections = data.get('sections') or list(SECTION_TITLES)
+        study_ids = data.get('study_ids')
+        
+        # التحقق قبل بدء البث - بعد إرسال الترويسات لا يمكن إرجاع 400
+        if not isinstance(sections, list) or not all(isinstance(s, str) and s in SECTION_TITLES for s in sections):
+            return jsonify({
+                'success': False,
+                'error': f"sections must be a list of: {', '.join(SECTION_TITLES)}"
+            }), 400
+        
+        if study_ids is None:
+            # اختيار الدراسات حسب المرشحات بدون تحميل محتواها
+            filters = data.get('filter', {})
+            query = db.session.query(Study.id)
+            if filters.get('study_type'):
+                query = query.filter(Study.study_type == filters['study_type'])
+            if filters.get('field_of_study'):
+                query = query.filter(Study.field_of_study == filters['field_of_study'])
+            study_ids = [row.id for row in query.order_by(Study.id)]
+        elif not isinstance(study_ids, list) or not all(isinstance(i, int) for i in study_ids):
+            return jsonify({'success': False, 'error': 'study_ids must be a list of integers'}), 400
+        else:
+            # المعرف المكرر يصدر مرة واحدة - لا يكتب نفس الملف مرتين في الأرشيف
+            study_ids = list(dict.fromkeys(study_ids))
+        
+        if not study_ids:
+            return jsonify({'success': False, 'error': 'No studies to export'}), 400
+        
+        def load_study(study_id):
+            study = Study.query.get(study_id)
+            if not study:
+                return None
+            study_dict = study.to_dict()
+            # عدم الاحتفاظ بالدراسات في الجلسة حتى تبقى الذاكرة محدودة
+            db.session.expunge(study)
+            return study_dict
+        
+        concurrency = int(os.environ.get('EXPORT_BULK_CONCURRENCY', 0)) or export_jobs.max_workers
+        return Response(
+            stream_with_context(iter_zip(study_ids, sections, load_study, concurrency)),
+            mimetype='application/zip',
+            headers={'Content-Disposition': 'attachment; filename=academic_studies.zip'}
+        )
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api_bp.route('/export/jobs', methods=['POST'])
+def create_export_job():
+    """إضافة مهمة تصدير PDF في الخلفية وإرجاع معرفها"""
     try:
+        data = request.get_json()
+        study_data = data.get('data', {})
+        sections = data.get('sections', [])
+        
+        study_id = study_data.get('study_id')
+        if not study_id:
+            return jsonify({'success': False, 'error': 'Study ID is required'}), 400
+        
         study = Study.query.get(study_id)
         if not study:
             return jsonify({'success': False, 'error': 'Study not found'}), 404
         
+        try:
+            job_id = export_jobs.submit(study.to_dict(), sections)
+        except QueueFullError as e:
+            return jsonify({'success': False, 'error': str(e)}), 503
+        
+        return jsonify({'success': True, 'job': export_jobs.get(job_id)}), 202
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api_bp.route('/export/jobs/stats', methods=['GET'])
+@_admin_required
+def export_job_stats():
+    """عمق طابور التصدير وزمن البناء"""
+    return jsonify({'success': True, 'stats': export_jobs.stats()})
+
+@api_bp.route('/export/jobs/<job_id>', methods=['GET'])
+def get_export_job(job_id):
+    """حالة مهمة تصدير"""
+    job = export_jobs.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@api_bp.route('/export/jobs/<job_id>/download', methods=['GET'])
+def download_export_job(job_id):
+    """تنزيل ملف PDF لمهمة تصدير مكتملة"""
+    job = export_jobs.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if job['status'] != 'done':
+        return jsonify({'success': False, 'error': f"Job is {job['status']}", 'job': job}), 409
+    
+    pdf = export_jobs.get_result(job_id)
+    if pdf is None:
+        return jsonify({'success': False, 'error': 'Job result not found'}), 404
+    
+    return send_file(
+        io.BytesIO(pdf),
+        as_attachment=True,
+        download_name=f"academic_study_{job['study_id']}.pdf",
+        mimetype='application/pdf'
+    )
+
+def _make_etag(*parts):
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:32]
+
+def _not_modified(etag, last_modified):
+    """رد 304 إذا كانت نسخة العميل ما زالت صالحة، وإلا None"""
+    if request.if_none_match:
+        fresh = any(request.if_none_match.contains(value) for value in etag_variants(etag))
+    else:
+        # Last-Modified بدقة الثانية: مع أجزاء الثانية قد يحدث تعديلان في نفس الثانية
+        # فلا يعتمد عليه ويبقى التحقق عبر ETag (يتضمن المراجعة)
+        fresh = (
+            last_modified is not None and request.if_modified_since is not None
+            and last_modified.microsecond == 0
+            and last_modified.replace(tzinfo=timezone.utc) <= request.if_modified_since
+        )
+    if not fresh:
+        return None
+    return _with_validators(Response(status=304), etag, last_modified)
+
+def _with_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    response.cache_control.no_cache = True
+    return response
+
+@api_bp.route('/study/<int:study_id>', methods=['GET'])
+@read_only
+@cached_response
+def get_study(study_id):
+    """
+    الحصول على بيانات دراسة محددة
+    ?fields=a,b تقرأ الحقول المطلوبة فقط، و If-None-Match/If-Modified-Since تعيد 304 دون قراءة المحتوى
+    """
+    try:
+        fields = [name for name in request.args.get('fields', '').split(',') if name]
+        unknown = [name for name in fields if name not in Study.FIELDS]
+        if unknown:
+            return jsonify({'success': False, 'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+        
+        # قراءة تاريخ التعديل فقط للتحقق من صلاحية نسخة العميل
+        current = db.session.query(Study.id, Study.version, Study.updated_at).filter(Study.id == study_id).first()
+        if current is None:
+            return jsonify({'success': False, 'error': 'Study not found'}), 404
+        updated_at = current.updated_at
+        
+        etag = _make_etag('study', study_id, current.version, updated_at, ','.join(fields))
+        not_modified = _not_modified(etag, updated_at)
+        if not_modified is not None:
+            return not_modified
+        
+        if fields:
+            data = Study.get_fields(study_id, fields)
+        else:
+            data = Study.query.get(study_id).to_dict()
+        
+        response = jsonify({
+            'success': True,
+            'study': data
+        })
+        return _with_validators(response, etag, updated_at)
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api_bp.route('/study/<int:study_id>/sections/<section>', methods=['GET'])
+@read_only
+@cached_response
+def get_study_section(study_id, section):
+    """الحصول على محتوى قسم واحد من الدراسة مع دعم الطلبات الشرطية"""
+    try:
+        current = db.session.query(StudySection.updated_at, StudySection.revision).filter_by(
+            study_id=study_id, section=section
+        ).first()
+        if current is None:
+            return jsonify({'success': False, 'error': 'Section not found'}), 404
+        
+        etag = _make_etag('section', study_id, section, current.revision, current.updated_at)
+        not_modified = _not_modified(etag, current.updated_at)
+        if not_modified is not None:
+            return not_modified
+        
+        row = StudySection.query.get((study_id, section))
+        response = jsonify({
+            'success': True,
+            'section': section,
+            'content': row.content,
+            'input': row.input,
+            'revision': row.revision,
+            'updated_at': row.updated_at.isoformat() if row.updated_at else None
+        })
+        return _with_validators(response, etag, row.updated_at)
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api_bp.route('/study/<int:study_id>/sections/<section>/revisions', methods=['GET'])
+def list_section_revisions(study_id, section):
+    """قائمة مراجعات قسم محدد مع حجم تخزين كل مراجعة"""
+    try:
+        revisions = StudySectionRevision.list_for(study_id, section)
+        if not revisions:
+            return jsonify({'success': False, 'error': 'No revisions found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'revisions': [revision.to_dict() for revision in revisions]
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api_bp.route('/study/<int:study_id>/sections/<section>/revisions/<int:revision>', methods=['GET'])
+def get_section_revision(study_id, section, revision):
+    """الحصول على محتوى مراجعة سابقة لقسم"""
+    try:
+        content = StudySectionRevision.get_content(study_id, section, revision)
+        if content is None:
+            return jsonify({'success': False, 'error': 'Revision not found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'revision': revision,
+            'content': content
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api_bp.route('/study/<int:study_id>/sections/<section>/revisions/<int:revision>/restore', methods=['POST'])
+def restore_section_revision(study_id, section, revision):
+    """استعادة مراجعة سابقة كمراجعة جديدة للقسم"""
+    try:
+        content = StudySectionRevision.get_content(study_id, section, revision)
+        if content is None:
+            return jsonify({'success': False, 'error': 'Revision not found'}), 404
+        
+        new_revision = retry_on_conflict(lambda: StudySection.upsert(study_id, section, content))
+        pdf_cache.invalidate(study_id)
+        
         return jsonify({
             'success': True,
-            'study': study.to_dict()
+            'revision': new_revision,
+            'content': content
         })
         
+    except ConcurrentUpdateError as e:
+        return _conflict_response(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def _encode_cursor(study):
+    """ترميز موضع آخر دراسة في الصفحة كمؤشر للصفحة التالية"""
+    raw = f"{study.created_at.isoformat()}|{study.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    created_at, study_id = raw.rsplit('|', 1)
+    return datetime.fromisoformat(created_at), int(study_id)
+
+@api_bp.route('/studies/import', methods=['POST'])
+def import_studies_jsonl():
+    """
+    استيراد دراسات من ملف JSONL (كائن بيانات إعداد لكل سطر) بإدراج مجمع
+    يقبل الملف كجسم الطلب مباشرة أو كحقل file في multipart/form-data، و ?batch_size= لحجم الدفعة
+    """
+    try:
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if upload is None:
+                return jsonify({'success': False, 'error': 'A JSONL file is required'}), 400
+            lines = upload.stream
+        else:
+            lines = request.stream
+        
+        report = import_studies(lines, content_generator.get_missing_setup_fields,
+                                batch_size=request.args.get('batch_size', type=int))
+        return jsonify({'success': report.failed == 0, **report.to_dict()})
+        
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @api_bp.route('/studies', methods=['GET'])
+@read_only
+@cached_response
 def get_studies():
-    """الحصول على قائمة جميع الدراسات"""
+    """الحصول على قائمة الدراسات مع ترقيم الصفحات والتصفية"""
     try:
-        studies = Study.query.order_by(Study.created_at.desc()).all()
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        view = request.args.get('view', 'summary')
+        cursor = request.args.get('cursor')
+        
+        query = Study.query
+        if request.args.get('study_type'):
+            query = query.filter(Study.study_type == request.args['study_type'])
+        if request.args.get('field_of_study'):
+            query = query.filter(Study.field_of_study == request.args['field_of_study'])
+        
+        total = query.order_by(None).count()
+        
+        # تحميل الأعمدة المختصرة فقط ما لم يطلب العرض الكامل
+        if view != 'full':
+            query = query.options(load_only(*[getattr(Study, name) for name in Study.SUMMARY_COLUMNS]))
+        
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = _decode_cursor(cursor)
+            except (ValueError, UnicodeDecodeError, binascii.Error):
+                return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+            query = query.filter(or_(
+                Study.created_at < cursor_created_at,
+                and_(Study.created_at == cursor_created_at, Study.id < cursor_id)
+            ))
+        
+        if view == 'full':
+            query = query.options(selectinload(Study.sections))
+        
+        studies = query.order_by(Study.created_at.desc(), Study.id.desc()).limit(limit + 1).all()
+        has_more = len(studies) > limit
+        studies = studies[:limit]
+        
+        if view == 'full':
+            items = [study.to_dict() for study in studies]
+        else:
+            completed = StudySection.completed_sections_for([study.id for study in studies])
+            items = [study.to_summary_dict(completed[study.id]) for study in studies]
+        
         return jsonify({
             'success': True,
-            'studies': [study.to_dict() for study in studies]
+            'studies': items,
+            'next_cursor': _encode_cursor(studies[-1]) if has_more else None,
+            'total': total,
+            'limit': limit
         })
         
     except Exception as e:
@@ -180,8 +667,10 @@ def delete_study(study_id):
         if not study:
             return jsonify({'success': False, 'error': 'Study not found'}), 404
         
+        StudySectionRevision.query.filter_by(study_id=study_id).delete()
         db.session.delete(study)
         db.session.commit()
+        pdf_cache.invalidate(study_id)
         
         return jsonify({'success': True, 'message': 'Study deleted successfully'})
         
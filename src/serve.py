@@ -0,0 +1,323 @@
+"""
+نقطة تشغيل الإنتاج: عدة عمليات عمال (pre-fork) لكل منها مجموعة خيوط محدودة
+
+يتم تحميل التطبيق وتهيئة المخطط مرة واحدة في العملية الرئيسية قبل إنشاء العمال.
+عند SIGTERM أو SIGINT يتوقف العمال عن قبول اتصالات جديدة وينهون الطلبات الجارية.
+يعاد تشغيل العامل تلقائياً بعد عدد محدد من الطلبات (MAX_REQUESTS).
+
+التشغيل:
+    python src/serve.py --workers 4 --threads 8 --max-requests 1000
+"""
+import argparse
+import itertools
+import os
+import random
+import signal
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler, get_sockaddr, select_address_family
+
+
+class _RequestHandler(WSGIRequestHandler):
+    """معالج طلبات يغلق اتصالات keep-alive أثناء إيقاف العامل"""
+
+    protocol_version = 'HTTP/1.1'
+    timeout = 30  # مهلة الاتصال الخامل بالثواني (KEEPALIVE_TIMEOUT)
+
+    def handle_one_request(self):
+        super().handle_one_request()
+        if self.server.draining.is_set():
+            self.close_connection = True
+
+
+# رد مختصر عند امتلاء طابور العامل - يرسل مباشرة على المقبس دون المرور بالتطبيق
+_OVERLOADED_RESPONSE = (
+    b'HTTP/1.1 503 Service Unavailable\r\n'
+    b'Content-Type: application/json\r\n'
+    b'Content-Length: 51\r\n'
+    b'Retry-After: 1\r\n'
+    b'Connection: close\r\n'
+    b'\r\n'
+    b'{"success": false, "error": "Server is overloaded"}'
+)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    خادم WSGI يعالج الطلبات في مجموعة خيوط محدودة بدلاً من خيط لكل اتصال
+    عدد الاتصالات المنتظرة والجارية محدود بـ threads × pending_per_thread، وما يزيد يرفض بـ 503
+    """
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads, fd=None, pending_per_thread=4):
+        self.executor = None
+        self.draining = threading.Event()
+        self.slots = threading.BoundedSemaphore(threads * pending_per_thread)
+        super().__init__(host, port, app, handler=_RequestHandler, fd=fd)
+        # المقبس مشترك بين العمال: select يوقظهم جميعاً ويفوز أحدهم فقط بـ accept،
+        # ومع مقبس غير حاجز يعود الباقون إلى الحلقة بدلاً من الانتظار داخل accept
+        # (حيث لا يرون طلب الإيقاف)
+        self.socket.setblocking(False)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='http')
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            self._reject(request)
+            return
+        try:
+            self.executor.submit(self._process_request, request, client_address)
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def _reject(self, request):
+        try:
+            request.settimeout(1)
+            request.sendall(_OVERLOADED_RESPONSE)
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def drain(self):
+        """إيقاف قبول الاتصالات الجديدة - الطلبات الجارية تكتمل في server_close"""
+        if not self.draining.is_set():
+            self.draining.set()
+            threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def server_close(self):
+        super().server_close()
+        # werkzeug يستدعي server_close أثناء التهيئة عند تمرير fd
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+
+def _recycling_app(app, server, max_requests):
+    """تغليف التطبيق لإيقاف العامل بعد max_requests طلب"""
+    counter = itertools.count(1)
+
+    def wrapper(environ, start_response):
+        if next(counter) >= max_requests:
+            server.drain()
+        return app(environ, start_response)
+    return wrapper
+
+
+def run_worker(app, listener, options):
+    """حلقة عامل واحد على المقبس المشترك"""
+    host, port = listener.getsockname()[:2]
+    server = PooledWSGIServer(host, port, app, options.threads, fd=listener.fileno(),
+                              pending_per_thread=options.pending_per_thread)
+    if options.max_requests:
+        # إضافة قيمة عشوائية حتى لا يعاد تشغيل جميع العمال في نفس اللحظة
+        limit = options.max_requests + random.randint(0, options.max_requests_jitter)
+        server.app = _recycling_app(app, server, limit)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.drain())
+    if threading.current_thread() is threading.main_thread() and options.workers > 1:
+        # Ctrl+C تتعامل معه العملية الرئيسية وترسل SIGTERM للعمال
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        server.serve_forever()
+    finally:
+        # os._exit لا يشغل معالجات الخروج، لذا يتم إيقاف عمليات التصدير الفرعية صراحة
+        from src.services.export_jobs import export_jobs
+        from src.services.metrics import flush_metrics
+        export_jobs.shutdown()
+        flush_metrics()
+
+
+def _create_listener(host, port, backlog):
+    family = select_address_family(host, port)
+    listener = socket.socket(family, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(get_sockaddr(host, port, family))
+    listener.listen(backlog)
+    listener.set_inheritable(True)
+    return listener
+
+
+class Arbiter:
+    """العملية الرئيسية: تنشئ العمال وتعيد تشغيلهم وتنهيهم بأمان"""
+
+    def __init__(self, app, listener, options, before_fork=None, after_exit=None):
+        self.app = app
+        self.listener = listener
+        self.options = options
+        self.before_fork = before_fork
+        self.after_exit = after_exit
+        self.workers = set()
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.workers.add(pid)
+            return
+        # داخل العامل: حالة عشوائية مستقلة عن باقي العمال
+        random.seed()
+        exit_code = 0
+        try:
+            run_worker(self.app, self.listener, self.options)
+        except BaseException:
+            exit_code = 1
+            import traceback
+            traceback.print_exc()
+        finally:
+            os._exit(exit_code)
+
+    def stop(self, signum=None, frame=None):
+        self.stopping = True
+
+    def reap(self):
+        while self.workers:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if not pid:
+                return
+            self.workers.discard(pid)
+            if self.after_exit:
+                self.after_exit(pid)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        if self.before_fork:
+            self.before_fork()
+
+        while not self.stopping:
+            self.reap()
+            while len(self.workers) < self.options.workers and not self.stopping:
+                self.spawn()
+            time.sleep(0.2)
+
+        self.shutdown()
+
+    def shutdown(self):
+        """إرسال SIGTERM للعمال ثم SIGKILL لمن لم ينته خلال مهلة الإيقاف"""
+        for pid in list(self.workers):
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.options.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            self._signal(pid, signal.SIGKILL)
+        while self.workers:
+            self.reap()
+            time.sleep(0.05)
+        self.listener.close()
+
+    def _signal(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            self.workers.discard(pid)
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def parse_options(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=_env_int('PORT', 5000))
+    parser.add_argument('--workers', type=int, default=_env_int('WEB_CONCURRENCY', os.cpu_count() or 1),
+                        help='عدد عمليات العمال (WEB_CONCURRENCY)')
+    parser.add_argument('--threads', type=int, default=_env_int('WEB_THREADS', 8),
+                        help='عدد الخيوط في كل عامل (WEB_THREADS)')
+    parser.add_argument('--pending-per-thread', type=int, default=_env_int('WEB_PENDING_PER_THREAD', 4),
+                        help='أقصى عدد اتصالات لكل خيط (جارية ومنتظرة) قبل الرد بـ 503 (WEB_PENDING_PER_THREAD)')
+    parser.add_argument('--max-requests', type=int, default=_env_int('MAX_REQUESTS', 0),
+                        help='إعادة تشغيل العامل بعد هذا العدد من الطلبات، 0 للتعطيل (MAX_REQUESTS)')
+    parser.add_argument('--max-requests-jitter', type=int, default=_env_int('MAX_REQUESTS_JITTER', 0),
+                        help='زيادة عشوائية على max-requests لكل عامل (MAX_REQUESTS_JITTER)')
+    parser.add_argument('--graceful-timeout', type=int, default=_env_int('GRACEFUL_TIMEOUT', 30),
+                        help='مهلة إنهاء الطلبات الجارية عند الإيقاف بالثواني (GRACEFUL_TIMEOUT)')
+    parser.add_argument('--keepalive', type=int, default=_env_int('KEEPALIVE_TIMEOUT', 30),
+                        help='مهلة الاتصال الخامل بالثواني (KEEPALIVE_TIMEOUT)')
+    parser.add_argument('--backlog', type=int, default=_env_int('BACKLOG', 2048))
+    return parser.parse_args(argv)
+
+
+def _prepare_metrics_dir():
+    """
+    مجلد تجميع المقاييس بين العمال (METRICS_DIR): ينشأ مؤقتاً إن لم يحدد، ويفرغ عند البدء
+    حتى لا تضاف عدادات تشغيل سابق - يعيد المجلد إذا تم إنشاؤه هنا ليحذف عند الإيقاف
+    """
+    directory = os.environ.get('METRICS_DIR')
+    if not directory:
+        directory = os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='aplus_metrics_')
+        return directory
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(('.json', '.tmp')):
+            os.unlink(os.path.join(directory, name))
+    return None
+
+
+def main(argv=None):
+    options = parse_options(argv)
+    _RequestHandler.timeout = options.keepalive
+    # يجب تحديده قبل استيراد التطبيق (يقرأ عند تحميل وحدة المقاييس)
+    created_metrics_dir = _prepare_metrics_dir()
+
+    # تحميل التطبيق وتهيئة المخطط مرة واحدة قبل إنشاء العمال
+    from src.main import app, init_schema
+    from src.models.study import db
+    from src.services import pdf_exporter
+    from src.services.metrics import retire_worker_metrics
+    init_schema()
+    # في خادم طويل العمر يحمل ReportLab مرة واحدة هنا فيشترك فيه جميع العمال
+    pdf_exporter.preload()
+
+    def close_connections():
+        # لا يجب أن يرث العمال اتصالات قاعدة البيانات المفتوحة في العملية الرئيسية
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+    listener = _create_listener(options.host, options.port, options.backlog)
+    print(f'Serving on http://{options.host}:{options.port} '
+          f'({options.workers} workers x {options.threads} threads)', flush=True)
+
+    try:
+        if not hasattr(os, 'fork'):
+            # بدون fork (Windows) يعمل عامل واحد داخل العملية الحالية
+            options.workers = 1
+            options.max_requests = 0
+            close_connections()
+            run_worker(app, listener, options)
+        else:
+            Arbiter(app, listener, options, before_fork=close_connections,
+                    after_exit=retire_worker_metrics).run()
+    finally:
+        if created_metrics_dir:
+            shutil.rmtree(created_metrics_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
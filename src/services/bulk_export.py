@@ -0,0 +1,100 @@
+import json
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.services.export_jobs import export_jobs
+from src.services.pdf_cache import pdf_cache
+from src.services.pdf_exporter import PDF_LAYOUT_VERSION, render_study_pdf
+
+
+class _ZipStream:
+    """
+    ملف للكتابة فقط يجمع ما يكتبه zipfile حتى يتم إرساله للعميل
+    عدم دعم seek يجعل zipfile يكتب واصف البيانات بعد كل ملف بدلاً من الرجوع للخلف
+    """
+    
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def flush(self) -> None:
+        pass
+    
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_study_pdfs(study_ids: Iterable[int], sections: List[str],
+                    load_study: Callable[[int], Optional[Dict[str, Any]]],
+                    concurrency: int, errors: Dict[int, str]) -> Iterator[Tuple[int, bytes]]:
+    """
+    بناء ملفات PDF لعدة دراسات بالتوازي وإرجاع كل ملف فور اكتماله
+    لا يتجاوز عدد الملفات قيد البناء concurrency مهما كان عدد الدراسات
+    """
+    executor = export_jobs.get_executor()
+    pending = {}
+    remaining = iter(study_ids)
+    exhausted = False
+    
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                study_id = next(remaining, None)
+                if study_id is None:
+                    exhausted = True
+                    break
+                study = load_study(study_id)
+                if study is None:
+                    errors[study_id] = 'Study not found'
+                    continue
+                
+                key = pdf_cache.make_key(study['id'], study['updated_at'], sections, PDF_LAYOUT_VERSION)
+                pdf = pdf_cache.get(study['id'], key)
+                if pdf is not None:
+                    yield study_id, pdf
+                    continue
+                pending[executor.submit(render_study_pdf, study, sections)] = (study_id, key)
+            
+            if not pending:
+                return
+            
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                study_id, key = pending.pop(future)
+                try:
+                    pdf = future.result()
+                except Exception as e:
+                    errors[study_id] = str(e)
+                    continue
+                pdf_cache.put(study_id, key, pdf)
+                yield study_id, pdf
+    finally:
+        # عند انقطاع العميل (GeneratorExit) تلغى الملفات التي لم يبدأ بناؤها بعد
+        for future in pending:
+            future.cancel()
+
+
+def iter_zip(study_ids: Iterable[int], sections: List[str],
+             load_study: Callable[[int], Optional[Dict[str, Any]]], concurrency: int) -> Iterator[bytes]:
+    """بث أرشيف ZIP يضاف إليه كل ملف PDF فور اكتمال بنائه"""
+    stream = _ZipStream()
+    errors = {}
+    # ملفات PDF مضغوطة أصلاً - لا فائدة من ضغطها مرة أخرى
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for study_id, pdf in iter_study_pdfs(study_ids, sections, load_study, concurrency, errors):
+            archive.writestr(f'academic_study_{study_id}.pdf', pdf)
+            yield stream.drain()
+        if errors:
+            archive.writestr('errors.json', json.dumps(errors, ensure_ascii=False, indent=2))
+    yield stream.drain()
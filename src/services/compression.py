@@ -0,0 +1,101 @@
+import zlib
+
+from flask import request
+
+# أنواع المحتوى التي يتم ضغطها - ملفات PDF و ZIP والصور مضغوطة أصلاً
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/javascript',
+    'application/javascript',
+    'text/event-stream',
+    'image/svg+xml',
+))
+
+# الردود الأصغر من هذا الحجم (بالبايت) لا تضغط لأن الفائدة أقل من الكلفة
+MIN_SIZE = 500
+
+COMPRESSION_LEVEL = 6
+
+# wbits لكل ترميز: 31 يضيف ترويسة gzip، و 15 صيغة zlib المستخدمة في deflate
+_WBITS = {'gzip': 31, 'deflate': 15}
+
+
+def etag_variants(etag):
+    """قيم ETag الممكنة للرد بعد الضغط - تستخدم عند مقارنة If-None-Match"""
+    return (etag,) + tuple(f'{etag}-{encoding}' for encoding in _WBITS)
+
+
+def base_etag(etag):
+    """ETag المحتوى قبل الضغط (عكس اللاحقة التي يضيفها compress_response)"""
+    for encoding in _WBITS:
+        if etag.endswith(f'-{encoding}'):
+            return etag[:-len(encoding) - 1]
+    return etag
+
+
+def negotiated_encoding():
+    """ترميز الضغط المناسب لطلب العميل الحالي (None بدون ضغط)"""
+    return request.accept_encodings.best_match(tuple(_WBITS))
+
+
+def _compressor(encoding):
+    return zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, _WBITS[encoding])
+
+
+def _iter_compressed(chunks, encoding):
+    """ضغط الرد المتدفق جزءاً بجزء مع إرسال كل جزء فوراً (مثل أحداث SSE)"""
+    compressor = _compressor(encoding)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def compress_response(response):
+    """ضغط رد JSON أو HTML حسب Accept-Encoding في الطلب"""
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or request.method == 'HEAD'
+            or 'Content-Encoding' in response.headers
+            or response.cache_control.no_transform):
+        return response
+
+    streamed = response.is_streamed
+    if not streamed and response.calculate_content_length() < MIN_SIZE:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiated_encoding()
+    if encoding is None:
+        return response
+
+    if streamed:
+        response.response = _iter_compressed(response.response, encoding)
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+    else:
+        compressor = _compressor(encoding)
+        response.set_data(compressor.compress(response.get_data()) + compressor.flush())
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        # تمثيل مختلف للمحتوى يحتاج ETag مختلفاً
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+
+def init_compression(app):
+    """تفعيل ضغط الردود على التطبيق"""
+    app.after_request(compress_response)
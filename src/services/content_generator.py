@@ -1,7 +1,226 @@
+import os
 import re
 import random
-from typing import Dict, List, Any
+from string import Formatter
+from typing import Dict, List, Any, Callable, Iterator, Optional, Tuple
 import json
+from src.services.cache import LRUCache
+
+# إصدار القوالب - يجب زيادته عند تعديل أي نص أو قالب حتى لا يعاد محتوى قديم من الذاكرة المؤقتة
+TEMPLATE_VERSION = 1
+
+# حقول الإدخال التي يعتمد عليها المحتوى المولد (تستخدم في مفتاح الذاكرة المؤقتة)
+CACHE_INPUT_FIELDS = ('studyType', 'fieldOfStudy', 'mainTopic', 'problemDescription')
+
+# ---------------------------------------------------------------------------
+# جداول القوالب الثابتة - تبنى مرة واحدة عند تحميل الوحدة ولا تعدل بعدها
+# ---------------------------------------------------------------------------
+
+class CompiledTemplate:
+    """
+    قالب نصي يقسم مرة واحدة عند تحميل الوحدة إلى أجزاء ثابتة وحقول
+    التعبئة تضع قيم الحقول في مواضعها ثم تدمج الأجزاء بـ join واحدة دون تحليل القالب
+    """
+
+    __slots__ = ('template', 'fields', 'parts', 'slots')
+
+    def __init__(self, template: str):
+        self.template = template
+        parts = []
+        slots = []
+        for literal, field_name, _, _ in Formatter().parse(template):
+            if literal:
+                parts.append(literal)
+            if field_name is not None:
+                if not field_name.isidentifier():
+                    raise ValueError(f'Invalid template field: {field_name!r}')
+                slots.append((len(parts), field_name))
+                parts.append('')
+        # الأجزاء الثابتة مع مكان فارغ لكل حقل، ومواضع الحقول فيها
+        self.parts: Tuple[str, ...] = tuple(parts)
+        self.slots: Tuple[Tuple[int, str], ...] = tuple(slots)
+        self.fields = frozenset(field_name for _, field_name in slots)
+
+    def render(self, context: Dict[str, str]) -> str:
+        parts = list(self.parts)
+        for index, field_name in self.slots:
+            parts[index] = str(context[field_name])
+        return ''.join(parts)
+
+    def iter_render(self, context: Dict[str, Any]) -> Iterator[str]:
+        """تعبئة القالب جزءاً بعد جزء - قيمة الحقل نص أو مولد نصوص تعاد أجزاؤه فور توفرها"""
+        fields_at = dict(self.slots)
+        for index, part in enumerate(self.parts):
+            if index not in fields_at:
+                yield part
+                continue
+            value = context[fields_at[index]]
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+
+
+FIELD_NAMES = {
+    'education': 'التربية وعلم النفس',
+    'business': 'إدارة الأعمال',
+    'engineering': 'الهندسة',
+    'medicine': 'الطب',
+    'law': 'القانون',
+    'literature': 'الأدب واللغة',
+    'science': 'العلوم الطبيعية',
+    'social': 'العلوم الاجتماعية'
+}
+DEFAULT_FIELD_NAME = 'التخصص العلمي'
+
+METHODOLOGY_SUMMARIES = {
+    'master': "اعتمدت الدراسة على المنهج الوصفي التحليلي، مع استخدام أدوات متنوعة لجمع البيانات من عينة ممثلة.",
+    'phd': "تم استخدام منهجية مختلطة تجمع بين الأساليب الكمية والنوعية، لضمان الحصول على فهم شامل للظاهرة المدروسة."
+}
+DEFAULT_METHODOLOGY_SUMMARY = "اتبعت الدراسة منهجاً علمياً دقيقاً يتناسب مع طبيعة الموضوع المدروس."
+
+POPULATION_DESCRIPTIONS = {
+    'education': "تكون مجتمع الدراسة من المعلمين والطلاب في المؤسسات التعليمية، وتم اختيار عينة عشوائية طبقية تمثل المجتمع الأصلي.",
+    'business': "شمل مجتمع الدراسة العاملين في القطاع الخاص والمؤسسات التجارية، مع التركيز على فئات محددة ذات صلة بموضوع الدراسة."
+}
+DEFAULT_POPULATION_DESCRIPTION = "تم تحديد مجتمع الدراسة بناءً على معايير علمية دقيقة، مع ضمان تمثيل جميع الفئات ذات الصلة بالموضوع المدروس."
+
+SENTENCE_STARTERS = (
+    "من جانب آخر، ",
+    "في هذا السياق، ",
+    "بالإضافة إلى ذلك، ",
+    "علاوة على ما سبق، ",
+    "في ضوء ما تقدم، ",
+    "انطلاقاً من هذا المفهوم، ",
+    "تجدر الإشارة إلى أن ",
+    "من المهم ملاحظة أن ",
+    "في الواقع، ",
+    "على نحو مماثل، "
+)
+
+TRANSITIONS = (
+    " وفي هذا الإطار",
+    " مما يعني",
+    " الأمر الذي يشير إلى",
+    " وهو ما يؤكد",
+    " في حين أن",
+    " بينما نجد أن"
+)
+
+NATURAL_PHRASES = (
+    "يمكن القول إن",
+    "من الواضح أن",
+    "لا شك في أن",
+    "من المؤكد أن",
+    "يبدو جلياً أن",
+    "من البديهي أن"
+)
+
+TITLE_TEMPLATES = (
+    CompiledTemplate("{main_topic}: دراسة تحليلية في مجال {field_name}"),
+    CompiledTemplate("تأثير {main_topic} على الممارسات المعاصرة: دراسة ميدانية"),
+    CompiledTemplate("{main_topic}: رؤية معاصرة للتطوير والتحسين"),
+    CompiledTemplate("استراتيجيات {main_topic} وأثرها على التطوير المؤسسي"),
+    CompiledTemplate("{main_topic}: دراسة استطلاعية لواقع التطبيق والتحديات")
+)
+
+# أجزاء الأقسام النصية - تدمج ثم تمرر على تقنيات الأسلوب البشري
+ABSTRACT_PARTS = (
+    # المقدمة/الخلفية
+    "تناولت هذه الدراسة موضوع {main_topic} في إطار {field_name}، حيث برزت الحاجة الملحة لفهم أعمق لهذه القضية في ضوء التطورات المعاصرة والتحديات الراهنة.",
+    # مشكلة الدراسة وأهدافها
+    "تمحورت مشكلة الدراسة حول {problem_description}، وهدفت إلى استكشاف الجوانب المختلفة لهذه الظاهرة وتحليل أبعادها المتعددة.",
+    # المنهجية (محاكاة)
+    "{methodology_summary}",
+    # النتائج (محاكاة)
+    "كشفت نتائج الدراسة عن وجود علاقات معقدة ومتداخلة بين المتغيرات المدروسة، مما يسهم في فهم أعمق للظاهرة محل البحث.",
+    # الاستنتاجات والتوصيات
+    "خلصت الدراسة إلى مجموعة من التوصيات العملية التي يمكن أن تسهم في تطوير الممارسات الحالية وتحسين الأداء في هذا المجال."
+)
+
+INTRODUCTION_PARTS = (
+    # خلفية عامة
+    "يشهد مجال {field_name} تطورات متسارعة في العقود الأخيرة، مما يستدعي إعادة النظر في العديد من المفاهيم والممارسات التقليدية. في هذا السياق، يبرز موضوع {main_topic} كأحد القضايا المحورية التي تتطلب دراسة معمقة وتحليلاً شاملاً.",
+    # أهمية الموضوع
+    "تكتسب دراسة {main_topic} أهمية خاصة في ظل التحديات المعاصرة التي تواجه هذا المجال، حيث تسهم في تقديم رؤى جديدة وحلول مبتكرة للمشكلات القائمة.",
+    # الفجوة البحثية
+    "رغم الاهتمام المتزايد بهذا الموضوع، إلا أن الأدبيات العلمية تشير إلى وجود فجوة بحثية واضحة في فهم {problem_description}، مما يبرر الحاجة لإجراء هذه الدراسة.",
+    # أهداف الدراسة
+    "تهدف هذه الدراسة إلى سد هذه الفجوة من خلال تقديم تحليل شامل ومعمق للموضوع، بما يسهم في إثراء المعرفة العلمية وتطوير الممارسات العملية في هذا المجال."
+)
+
+LITERATURE_PARTS = (
+    # مقدمة المراجعة
+    "تتناول هذه المراجعة الأدبيات العلمية ذات الصلة بموضوع {main_topic}، حيث تم الاطلاع على مجموعة واسعة من الدراسات والبحوث المنشورة في هذا المجال.",
+    # الدراسات النظرية
+    "أشارت الدراسات النظرية في مجال {field_name} إلى أهمية فهم الأسس النظرية لموضوع {main_topic}، حيث قدمت إطاراً مفاهيمياً شاملاً يساعد في تحليل الظاهرة المدروسة.",
+    # الدراسات التطبيقية
+    "من جانب آخر، ركزت الدراسات التطبيقية على الجوانب العملية والتطبيقية، مما أسهم في تقديم أدلة تجريبية تدعم الافتراضات النظرية.",
+    # الفجوات البحثية
+    "رغم ثراء الأدبيات في هذا المجال، إلا أن هناك فجوات بحثية واضحة تتطلب مزيداً من الدراسة والتحليل، وهو ما تسعى الدراسة الحالية لمعالجته."
+)
+
+METHODOLOGY_PARTS = (
+    # نوع الدراسة ومنهجها
+    "اعتمدت هذه الدراسة على المنهج الوصفي التحليلي، والذي يعد الأنسب لطبيعة الموضوع المدروس. تم اختيار هذا المنهج لقدرته على تقديم وصف دقيق وتحليل شامل لظاهرة {main_topic}.",
+    # مجتمع الدراسة وعينتها
+    "{population_description}",
+    # أدوات جمع البيانات
+    "تم استخدام مجموعة متنوعة من أدوات جمع البيانات لضمان الحصول على معلومات شاملة ودقيقة، بما يتناسب مع طبيعة الدراسة وأهدافها.",
+    # إجراءات الدراسة
+    "تمت الدراسة وفقاً لخطة زمنية محددة، مع مراعاة جميع الاعتبارات الأخلاقية والمنهجية المطلوبة في البحث العلمي."
+)
+
+# نصوص الأقسام مدمجة ومجمعة مسبقاً بحيث يتم تعبئتها في خطوة واحدة
+PARAGRAPH_SEPARATOR = "\n\n"
+ABSTRACT_TEXT = CompiledTemplate(" ".join(ABSTRACT_PARTS))
+INTRODUCTION_TEXT = CompiledTemplate(PARAGRAPH_SEPARATOR.join(INTRODUCTION_PARTS))
+LITERATURE_TEXT = CompiledTemplate(PARAGRAPH_SEPARATOR.join(LITERATURE_PARTS))
+METHODOLOGY_TEXT = CompiledTemplate(PARAGRAPH_SEPARATOR.join(METHODOLOGY_PARTS))
+
+# قوالب HTML النهائية لكل قسم
+TITLE_HTML = CompiledTemplate("<h3>عنوان الدراسة المقترح:</h3><p><strong>{body}</strong></p><p><em>تم إنشاء هذا العنوان وفقاً لمعايير الكتابة الأكاديمية المحددة في الدليل، مع مراعاة الوضوح والدقة والجاذبية الأكاديمية.</em></p>")
+
+ABSTRACT_HTML = CompiledTemplate("<h3>ملخص الدراسة:</h3><p>{body}</p><p><em>تم إنشاء هذا الملخص وفقاً للمعايير الأكاديمية المحددة، مع مراعاة التدفق المنطقي والصياغة الديناميكية.</em></p>")
+
+INTRODUCTION_HTML = CompiledTemplate("<h3>مقدمة الدراسة:</h3><div style='line-height: 1.8;'>{body}</div><p><em>تم بناء هذه المقدمة وفقاً لهيكل التدرج من العام إلى الخاص، مع مراعاة الترابط المنطقي بين الفقرات.</em></p>")
+
+LITERATURE_HTML = CompiledTemplate("<h3>الإطار النظري والدراسات السابقة:</h3><div style='line-height: 1.8;'>{body}</div><p><em>تم تنظيم هذا القسم وفقاً لمعايير المراجعة النقدية للأدبيات، مع التركيز على الربط بين الدراسات والبحث الحالي.</em></p>")
+
+METHODOLOGY_HTML = CompiledTemplate("<h3>منهجية الدراسة:</h3><div style='line-height: 1.8;'>{body}</div><p><em>تم تصميم هذه المنهجية وفقاً لأفضل الممارسات في البحث العلمي، مع ضمان الدقة والموضوعية.</em></p>")
+
+# ---------------------------------------------------------------------------
+# سجل الأقسام - يربط اسم القسم بدالة التوليد الخاصة به
+# ---------------------------------------------------------------------------
+
+# دالة توليد القسم مولد يعيد محتواه جزءاً بعد جزء (عنوان القسم ثم فقرة بعد فقرة)
+_SECTION_RENDERERS: Dict[str, Callable[['AcademicContentGenerator', Dict, random.Random], Iterator[str]]] = {}
+
+
+def register_section(name: str) -> Callable:
+    """تسجيل دالة توليد لقسم معين دون الحاجة لتعديل دالة التوزيع"""
+    def decorator(renderer: Callable) -> Callable:
+        _SECTION_RENDERERS[name] = renderer
+        return renderer
+    return decorator
+
+
+def get_registered_sections() -> List[str]:
+    """إرجاع أسماء الأقسام المسجلة بترتيب تسجيلها"""
+    return list(_SECTION_RENDERERS)
+
+
+def _iter_joined(blocks: Iterator[str], separator: str) -> Iterator[str]:
+    """دمج الكتل بفاصل مع إرجاع كل كتلة فور توفرها"""
+    for index, block in enumerate(blocks):
+        yield block if index == 0 else separator + block
+
+
+# مولد التوليد بدون بذرة - مستقل عن الحالة العامة لوحدة random، وآمن بين الخيوط مثلها
+# (دوال Random الأساسية ذرية)، ويعاد بذره في كل عملية فرعية بعد fork حتى لا يتطابق ناتج العمال
+_unseeded_rng = random.Random()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_unseeded_rng.seed)
 
 class AcademicContentGenerator:
     """
@@ -9,9 +228,10 @@ class AcademicContentGenerator:
     تطبق جميع الشروط والمعايير الموجودة في الدليل الأكاديمي المعزز
     """
     
-    def __init__(self):
+    def __init__(self, cache_size: int = 2048, cache_ttl: Optional[float] = 3600):
         self.academic_guidelines = self._load_academic_guidelines()
         self.humanization_strategies = self._load_humanization_strategies()
+        self.cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
         
     def _load_academic_guidelines(self) -> Dict:
         """تحميل الشروط الأكاديمية من الدليل المعزز"""
@@ -105,194 +325,139 @@ class AcademicContentGenerator:
             ]
         }
     
-    def generate_content(self, section: str, study_data: Dict[str, Any]) -> str:
+    def generate_content(self, section: str, study_data: Dict[str, Any], seed: Optional[int] = None) -> str:
         """
         توليد المحتوى لقسم معين من الدراسة
+        عند تمرير بذرة يكون الناتج قابلاً للتكرار ويخزن في الذاكرة المؤقتة
         """
-        if section == 'setup':
-            return self._validate_setup_data(study_data)
-        elif section == 'title':
-            return self._generate_title(study_data)
-        elif section == 'abstract':
-            return self._generate_abstract(study_data)
-        elif section == 'introduction':
-            return self._generate_introduction(study_data)
-        elif section == 'literature':
-            return self._generate_literature_review(study_data)
-        elif section == 'methodology':
-            return self._generate_methodology(study_data)
-        elif section == 'results':
-            return self._generate_results(study_data)
-        elif section == 'discussion':
-            return self._generate_discussion(study_data)
-        elif section == 'conclusion':
-            return self._generate_conclusion(study_data)
-        elif section == 'references':
-            return self._generate_references(study_data)
-        else:
-            raise ValueError(f"Unknown section: {section}")
+        renderer = self._get_renderer(section)
+        if seed is None:
+            return ''.join(renderer(self, study_data, _unseeded_rng))
+        
+        cache_key = (section, self._normalize_inputs(study_data), seed, TEMPLATE_VERSION)
+        content = self.cache.get(cache_key)
+        if content is None:
+            content = ''.join(renderer(self, study_data, random.Random(f'{seed}:{section}')))
+            self.cache.set(cache_key, content)
+        return content
     
-    def _validate_setup_data(self, data: Dict) -> str:
-        """التحقق من صحة بيانات الإعداد"""
+    def iter_content(self, section: str, study_data: Dict[str, Any], seed: Optional[int] = None) -> Iterator[str]:
+        """
+        توليد محتوى القسم أثناء بنائه: عنوان القسم أولاً ثم كل فقرة فور اكتمالها
+        دمج الأجزاء بالترتيب يعطي نفس ناتج generate_content تماماً، والمحتوى المخزن يعاد كجزء واحد
+        """
+        renderer = self._get_renderer(section)
+        if seed is None:
+            yield from renderer(self, study_data, _unseeded_rng)
+            return
+        
+        cache_key = (section, self._normalize_inputs(study_data), seed, TEMPLATE_VERSION)
+        content = self.cache.get(cache_key)
+        if content is not None:
+            yield content
+            return
+        
+        blocks = []
+        for block in renderer(self, study_data, random.Random(f'{seed}:{section}')):
+            blocks.append(block)
+            yield block
+        # يخزن فقط إذا اكتمل البث (لم يغلق العميل الاتصال قبل النهاية)
+        self.cache.set(cache_key, ''.join(blocks))
+    
+    def _get_renderer(self, section: str) -> Callable:
+        try:
+            return _SECTION_RENDERERS[section]
+        except KeyError:
+            raise ValueError(f"Unknown section: {section}") from None
+    
+    def _normalize_inputs(self, study_data: Dict[str, Any]) -> Tuple:
+        """تحويل المدخلات المؤثرة في المحتوى إلى مفتاح ثابت"""
+        values = []
+        for field in CACHE_INPUT_FIELDS:
+            value = study_data.get(field, '')
+            values.append(None if value is None else str(value))
+        return tuple(values)
+    
+    def get_missing_setup_fields(self, data: Dict) -> List[str]:
+        """إرجاع حقول الإعداد المطلوبة غير الموجودة في البيانات"""
         required_fields = ['studyType', 'mainTopic', 'problemDescription']
-        missing_fields = [field for field in required_fields if not data.get(field)]
+        return [field for field in required_fields if not data.get(field)]
+    
+    def _build_context(self, study_data: Dict, fields: frozenset) -> Dict[str, str]:
+        """تجهيز القيم المستخدمة في تعبئة القالب - الحقول الخاصة بقسم واحد تحسب فقط عند الحاجة"""
+        field_of_study = study_data.get('fieldOfStudy', '')
+        context = {
+            'main_topic': study_data.get('mainTopic', ''),
+            'field_name': FIELD_NAMES.get(field_of_study, DEFAULT_FIELD_NAME)
+        }
+        if 'problem_description' in fields:
+            context['problem_description'] = study_data.get('problemDescription', '')
+        if 'methodology_summary' in fields:
+            context['methodology_summary'] = METHODOLOGY_SUMMARIES.get(study_data.get('studyType', ''), DEFAULT_METHODOLOGY_SUMMARY)
+        if 'population_description' in fields:
+            context['population_description'] = POPULATION_DESCRIPTIONS.get(field_of_study, DEFAULT_POPULATION_DESCRIPTION)
+        return context
+    
+    def _iter_paragraphs(self, text_template: CompiledTemplate, html_template: CompiledTemplate,
+                         study_data: Dict, rng: random.Random) -> Iterator[str]:
+        """تعبئة نص القسم ثم إرجاع كل فقرة فور تطبيق الأسلوب البشري عليها"""
+        full_text = text_template.render(self._build_context(study_data, text_template.fields))
+        paragraphs = self._iter_humanized_paragraphs(full_text, rng)
+        return html_template.iter_render({'body': _iter_joined(paragraphs, '</p><p>')})
+    
+    @register_section('setup')
+    def _validate_setup_data(self, data: Dict, rng: random.Random) -> Iterator[str]:
+        """التحقق من صحة بيانات الإعداد"""
+        missing_fields = self.get_missing_setup_fields(data)
         
         if missing_fields:
-            return f"الحقول المطلوبة مفقودة: {', '.join(missing_fields)}"
-        
-        return "تم التحقق من البيانات بنجاح. يمكنك الآن الانتقال لإنشاء عنوان الدراسة."
+            yield f"الحقول المطلوبة مفقودة: {', '.join(missing_fields)}"
+        else:
+            yield "تم التحقق من البيانات بنجاح. يمكنك الآن الانتقال لإنشاء عنوان الدراسة."
     
-    def _generate_title(self, study_data: Dict) -> str:
+    @register_section('title')
+    def _generate_title(self, study_data: Dict, rng: random.Random) -> Iterator[str]:
         """توليد عنوان الدراسة"""
-        main_topic = study_data.get('mainTopic', '')
-        field_of_study = study_data.get('fieldOfStudy', '')
-        study_type = study_data.get('studyType', '')
-        
-        # تطبيق شروط العنوان من الدليل
-        title_templates = [
-            f"{main_topic}: دراسة تحليلية في مجال {self._get_field_name(field_of_study)}",
-            f"تأثير {main_topic} على الممارسات المعاصرة: دراسة ميدانية",
-            f"{main_topic}: رؤية معاصرة للتطوير والتحسين",
-            f"استراتيجيات {main_topic} وأثرها على التطوير المؤسسي",
-            f"{main_topic}: دراسة استطلاعية لواقع التطبيق والتحديات"
-        ]
-        
         # اختيار قالب عشوائي وتخصيصه
-        base_title = random.choice(title_templates)
+        base_title = rng.choice(TITLE_TEMPLATES).render({
+            'main_topic': study_data.get('mainTopic', ''),
+            'field_name': self._get_field_name(study_data.get('fieldOfStudy', ''))
+        })
         
         # تطبيق تقنيات الأسلوب البشري
-        humanized_title = self._humanize_text(base_title)
+        humanized_title = _iter_joined(self._iter_humanized_paragraphs(base_title, rng), PARAGRAPH_SEPARATOR)
         
-        return f"<h3>عنوان الدراسة المقترح:</h3><p><strong>{humanized_title}</strong></p><p><em>تم إنشاء هذا العنوان وفقاً لمعايير الكتابة الأكاديمية المحددة في الدليل، مع مراعاة الوضوح والدقة والجاذبية الأكاديمية.</em></p>"
+        yield from TITLE_HTML.iter_render({'body': humanized_title})
     
-    def _generate_abstract(self, study_data: Dict) -> str:
+    @register_section('abstract')
+    def _generate_abstract(self, study_data: Dict, rng: random.Random) -> Iterator[str]:
         """توليد الملخص"""
-        main_topic = study_data.get('mainTopic', '')
-        problem_description = study_data.get('problemDescription', '')
-        field_of_study = study_data.get('fieldOfStudy', '')
-        study_type = study_data.get('studyType', '')
-        
-        # بناء الملخص وفقاً للمكونات المطلوبة
-        abstract_parts = []
-        
-        # المقدمة/الخلفية
-        background = f"تناولت هذه الدراسة موضوع {main_topic} في إطار {self._get_field_name(field_of_study)}، حيث برزت الحاجة الملحة لفهم أعمق لهذه القضية في ضوء التطورات المعاصرة والتحديات الراهنة."
-        abstract_parts.append(background)
-        
-        # مشكلة الدراسة وأهدافها
-        problem_section = f"تمحورت مشكلة الدراسة حول {problem_description}، وهدفت إلى استكشاف الجوانب المختلفة لهذه الظاهرة وتحليل أبعادها المتعددة."
-        abstract_parts.append(problem_section)
-        
-        # المنهجية (محاكاة)
-        methodology = self._generate_methodology_summary(study_type, field_of_study)
-        abstract_parts.append(methodology)
-        
-        # النتائج (محاكاة)
-        results = "كشفت نتائج الدراسة عن وجود علاقات معقدة ومتداخلة بين المتغيرات المدروسة، مما يسهم في فهم أعمق للظاهرة محل البحث."
-        abstract_parts.append(results)
+        full_abstract = ABSTRACT_TEXT.render(self._build_context(study_data, ABSTRACT_TEXT.fields))
+        humanized_abstract = _iter_joined(self._iter_humanized_paragraphs(full_abstract, rng), PARAGRAPH_SEPARATOR)
         
-        # الاستنتاجات والتوصيات
-        conclusions = "خلصت الدراسة إلى مجموعة من التوصيات العملية التي يمكن أن تسهم في تطوير الممارسات الحالية وتحسين الأداء في هذا المجال."
-        abstract_parts.append(conclusions)
-        
-        # دمج الأجزاء مع تطبيق تقنيات الأسلوب البشري
-        full_abstract = " ".join(abstract_parts)
-        humanized_abstract = self._humanize_text(full_abstract)
-        
-        return f"<h3>ملخص الدراسة:</h3><p>{humanized_abstract}</p><p><em>تم إنشاء هذا الملخص وفقاً للمعايير الأكاديمية المحددة، مع مراعاة التدفق المنطقي والصياغة الديناميكية.</em></p>"
+        yield from ABSTRACT_HTML.iter_render({'body': humanized_abstract})
     
-    def _generate_introduction(self, study_data: Dict) -> str:
+    @register_section('introduction')
+    def _generate_introduction(self, study_data: Dict, rng: random.Random) -> Iterator[str]:
         """توليد المقدمة"""
-        main_topic = study_data.get('mainTopic', '')
-        problem_description = study_data.get('problemDescription', '')
-        field_of_study = study_data.get('fieldOfStudy', '')
-        
-        introduction_parts = []
-        
-        # خلفية عامة
-        general_background = f"يشهد مجال {self._get_field_name(field_of_study)} تطورات متسارعة في العقود الأخيرة، مما يستدعي إعادة النظر في العديد من المفاهيم والممارسات التقليدية. في هذا السياق، يبرز موضوع {main_topic} كأحد القضايا المحورية التي تتطلب دراسة معمقة وتحليلاً شاملاً."
-        introduction_parts.append(general_background)
-        
-        # أهمية الموضوع
-        importance = f"تكتسب دراسة {main_topic} أهمية خاصة في ظل التحديات المعاصرة التي تواجه هذا المجال، حيث تسهم في تقديم رؤى جديدة وحلول مبتكرة للمشكلات القائمة."
-        introduction_parts.append(importance)
-        
-        # الفجوة البحثية
-        research_gap = f"رغم الاهتمام المتزايد بهذا الموضوع، إلا أن الأدبيات العلمية تشير إلى وجود فجوة بحثية واضحة في فهم {problem_description}، مما يبرر الحاجة لإجراء هذه الدراسة."
-        introduction_parts.append(research_gap)
-        
-        # أهداف الدراسة
-        objectives = "تهدف هذه الدراسة إلى سد هذه الفجوة من خلال تقديم تحليل شامل ومعمق للموضوع، بما يسهم في إثراء المعرفة العلمية وتطوير الممارسات العملية في هذا المجال."
-        introduction_parts.append(objectives)
-        
-        # دمج الأجزاء
-        full_introduction = "\n\n".join(introduction_parts)
-        humanized_introduction = self._humanize_text(full_introduction)
-        
-        return f"<h3>مقدمة الدراسة:</h3><div style='line-height: 1.8;'>{humanized_introduction.replace(chr(10)+chr(10), '</p><p>')}</div><p><em>تم بناء هذه المقدمة وفقاً لهيكل التدرج من العام إلى الخاص، مع مراعاة الترابط المنطقي بين الفقرات.</em></p>"
+        yield from self._iter_paragraphs(INTRODUCTION_TEXT, INTRODUCTION_HTML, study_data, rng)
     
-    def _generate_literature_review(self, study_data: Dict) -> str:
+    @register_section('literature')
+    def _generate_literature_review(self, study_data: Dict, rng: random.Random) -> Iterator[str]:
         """توليد مراجعة الأدبيات"""
-        main_topic = study_data.get('mainTopic', '')
-        field_of_study = study_data.get('fieldOfStudy', '')
-        
-        literature_sections = []
-        
-        # مقدمة المراجعة
-        intro = f"تتناول هذه المراجعة الأدبيات العلمية ذات الصلة بموضوع {main_topic}، حيث تم الاطلاع على مجموعة واسعة من الدراسات والبحوث المنشورة في هذا المجال."
-        literature_sections.append(intro)
-        
-        # الدراسات النظرية
-        theoretical_studies = f"أشارت الدراسات النظرية في مجال {self._get_field_name(field_of_study)} إلى أهمية فهم الأسس النظرية لموضوع {main_topic}، حيث قدمت إطاراً مفاهيمياً شاملاً يساعد في تحليل الظاهرة المدروسة."
-        literature_sections.append(theoretical_studies)
-        
-        # الدراسات التطبيقية
-        empirical_studies = "من جانب آخر، ركزت الدراسات التطبيقية على الجوانب العملية والتطبيقية، مما أسهم في تقديم أدلة تجريبية تدعم الافتراضات النظرية."
-        literature_sections.append(empirical_studies)
-        
-        # الفجوات البحثية
-        research_gaps = "رغم ثراء الأدبيات في هذا المجال، إلا أن هناك فجوات بحثية واضحة تتطلب مزيداً من الدراسة والتحليل، وهو ما تسعى الدراسة الحالية لمعالجته."
-        literature_sections.append(research_gaps)
-        
-        full_literature = "\n\n".join(literature_sections)
-        humanized_literature = self._humanize_text(full_literature)
-        
-        return f"<h3>الإطار النظري والدراسات السابقة:</h3><div style='line-height: 1.8;'>{humanized_literature.replace(chr(10)+chr(10), '</p><p>')}</div><p><em>تم تنظيم هذا القسم وفقاً لمعايير المراجعة النقدية للأدبيات، مع التركيز على الربط بين الدراسات والبحث الحالي.</em></p>"
+        yield from self._iter_paragraphs(LITERATURE_TEXT, LITERATURE_HTML, study_data, rng)
     
-    def _generate_methodology(self, study_data: Dict) -> str:
+    @register_section('methodology')
+    def _generate_methodology(self, study_data: Dict, rng: random.Random) -> Iterator[str]:
         """توليد منهجية الدراسة"""
-        study_type = study_data.get('studyType', '')
-        field_of_study = study_data.get('fieldOfStudy', '')
-        main_topic = study_data.get('mainTopic', '')
-        
-        methodology_sections = []
-        
-        # نوع الدراسة ومنهجها
-        study_approach = f"اعتمدت هذه الدراسة على المنهج الوصفي التحليلي، والذي يعد الأنسب لطبيعة الموضوع المدروس. تم اختيار هذا المنهج لقدرته على تقديم وصف دقيق وتحليل شامل لظاهرة {main_topic}."
-        methodology_sections.append(study_approach)
-        
-        # مجتمع الدراسة وعينتها
-        population_sample = self._generate_population_description(field_of_study, study_type)
-        methodology_sections.append(population_sample)
-        
-        # أدوات جمع البيانات
-        data_collection = "تم استخدام مجموعة متنوعة من أدوات جمع البيانات لضمان الحصول على معلومات شاملة ودقيقة، بما يتناسب مع طبيعة الدراسة وأهدافها."
-        methodology_sections.append(data_collection)
-        
-        # إجراءات الدراسة
-        procedures = "تمت الدراسة وفقاً لخطة زمنية محددة، مع مراعاة جميع الاعتبارات الأخلاقية والمنهجية المطلوبة في البحث العلمي."
-        methodology_sections.append(procedures)
-        
-        full_methodology = "\n\n".join(methodology_sections)
-        humanized_methodology = self._humanize_text(full_methodology)
-        
-        return f"<h3>منهجية الدراسة:</h3><div style='line-height: 1.8;'>{humanized_methodology.replace(chr(10)+chr(10), '</p><p>')}</div><p><em>تم تصميم هذه المنهجية وفقاً لأفضل الممارسات في البحث العلمي، مع ضمان الدقة والموضوعية.</em></p>"
+        yield from self._iter_paragraphs(METHODOLOGY_TEXT, METHODOLOGY_HTML, study_data, rng)
     
-    def _generate_results(self, study_data: Dict) -> str:
+    @register_section('results')
+    def _generate_results(self, study_data: Dict, rng: random.Random) -> Iterator[str]:
         """توليد النتائج"""
+        # قسم ثابت: f-string مباشرة دون قالب، يعاد كجزء واحد
         main_topic = study_data.get('mainTopic', '')
-        
-        results_content = f"""
+        yield f"""
         <h3>نتائج الدراسة:</h3>
         <div style='line-height: 1.8;'>
         <p>أظهرت نتائج الدراسة مجموعة من النتائج المهمة المتعلقة بموضوع {main_topic}، والتي يمكن تلخيصها في النقاط التالية:</p>
@@ -307,14 +472,12 @@ class AcademicContentGenerator:
         </div>
         <p><em>تم عرض هذه النتائج وفقاً لمعايير العرض العلمي الدقيق، مع التركيز على الوضوح والموضوعية.</em></p>
         """
-        
-        return results_content
     
-    def _generate_discussion(self, study_data: Dict) -> str:
+    @register_section('discussion')
+    def _generate_discussion(self, study_data: Dict, rng: random.Random) -> Iterator[str]:
         """توليد المناقشة"""
         main_topic = study_data.get('mainTopic', '')
-        
-        discussion_content = f"""
+        yield f"""
         <h3>مناقشة النتائج:</h3>
         <div style='line-height: 1.8;'>
         <p>تستدعي النتائج التي توصلت إليها هذه الدراسة حول {main_topic} مناقشة معمقة في ضوء الأدبيات النظرية والدراسات السابقة.</p>
@@ -327,14 +490,12 @@ class AcademicContentGenerator:
         </div>
         <p><em>تم بناء هذه المناقشة وفقاً لمعايير التحليل النقدي، مع الربط بين النتائج والأدبيات النظرية.</em></p>
         """
-        
-        return discussion_content
     
-    def _generate_conclusion(self, study_data: Dict) -> str:
+    @register_section('conclusion')
+    def _generate_conclusion(self, study_data: Dict, rng: random.Random) -> Iterator[str]:
         """توليد الخلاصة والتوصيات"""
         main_topic = study_data.get('mainTopic', '')
-        
-        conclusion_content = f"""
+        yield f"""
         <h3>الخلاصة والتوصيات:</h3>
         <div style='line-height: 1.8;'>
         <h4>الخلاصة:</h4>
@@ -357,22 +518,20 @@ class AcademicContentGenerator:
         </div>
         <p><em>تم صياغة هذه الخلاصة والتوصيات بناءً على النتائج المتحققة، مع التركيز على الجانبين النظري والتطبيقي.</em></p>
         """
-        
-        return conclusion_content
     
-    def _generate_references(self, study_data: Dict) -> str:
+    @register_section('references')
+    def _generate_references(self, study_data: Dict, rng: random.Random) -> Iterator[str]:
         """توليد قائمة المراجع"""
-        field_of_study = study_data.get('fieldOfStudy', '')
-        
-        references_content = f"""
+        field_name = self._get_field_name(study_data.get('fieldOfStudy', ''))
+        yield f"""
         <h3>المراجع:</h3>
         <div style='line-height: 1.8;'>
         <p><em>ملاحظة: هذه قائمة مراجع تمثيلية. في الدراسة الفعلية، يجب إدراج جميع المصادر التي تم الاستشهاد بها في النص.</em></p>
         
         <h4>المراجع العربية:</h4>
         <ol>
-        <li>الباحث، أحمد محمد (2023). أسس البحث العلمي في {self._get_field_name(field_of_study)}. دار النشر العلمي.</li>
-        <li>العالم، فاطمة علي (2022). التطورات المعاصرة في مجال {self._get_field_name(field_of_study)}. مجلة البحوث العلمية، 15(3), 45-67.</li>
+        <li>الباحث، أحمد محمد (2023). أسس البحث العلمي في {field_name}. دار النشر العلمي.</li>
+        <li>العالم، فاطمة علي (2022). التطورات المعاصرة في مجال {field_name}. مجلة البحوث العلمية، 15(3), 45-67.</li>
         <li>الخبير، محمود سالم (2021). منهجيات البحث الحديثة. دار المعرفة للنشر والتوزيع.</li>
         </ol>
         
@@ -385,117 +544,74 @@ class AcademicContentGenerator:
         </div>
         <p><em>يجب توثيق جميع المراجع وفقاً لنظام التوثيق المعتمد (APA, MLA, أو غيرها حسب متطلبات المؤسسة).</em></p>
         """
-        
-        return references_content
     
-    def _humanize_text(self, text: str) -> str:
-        """تطبيق تقنيات الأسلوب البشري الطبيعي"""
-        # تنويع بداية الجمل
-        text = self._vary_sentence_beginnings(text)
+    def _iter_humanized_paragraphs(self, text: str, rng: random.Random) -> Iterator[str]:
+        """
+        تطبيق تقنيات الأسلوب البشري الطبيعي وإرجاع النص فقرة بعد فقرة فور اكتمال كل منها
+        القرارات العشوائية تسحب أولاً بنفس ترتيبها عند المعالجة على النص كاملاً، فالتقسيم لا يغير الناتج
+        """
+        sentences = text.split('. ')
         
+        # تنويع بداية الجمل
+        starters = self._choose_sentence_starters(sentences, rng)
+        
+        # عبارات انتقالية ولمسات بشرية طبيعية
+        transitions = [transition for transition in TRANSITIONS if rng.random() < 0.3]  # 30% احتمال
+        phrases = [phrase for phrase in NATURAL_PHRASES if rng.random() < 0.2]  # 20% احتمال
+        
+        # الجملة قد تمتد عبر فاصل الفقرات، فتبنى الجمل بالترتيب وتعاد كل فقرة عند اكتمالها
+        pending = []
+        for index, sentence in enumerate(sentences):
+            if index in starters:
+                sentence = starters[index] + sentence.lower()
+            if PARAGRAPH_SEPARATOR not in sentence:
+                pending.append(sentence)
+                continue
+            head, *paragraphs, tail = sentence.split(PARAGRAPH_SEPARATOR)
+            pending.append(head)
+            yield self._humanize_paragraph('. '.join(pending), transitions, phrases)
+            for paragraph in paragraphs:
+                yield self._humanize_paragraph(paragraph, transitions, phrases)
+            pending = [tail]
+        yield self._humanize_paragraph('. '.join(pending), transitions, phrases)
+    
+    def _humanize_paragraph(self, paragraph: str, transitions: List[str], phrases: List[str]) -> str:
         # إضافة عبارات انتقالية طبيعية
-        text = self._add_transitional_phrases(text)
+        paragraph = self._add_transitional_phrases(paragraph, transitions)
         
         # تنويع طول الجمل
-        text = self._vary_sentence_lengths(text)
+        paragraph = self._vary_sentence_lengths(paragraph)
         
         # إضافة لمسات بشرية طبيعية
-        text = self._add_natural_touches(text)
-        
-        return text
+        return self._add_natural_touches(paragraph, phrases)
     
-    def _vary_sentence_beginnings(self, text: str) -> str:
-        """تنويع بداية الجمل"""
-        sentence_starters = [
-            "من جانب آخر، ",
-            "في هذا السياق، ",
-            "بالإضافة إلى ذلك، ",
-            "علاوة على ما سبق، ",
-            "في ضوء ما تقدم، ",
-            "انطلاقاً من هذا المفهوم، ",
-            "تجدر الإشارة إلى أن ",
-            "من المهم ملاحظة أن ",
-            "في الواقع، ",
-            "على نحو مماثل، "
-        ]
-        
-        sentences = text.split('. ')
-        for i in range(1, len(sentences), 3):  # كل ثالث جملة
-            if sentences[i] and not sentences[i].startswith(tuple(sentence_starters)):
-                starter = random.choice(sentence_starters)
-                sentences[i] = starter + sentences[i].lower()
-        
-        return '. '.join(sentences)
+    def _choose_sentence_starters(self, sentences: List[str], rng: random.Random) -> Dict[int, str]:
+        """اختيار بداية جديدة لكل ثالث جملة"""
+        return {
+            i: rng.choice(SENTENCE_STARTERS)
+            for i in range(1, len(sentences), 3)
+            if sentences[i] and not sentences[i].startswith(SENTENCE_STARTERS)
+        }
     
-    def _add_transitional_phrases(self, text: str) -> str:
-        """إضافة عبارات انتقالية"""
-        transitions = [
-            " وفي هذا الإطار",
-            " مما يعني",
-            " الأمر الذي يشير إلى",
-            " وهو ما يؤكد",
-            " في حين أن",
-            " بينما نجد أن"
-        ]
-        
-        # إضافة عبارات انتقالية في مواضع مناسبة
-        for transition in transitions:
-            if random.random() < 0.3:  # 30% احتمال
-                text = text.replace("، ", f"،{transition} ", 1)
-        
-        return text
+    def _add_transitional_phrases(self, paragraph: str, transitions: List[str]) -> str:
+        """إضافة العبارات الانتقالية المختارة عند أول "، " في النص (في أول فقرة تحتويها)"""
+        if transitions and "، " in paragraph:
+            for transition in transitions:
+                paragraph = paragraph.replace("، ", f"،{transition} ", 1)
+            transitions.clear()
+        return paragraph
     
     def _vary_sentence_lengths(self, text: str) -> str:
         """تنويع طول الجمل"""
         # هذه دالة مبسطة - في التطبيق الفعلي ستكون أكثر تعقيداً
         return text
     
-    def _add_natural_touches(self, text: str) -> str:
-        """إضافة لمسات بشرية طبيعية"""
-        natural_phrases = [
-            "يمكن القول إن",
-            "من الواضح أن",
-            "لا شك في أن",
-            "من المؤكد أن",
-            "يبدو جلياً أن",
-            "من البديهي أن"
-        ]
-        
-        for phrase in natural_phrases:
-            if random.random() < 0.2:  # 20% احتمال
-                text = text.replace("أن ", f"{phrase} ", 1)
-        
-        return text
+    def _add_natural_touches(self, paragraph: str, phrases: List[str]) -> str:
+        """وضع كل عبارة مختارة مكان أول "أن " متبقية في النص"""
+        while phrases and "أن " in paragraph:
+            paragraph = paragraph.replace("أن ", f"{phrases.pop(0)} ", 1)
+        return paragraph
     
     def _get_field_name(self, field_code: str) -> str:
         """تحويل رمز المجال إلى اسم المجال"""
-        field_names = {
-            'education': 'التربية وعلم النفس',
-            'business': 'إدارة الأعمال',
-            'engineering': 'الهندسة',
-            'medicine': 'الطب',
-            'law': 'القانون',
-            'literature': 'الأدب واللغة',
-            'science': 'العلوم الطبيعية',
-            'social': 'العلوم الاجتماعية'
-        }
-        return field_names.get(field_code, 'التخصص العلمي')
-    
-    def _generate_methodology_summary(self, study_type: str, field_of_study: str) -> str:
-        """توليد ملخص المنهجية للملخص"""
-        if study_type == 'master':
-            return "اعتمدت الدراسة على المنهج الوصفي التحليلي، مع استخدام أدوات متنوعة لجمع البيانات من عينة ممثلة."
-        elif study_type == 'phd':
-            return "تم استخدام منهجية مختلطة تجمع بين الأساليب الكمية والنوعية، لضمان الحصول على فهم شامل للظاهرة المدروسة."
-        else:
-            return "اتبعت الدراسة منهجاً علمياً دقيقاً يتناسب مع طبيعة الموضوع المدروس."
-    
-    def _generate_population_description(self, field_of_study: str, study_type: str) -> str:
-        """توليد وصف مجتمع الدراسة"""
-        if field_of_study == 'education':
-            return "تكون مجتمع الدراسة من المعلمين والطلاب في المؤسسات التعليمية، وتم اختيار عينة عشوائية طبقية تمثل المجتمع الأصلي."
-        elif field_of_study == 'business':
-            return "شمل مجتمع الدراسة العاملين في القطاع الخاص والمؤسسات التجارية، مع التركيز على فئات محددة ذات صلة بموضوع الدراسة."
-        else:
-            return "تم تحديد مجتمع الدراسة بناءً على معايير علمية دقيقة، مع ضمان تمثيل جميع الفئات ذات الصلة بالموضوع المدروس."
-
+        return FIELD_NAMES.get(field_code, DEFAULT_FIELD_NAME)
@@ -0,0 +1,294 @@
+import contextlib
+import fcntl
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.services.pdf_cache import pdf_cache, write_atomic
+from src.services.pdf_exporter import render_study_pdf
+
+# حالات المهمة التي لا تتغير بعدها
+FINISHED_STATUSES = ('done', 'failed')
+STATUSES = ('queued', 'running') + FINISHED_STATUSES
+
+_JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class JobStore:
+    """
+    حالة مهام التصدير ونتائجها كملفات في مجلد مشترك بين جميع عمال الخادم
+    <job_id>.json للحالة و <job_id>.pdf للنتيجة، وملف PDF يكتب دائماً قبل الحالة 'done'
+    تغييرات الحالة تتم تحت قفل ملف وتحدث معها عدادات الحالات في ملف stats، فلا تحتاج
+    الإحصائيات لقراءة ملفات جميع المهام
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+    
+    def _path(self, job_id: str, extension: str) -> str:
+        return os.path.join(self.directory, f'{job_id}.{extension}')
+    
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """قفل حصري بين جميع العمليات التي تستخدم المجلد"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _write(self, job: Dict[str, Any]) -> None:
+        write_atomic(self._path(job['id'], 'json'), json.dumps(job).encode('utf-8'))
+    
+    def counters(self) -> Dict[str, Any]:
+        """عدد المهام المحتفظ بها في كل حالة، وعدد عمليات البناء المكتملة ومجموع زمنها"""
+        try:
+            with open(os.path.join(self.directory, 'stats'), 'rb') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return dict(dict.fromkeys(STATUSES, 0), renders=0, render_seconds_total=0.0, last_render_seconds=None)
+    
+    def _count(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        """تحديث العدادات بعد انتقال مهمة من حالة إلى أخرى (يستدعى تحت القفل)"""
+        counters = self.counters()
+        if old is not None:
+            counters[old['status']] = max(0, counters[old['status']] - 1)
+        if new is not None:
+            counters[new['status']] += 1
+            if new['status'] == 'done':
+                counters['renders'] += 1
+                counters['render_seconds_total'] += new['render_seconds']
+                counters['last_render_seconds'] = new['render_seconds']
+        write_atomic(os.path.join(self.directory, 'stats'), json.dumps(counters).encode('utf-8'))
+    
+    def create(self, job: Dict[str, Any]) -> None:
+        with self._locked():
+            self._write(job)
+            self._count(None, job)
+    
+    def update(self, job_id: str, **changes) -> Optional[Dict[str, Any]]:
+        """
+        تغيير حالة مهمة غير منتهية وإرجاعها بعد التغيير
+        None إذا حذفت المهمة أو انتهت بالفعل (مثلاً اعتبرت متوقفة) - الحالة النهائية لا تستبدل
+        """
+        with self._locked():
+            job = self.read(job_id)
+            if job is None or job['status'] in FINISHED_STATUSES:
+                return None
+            updated = dict(job, **changes)
+            self._write(updated)
+            self._count(job, updated)
+            return updated
+    
+    def read(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not _JOB_ID_RE.match(job_id):
+            return None
+        try:
+            with open(self._path(job_id, 'json'), 'rb') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def write_result(self, job_id: str, pdf: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(self._path(job_id, 'pdf'), pdf)
+    
+    def read_result(self, job_id: str) -> Optional[bytes]:
+        if not _JOB_ID_RE.match(job_id):
+            return None
+        try:
+            with open(self._path(job_id, 'pdf'), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def list(self) -> List[Dict[str, Any]]:
+        """جميع المهام المخزنة (يتم تخطي الملفات المحذوفة أثناء القراءة)"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        jobs = (self.read(name[:-len('.json')]) for name in names if name.endswith('.json'))
+        return [job for job in jobs if job is not None]
+    
+    def delete(self, job_id: str) -> None:
+        with self._locked():
+            job = self.read(job_id)
+            for extension in ('pdf', 'json'):
+                try:
+                    os.unlink(self._path(job_id, extension))
+                except OSError:
+                    pass
+            if job is not None:
+                self._count(job, None)
+
+
+def _render_job(store: JobStore, job_id: str, study: Dict[str, Any], sections: List[str]) -> None:
+    """تنفيذ عملية التصدير داخل عملية منفصلة وتسجيل حالتها ونتيجتها في المخزن المشترك"""
+    if store.update(job_id, status='running', started_at=time.time()) is None:
+        # المهمة اعتبرت متوقفة أو حذفت قبل بدء تنفيذها
+        return
+    started = time.perf_counter()
+    try:
+        pdf = render_study_pdf(study, sections)
+    except Exception as e:
+        store.update(job_id, status='failed', error=str(e), finished_at=time.time())
+        raise
+    store.write_result(job_id, pdf)
+    if store.update(job_id, status='done', render_seconds=time.perf_counter() - started,
+                    finished_at=time.time()) is None:
+        store.delete(job_id)
+
+
+def _mp_context():
+    """
+    عمال الخادم متعددو الخيوط، و fork من عملية فيها خيوط قد ينسخ أقفالاً محجوزة
+    (السجلات، مجمع اتصالات قاعدة البيانات) فتتجمد العملية الفرعية - لذلك forkserver أو spawn
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class QueueFullError(Exception):
+    """يطلق عند امتلاء طابور التصدير"""
+
+
+class ExportJobManager:
+    """
+    إدارة مهام تصدير PDF في الخلفية باستخدام مجموعة عمليات محدودة
+    حالة كل مهمة ونتيجتها محفوظة في JobStore فيمكن الاستعلام عنها وتنزيلها من أي عامل
+    المهمة التي تبقى في الطابور أو قيد التنفيذ أكثر من job_timeout ثانية (توقف عامل الخادم
+    أو عملية البناء) تعتبر فاشلة
+    """
+    
+    def __init__(self, store: JobStore, max_workers: Optional[int] = None, max_queue: int = 32,
+                 max_finished: int = 100, job_timeout: float = 600, sweep_interval: float = 60):
+        self.store = store
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.max_finished = max_finished
+        self.job_timeout = job_timeout
+        self.sweep_interval = sweep_interval
+        self._executor = None
+        # المهام غير المكتملة في مجموعة عمليات هذا العامل (لحد الطابور)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+    
+    def get_executor(self) -> ProcessPoolExecutor:
+        """مجموعة العمليات المشتركة لعمليات التصدير (تنشأ عند أول استخدام)"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=_mp_context())
+        return self._executor
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """إيقاف مجموعة العمليات (تستدعى عند إنهاء عامل الخادم)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+    
+    def submit(self, study: Dict[str, Any], sections: List[str]) -> str:
+        """إضافة مهمة تصدير إلى الطابور وإرجاع معرفها"""
+        job = {
+            'id': uuid.uuid4().hex,
+            'study_id': study.get('id'),
+            'status': 'queued',
+            'created_at': time.time(),
+            'render_seconds': None,
+            'error': None
+        }
+        with self._lock:
+            if len(self._pending) >= self.max_queue:
+                raise QueueFullError('Export queue is full')
+            # الحالة 'queued' تكتب قبل الإرسال حتى لا تستبدل حالة 'running' التي تكتبها العملية الفرعية
+            self.store.create(job)
+            future = self.get_executor().submit(_render_job, self.store, job['id'], study, sections)
+            self._pending.add(future)
+        future.add_done_callback(lambda f, job_id=job['id']: self._on_done(job_id, f))
+        return job['id']
+    
+    def _on_done(self, job_id: str, future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+        if future.exception() is not None:
+            # توقف العملية الفرعية قبل تسجيل الحالة (مثلاً BrokenProcessPool) - لا أثر إذا سجلتها
+            self.store.update(job_id, status='failed', error=str(future.exception()), finished_at=time.time())
+        self._sweep()
+    
+    def _expire_if_stale(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """اعتبار المهمة فاشلة إذا تجاوزت المهلة دون أن تنتهي"""
+        if job['status'] in FINISHED_STATUSES:
+            return job
+        if time.time() - (job.get('started_at') or job['created_at']) <= self.job_timeout:
+            return job
+        expired = self.store.update(job['id'], status='failed', finished_at=time.time(),
+                                    error=f"Job did not finish within {self.job_timeout:g}s")
+        return expired or self.store.read(job['id']) or job
+    
+    def _sweep(self) -> None:
+        """إنهاء المهام المتوقفة وحذف أقدم المهام المنتهية فوق max_finished"""
+        self._last_sweep = time.monotonic()
+        jobs = [self._expire_if_stale(job) for job in self.store.list()]
+        finished = [job for job in jobs if job['status'] in FINISHED_STATUSES]
+        finished.sort(key=lambda job: job.get('finished_at') or 0)
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            self.store.delete(job['id'])
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """حالة المهمة بصيغة قابلة للتحويل إلى JSON"""
+        job = self.store.read(job_id)
+        if job is None:
+            return None
+        job = self._expire_if_stale(job)
+        return {
+            'id': job['id'],
+            'study_id': job['study_id'],
+            'status': job['status'],
+            'created_at': job['created_at'],
+            'render_seconds': job['render_seconds'],
+            'error': job['error']
+        }
+    
+    def get_result(self, job_id: str) -> Optional[bytes]:
+        """محتوى ملف PDF لمهمة مكتملة - None قبل اكتمالها أو بعد حذفها"""
+        job = self.store.read(job_id)
+        if job is None or job['status'] != 'done':
+            return None
+        return self.store.read_result(job_id)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        عمق الطابور (لجميع العمال) وإحصائيات زمن البناء من ملف العدادات
+        ملفات المهام تفحص مرة كل sweep_interval ثانية على الأكثر لإنهاء المهام المتوقفة
+        """
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self._sweep()
+        counters = self.store.counters()
+        renders = counters['renders']
+        return {
+            'workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'queued': counters['queued'],
+            'running': counters['running'],
+            'done': counters['done'],
+            'failed': counters['failed'],
+            'renders': renders,
+            'avg_render_seconds': counters['render_seconds_total'] / renders if renders else None,
+            'last_render_seconds': counters['last_render_seconds']
+        }
+
+
+export_jobs = ExportJobManager(
+    JobStore(os.environ.get('EXPORT_JOBS_DIR', os.path.join(pdf_cache.directory, 'jobs'))),
+    max_workers=int(os.environ.get('EXPORT_WORKERS', 0)) or None,
+    max_queue=int(os.environ.get('EXPORT_MAX_QUEUE', 32)),
+    job_timeout=float(os.environ.get('EXPORT_JOB_TIMEOUT', 600))
+)
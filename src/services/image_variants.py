@@ -0,0 +1,186 @@
+import hashlib
+import io
+import os
+import struct
+import tempfile
+from typing import TYPE_CHECKING, List, NamedTuple, Optional, Tuple
+
+# Pillow يحمل فقط عند إنشاء نسخة غير موجودة على القرص (عند أول طلب لها)
+if TYPE_CHECKING:
+    from PIL import Image
+
+# امتدادات الصور التي تنشأ لها نسخ بأحجام مختلفة
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+# عروض النسخ بالبكسل - لا تنشأ نسخة أعرض من الصورة الأصلية
+VARIANT_WIDTHS = (64, 128, 256, 512)
+
+# الصيغ الناتجة: (الامتداد، صيغة Pillow، نوع المحتوى، خيارات الحفظ)
+VARIANT_FORMATS = (
+    ('webp', 'WEBP', 'image/webp', {'quality': 80, 'method': 6}),
+    ('jpg', 'JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+# يجب زيادته عند تغيير الأحجام أو إعدادات الترميز حتى لا تستخدم نسخ قديمة من القرص
+VARIANTS_VERSION = 2
+
+# علامات JPEG التي تحمل أبعاد الصورة (SOF0..SOF15 عدا DHT و JPG و DAC)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# قيم EXIF Orientation التي تدور الصورة 90 درجة (يتبادل العرض والارتفاع عند العرض)
+_TRANSPOSED_ORIENTATIONS = frozenset((5, 6, 7, 8))
+
+
+class ImageVariant(NamedTuple):
+    width: int
+    extension: str
+    mimetype: str
+
+
+def _exif_orientation(segment: bytes) -> Optional[int]:
+    """قيمة Orientation من مقطع APP1 (Exif) في JPEG"""
+    if segment[:6] != b'Exif\x00\x00':
+        return None
+    tiff = segment[6:]
+    endian = '<' if tiff[:2] == b'II' else '>'
+    try:
+        offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+        count = struct.unpack(endian + 'H', tiff[offset:offset + 2])[0]
+        for index in range(count):
+            entry = tiff[offset + 2 + index * 12:offset + 14 + index * 12]
+            if struct.unpack(endian + 'H', entry[:2])[0] == 0x0112:
+                return struct.unpack(endian + 'H', entry[8:10])[0]
+    except struct.error:
+        return None
+    return None
+
+
+def image_size(body: bytes) -> Optional[Tuple[int, int]]:
+    """
+    أبعاد صورة PNG أو JPEG أو WebP من ترويسة الملف فقط - بدون Pillow
+    أبعاد JPEG كما تعرض بعد تطبيق EXIF Orientation (مثل نتيجة exif_transpose)
+    """
+    if body[:8] == b'\x89PNG\r\n\x1a\n':
+        return struct.unpack('>II', body[16:24])
+    if body[:4] == b'RIFF' and body[8:12] == b'WEBP':
+        chunk = body[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', body[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            bits = struct.unpack('<I', body[21:25])[0]
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8X':
+            return int.from_bytes(body[24:27], 'little') + 1, int.from_bytes(body[27:30], 'little') + 1
+        return None
+    if body[:2] == b'\xff\xd8':
+        position = 2
+        orientation = None
+        while position + 9 <= len(body):
+            if body[position] != 0xFF:
+                position += 1
+                continue
+            marker = body[position + 1]
+            if marker == 0xFF or 0xD0 <= marker <= 0xD9 or marker == 0x01:
+                position += 1 if marker == 0xFF else 2
+                continue
+            length = struct.unpack('>H', body[position + 2:position + 4])[0]
+            if marker == 0xE1 and orientation is None:
+                orientation = _exif_orientation(body[position + 4:position + 2 + length])
+            if marker in _JPEG_SOF_MARKERS:
+                height, width = struct.unpack('>HH', body[position + 5:position + 9])
+                if orientation in _TRANSPOSED_ORIENTATIONS:
+                    return height, width
+                return width, height
+            position += 2 + length
+    return None
+
+
+def plan_variants(body: bytes) -> List[ImageVariant]:
+    """النسخ التي ستتاح للصورة (الأحجام والصيغ) دون ترميز أي منها"""
+    size = image_size(body)
+    if size is None:
+        return []
+    source_width = size[0]
+    widths = sorted({width for width in VARIANT_WIDTHS if width < source_width} | {source_width})
+    return [ImageVariant(width, extension, mimetype)
+            for width in widths for extension, _, mimetype, _ in VARIANT_FORMATS]
+
+
+def _encode(image: 'Image.Image', pil_format: str, options: dict) -> bytes:
+    from PIL import Image
+
+    # صورة جديدة بدون EXIF أو ICC أو XMP
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        if 'A' in image.getbands():
+            background.paste(image, mask=image.getchannel('A'))
+        else:
+            background.paste(image.convert('RGB'))
+        image = background
+    image.info = {}
+    output = io.BytesIO()
+    image.save(output, pil_format, **options)
+    return output.getvalue()
+
+
+def _render_variant(body: bytes, variant: ImageVariant) -> bytes:
+    from PIL import Image, ImageOps
+
+    pil_format, options = next((pil_format, options) for extension, pil_format, _, options in VARIANT_FORMATS
+                               if extension == variant.extension)
+    with Image.open(io.BytesIO(body)) as source:
+        source.load()
+        # تدوير الصورة حسب EXIF Orientation قبل التصغير - الترميز يحذف EXIF فلا يطبقه المتصفح
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert('RGBA' if 'transparency' in source.info else 'RGB')
+        # لا تكبير: قد تختلف الأبعاد المخططة من الترويسة عن أبعاد الصورة بعد التدوير
+        width = min(variant.width, source.width)
+        if width != source.width:
+            height = max(1, round(source.height * width / source.width))
+            source = source.resize((width, height), Image.LANCZOS)
+        return _encode(source.copy(), pil_format, options)
+
+
+class ImageVariantCache:
+    """
+    تخزين نسخ الصور على القرص حسب بصمة الصورة الأصلية، ملف مستقل لكل نسخة
+    تنشأ كل نسخة عند أول طلب لها فقط وتبقى بعد إعادة تشغيل الخادم
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, body: bytes, variant: ImageVariant) -> str:
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        return os.path.join(self.directory, f'{digest}-v{VARIANTS_VERSION}', f'{variant.width}.{variant.extension}')
+
+    def get_variant(self, body: bytes, variant: ImageVariant) -> bytes:
+        """محتوى النسخة من القرص، أو ترميزها وحفظها إن لم توجد"""
+        path = self._path(body, variant)
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            pass
+        encoded = _render_variant(body, variant)
+        self._store(path, encoded)
+        return encoded
+
+    def _store(self, path: str, encoded: bytes) -> None:
+        """
+        كتابة الملف بشكل ذري: وجود الملف يعني أنه مكتمل، فالكتابة المتوقفة لا تترك نسخة ناقصة
+        الفشل في الكتابة لا يمنع استخدام النسخة
+        """
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(encoded)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+
+image_cache = ImageVariantCache(os.environ.get('IMAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'aplus_image_cache')))
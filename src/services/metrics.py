@@ -0,0 +1,338 @@
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+from flask import g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# حدود فئات المدرج التكراري بالثواني
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# مجلد مشترك تكتب فيه كل عملية عامل لقطة مقاييسها، ويجمعها /api/metrics من جميع العمال
+# بدونه تعرض مقاييس العملية الحالية فقط (عملية واحدة)
+METRICS_DIR = os.environ.get('METRICS_DIR')
+
+# أقصى تأخير بالثواني بين تسجيل قياس وكتابته في لقطة العملية
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1.0))
+
+
+class Histogram:
+    """مدرج تكراري بصيغة Prometheus مع تسميات (labels) - آمن لعدة خيوط"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets: Iterable[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+        if _snapshots is not None:
+            _snapshots.mark_dirty()
+
+    def snapshot(self) -> Dict[Tuple[str, ...], list]:
+        """نسخة من القيم الحالية: labels -> [عدادات الفئات، المجموع، العدد]"""
+        with self._lock:
+            return {labels: [list(data[0]), data[1], data[2]] for labels, data in self._series.items()}
+
+    def render(self, series: Optional[Dict[Tuple[str, ...], list]] = None):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        if series is None:
+            series = self.snapshot()
+        for labels, (counts, total, count) in sorted(series.items()):
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = label_text + ',' if label_text else ''
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            suffix = f'{{{label_text}}}' if label_text else ''
+            lines.append(f'{self.name}_sum{suffix} {total:.6f}')
+            lines.append(f'{self.name}_count{suffix} {count}')
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class ProcessSnapshots:
+    """
+    تجميع المقاييس من عدة عمليات (pre-fork): كل عملية تكتب لقطة مدرجاتها في ملف خاص بها
+    داخل مجلد مشترك (كتابة ذرية من خيط خلفي بعد كل تغيير بحد أقصى interval ثانية)،
+    والقراءة تجمع جميع الملفات. عند انتهاء عامل تدمج العملية الرئيسية ملفه في retired.json
+    ثم تحذفه، فلا تنقص العدادات التراكمية ولا يكبر المجلد مع إعادة تشغيل العمال
+    """
+
+    RETIRED = 'retired.json'
+
+    def __init__(self, directory: str, histograms: Tuple[Histogram, ...], interval: float):
+        self.directory = directory
+        self.histograms = histograms
+        self.interval = interval
+        self._dirty = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._path = None
+
+    def mark_dirty(self) -> None:
+        if self._pid != os.getpid():
+            self._start()
+        self._dirty.set()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # بعد fork: ملف جديد وخيط كتابة جديد لهذه العملية (معرف فريد حتى لو أعيد استخدام pid)
+            self._pid = os.getpid()
+            self._path = os.path.join(self.directory, f'{self._pid}-{uuid.uuid4().hex[:8]}.json')
+            threading.Thread(target=self._run, name='metrics-flush', daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            self._dirty.wait()
+            time.sleep(self.interval)
+            self.flush()
+
+    def flush(self) -> None:
+        """كتابة لقطة العملية الحالية (تستدعى أيضاً قبل إنهاء العامل)"""
+        if self._pid != os.getpid():
+            return
+        self._dirty.clear()
+        data = {histogram.name: [[list(labels), *values] for labels, values in histogram.snapshot().items()]
+                for histogram in self.histograms}
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._path)
+        except OSError:
+            pass
+
+    def _merge(self, names) -> Dict[str, Dict[Tuple[str, ...], list]]:
+        merged = {histogram.name: {} for histogram in self.histograms}
+        for name in names:
+            try:
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for histogram_name, rows in data.items():
+                series = merged.get(histogram_name)
+                if series is None:
+                    continue
+                for labels, counts, total, count in rows:
+                    current = series.setdefault(tuple(labels), [[0] * len(counts), 0.0, 0])
+                    current[0] = [a + b for a, b in zip(current[0], counts)]
+                    current[1] += total
+                    current[2] += count
+        return merged
+
+    def _retired_names(self) -> set:
+        """ملفات عمال دمجت في retired.json ولم تحذف بعد - تتجاهل حتى لا تحسب مرتين"""
+        try:
+            with open(os.path.join(self.directory, self.RETIRED), encoding='utf-8') as f:
+                return set(json.load(f).get('_merged', ()))
+        except (OSError, ValueError):
+            return set()
+
+    def collect(self) -> Dict[str, Dict[Tuple[str, ...], list]]:
+        """مجموع مقاييس جميع العمليات لكل مدرج"""
+        self.flush()
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        except OSError:
+            names = []
+        skipped = self._retired_names()
+        return self._merge(name for name in names if name not in skipped)
+
+    def retire(self, pid: int) -> None:
+        """دمج لقطة عامل منته في retired.json وحذف ملفه (تستدعيها العملية الرئيسية فقط)"""
+        prefix = f'{pid}-'
+        try:
+            names = [name for name in os.listdir(self.directory)
+                     if name.startswith(prefix) and name.endswith('.json')]
+        except OSError:
+            return
+        if not names:
+            return
+        merged = self._merge([self.RETIRED] + names)
+        data = {name: [[list(labels), *values] for labels, values in series.items()]
+                for name, series in merged.items()}
+        data['_merged'] = names
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, os.path.join(self.directory, self.RETIRED))
+        except OSError:
+            return
+        for name in names:
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Request latency', ('method', 'endpoint', 'status'), LATENCY_BUCKETS
+)
+SPAN_DURATION = Histogram(
+    'app_span_duration_seconds', 'Time spent in named phases of a request', ('span',), LATENCY_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    'db_queries_per_request', 'Number of SQL statements per request', ('endpoint',), QUERY_COUNT_BUCKETS
+)
+
+_HISTOGRAMS = (REQUEST_DURATION, SPAN_DURATION, REQUEST_QUERIES)
+
+_snapshots = ProcessSnapshots(METRICS_DIR, _HISTOGRAMS, METRICS_FLUSH_INTERVAL) if METRICS_DIR else None
+
+
+def record_span(name: str, seconds: float) -> None:
+    """إضافة زمن مرحلة إلى الطلب الحالي (لا شيء خارج الطلبات)"""
+    if not has_request_context():
+        return
+    spans = g.get('_spans')
+    if spans is None:
+        return
+    total, count = spans.get(name, (0.0, 0))
+    spans[name] = (total + seconds, count + 1)
+
+
+@contextmanager
+def span(name: str):
+    """قياس زمن مرحلة مسماة داخل الطلب الحالي"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """قياس زمن تحويل الردود إلى JSON كمرحلة مستقلة"""
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            record_span('json', time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['_query_started'].pop()
+    if has_request_context() and g.get('_spans') is not None:
+        record_span('db', time.perf_counter() - started)
+        g._query_count += 1
+
+
+def _handle_error(context):
+    stack = context.connection.info.get('_query_started') if context.connection is not None else None
+    if stack:
+        stack.pop()
+
+
+def _before_commit(session):
+    session.info['_commit_started'] = time.perf_counter()
+
+
+def _after_commit(session):
+    started = session.info.pop('_commit_started', None)
+    if started is not None:
+        record_span('commit', time.perf_counter() - started)
+
+
+def _after_rollback(session):
+    session.info.pop('_commit_started', None)
+
+
+def _before_request():
+    g._request_started = time.perf_counter()
+    g._spans = {}
+    g._query_count = 0
+
+
+def _after_request(response):
+    started = g.get('_request_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    spans = g._spans
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    REQUEST_DURATION.observe(elapsed, request.method, endpoint, str(response.status_code))
+    REQUEST_QUERIES.observe(g._query_count, endpoint)
+    entries = []
+    for name, (seconds, count) in spans.items():
+        SPAN_DURATION.observe(seconds, name)
+        description = f';desc="{count} queries"' if name == 'db' else ''
+        entries.append(f'{name};dur={seconds * 1000:.2f}{description}')
+    entries.append(f'total;dur={elapsed * 1000:.2f}')
+    response.headers['Server-Timing'] = ', '.join(entries)
+    return response
+
+
+def render_metrics() -> str:
+    """جميع المقاييس بصيغة Prometheus النصية - مجمعة من جميع العمال عند تحديد METRICS_DIR"""
+    merged = _snapshots.collect() if _snapshots is not None else {}
+    lines = []
+    for histogram in _HISTOGRAMS:
+        lines.extend(histogram.render(merged.get(histogram.name)))
+    return '\n'.join(lines) + '\n'
+
+
+def flush_metrics() -> None:
+    """كتابة لقطة مقاييس العملية الحالية فوراً (قبل إنهاء عامل الخادم)"""
+    if _snapshots is not None:
+        _snapshots.flush()
+
+
+def retire_worker_metrics(pid: int) -> None:
+    """دمج مقاييس عامل منته في المجموع الدائم وحذف ملفه (من العملية الرئيسية بعد waitpid)"""
+    if _snapshots is not None:
+        _snapshots.retire(pid)
+
+
+def init_metrics(app, session):
+    """
+    تفعيل قياس أزمنة الطلبات ومراحلها وعدد استعلامات قاعدة البيانات
+    يجب استدعاؤها قبل تسجيل باقي دوال after_request حتى يشمل الزمن الكلي عملها
+    """
+    app.json = TimedJSONProvider(app)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    event.listen(session, 'before_commit', _before_commit)
+    event.listen(session, 'after_commit', _after_commit)
+    event.listen(session, 'after_rollback', _after_rollback)
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import List, Optional
+
+from src.services.pdf_exporter import PDF_LAYOUT_VERSION
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """كتابة الملف بشكل ذري حتى لا يقرأ عامل آخر ملفاً غير مكتمل (الملف المؤقت يحذف عند الفشل)"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class PdfCache:
+    """
+    تخزين ملفات PDF المصدرة على القرص حسب مراجعة الدراسة
+    المفتاح مشتق من معرف الدراسة وتاريخ آخر تعديل والأقسام المطلوبة وإصدار التنسيق
+    حجم المجلد محدود بـ max_bytes: تحذف ملفات إصدارات التنسيق القديمة ثم الأقدم استخداماً
+    """
+    
+    def __init__(self, directory: str, layout_version: int, max_bytes: int, sweep_interval: float = 60):
+        self.directory = directory
+        self.layout_version = layout_version
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+    
+    def make_key(self, study_id: int, updated_at: Optional[str], sections: List[str], layout_version: int) -> str:
+        """مفتاح ثابت يستخدم كاسم للملف وكقيمة ETag (يبدأ بإصدار التنسيق ليمكن حذف الإصدارات القديمة)"""
+        raw = f"{study_id}|{updated_at}|{','.join(sections)}|{layout_version}"
+        return f"v{layout_version}-{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+    
+    def _study_dir(self, study_id: int) -> str:
+        return os.path.join(self.directory, str(int(study_id)))
+    
+    def _path(self, study_id: int, key: str) -> str:
+        return os.path.join(self._study_dir(study_id), f'{key}.pdf')
+    
+    def get(self, study_id: int, key: str) -> Optional[bytes]:
+        path = self._path(study_id, key)
+        try:
+            with open(path, 'rb') as f:
+                pdf = f.read()
+        except OSError:
+            return None
+        # وقت التعديل هو وقت آخر استخدام - الأقدم يحذف أولاً عند تجاوز الحجم
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return pdf
+    
+    def put(self, study_id: int, key: str, pdf: bytes) -> None:
+        try:
+            os.makedirs(self._study_dir(study_id), exist_ok=True)
+            write_atomic(self._path(study_id, key), pdf)
+        except OSError:
+            # التخزين المؤقت اختياري - لا يجب أن يفشل التصدير بسببه
+            return
+        self._maybe_sweep()
+    
+    def invalidate(self, study_id: int) -> None:
+        """حذف جميع الملفات المخزنة لدراسة بعد تعديلها أو حذفها"""
+        shutil.rmtree(self._study_dir(study_id), ignore_errors=True)
+    
+    def _maybe_sweep(self) -> None:
+        """فحص المجلد مرة كل sweep_interval ثانية على الأكثر في كل عملية"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        self.sweep()
+    
+    def sweep(self) -> None:
+        """حذف ملفات إصدارات التنسيق القديمة، ثم الأقدم استخداماً حتى يعود الحجم تحت max_bytes"""
+        prefix = f'v{self.layout_version}-'
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            # مجلدات الدراسات فقط (مجلد jobs لمهام التصدير في نفس المكان)
+            if not name.isdigit():
+                continue
+            study_dir = os.path.join(self.directory, name)
+            try:
+                files = list(os.scandir(study_dir))
+            except OSError:
+                continue
+            for entry in files:
+                if not entry.name.endswith('.pdf'):
+                    continue
+                try:
+                    if not entry.name.startswith(prefix):
+                        os.unlink(entry.path)
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+        
+        for name in names:
+            if name.isdigit():
+                try:
+                    os.rmdir(os.path.join(self.directory, name))
+                except OSError:
+                    # المجلد غير فارغ
+                    pass
+
+
+pdf_cache = PdfCache(
+    os.environ.get('PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'aplus_pdf_cache')),
+    PDF_LAYOUT_VERSION,
+    max_bytes=int(os.environ.get('PDF_CACHE_MAX_MB', 512)) * 1024 * 1024
+)
@@ -0,0 +1,199 @@
+import functools
+import html
+import io
+import os
+import re
+import time
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
+
+# ReportLab يحمل عند أول تصدير فقط - استيراده يضاعف زمن بدء التشغيل البارد
+if TYPE_CHECKING:
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.platypus import Paragraph
+
+# إصدار تنسيق PDF - يجب زيادته عند تعديل شكل الملف حتى لا تعاد ملفات قديمة من الذاكرة المؤقتة
+PDF_LAYOUT_VERSION = 2
+
+# عناوين الأقسام في ملف PDF
+SECTION_TITLES = {
+    'introduction': 'المقدمة',
+    'literature': 'الإطار النظري والدراسات السابقة',
+    'methodology': 'منهجية الدراسة',
+    'results': 'النتائج',
+    'discussion': 'المناقشة',
+    'conclusion': 'الخلاصة والتوصيات',
+    'references': 'المراجع'
+}
+
+# خطوط تدعم العربية يتم البحث عنها بالترتيب (يمكن تحديد مسار آخر عبر PDF_ARABIC_FONT)
+ARABIC_FONT_CANDIDATES = (
+    '/usr/share/fonts/truetype/noto/NotoNaskhArabic-Regular.ttf',
+    '/usr/share/fonts/truetype/noto/NotoSansArabic-Regular.ttf',
+    '/usr/share/fonts/truetype/fonts-arabeyes/ae_AlArabiya.ttf',
+    '/usr/share/fonts/truetype/kacst/KacstOne.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/Library/Fonts/Arial Unicode.ttf',
+    'C:\\Windows\\Fonts\\arial.ttf'
+)
+ARABIC_FONT_NAME = 'ArabicFont'
+
+
+def _register_arabic_font() -> Optional[str]:
+    """تسجيل خط عربي مرة واحدة وإرجاع اسمه إن وجد"""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    candidates = [os.environ.get('PDF_ARABIC_FONT')] + list(ARABIC_FONT_CANDIDATES)
+    for path in candidates:
+        if path and os.path.exists(path):
+            try:
+                pdfmetrics.registerFont(TTFont(ARABIC_FONT_NAME, path))
+                return ARABIC_FONT_NAME
+            except Exception:
+                continue
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def get_styles() -> Dict[str, 'ParagraphStyle']:
+    """بناء أنماط الفقرات مرة واحدة لكل عملية (عند أول تصدير)"""
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    sample = getSampleStyleSheet()
+    font_name = _register_arabic_font()
+
+    def derive(name: str, parent: str, **overrides) -> 'ParagraphStyle':
+        if font_name:
+            overrides['fontName'] = font_name
+        return ParagraphStyle(name, parent=sample[parent], **overrides)
+
+    return {
+        'section': derive('AplusSection', 'Heading1'),
+        'h3': derive('AplusH3', 'Heading2'),
+        'h4': derive('AplusH4', 'Heading3'),
+        'p': derive('AplusBody', 'Normal', spaceAfter=6),
+        'li': derive('AplusListItem', 'Normal', leftIndent=18, bulletIndent=6, spaceAfter=3)
+    }
+
+
+def preload() -> None:
+    """تحميل ReportLab والخطوط مسبقاً - تستدعيها العملية الرئيسية قبل إنشاء العمال"""
+    get_styles()
+
+# تحليل HTML المولد في مرور واحد: وسم فتح/إغلاق أو نص
+# علامة < لا تبدأ وسماً (مثل "p < 0.05") تعامل كنص بدلاً من حذفها
+_TOKEN_RE = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)[^<>]*>|([^<]+|<)')
+
+# وسوم ReportLab داخل الفقرة - تستخدم لتجاهل الكتل الفارغة من النص
+_MARKUP_RE = re.compile(r'<[^>]*>')
+
+# الوسوم التي تبدأ وتنهي كتلة مستقلة في ملف PDF
+_BLOCK_TAGS = frozenset(('p', 'h3', 'h4', 'li', 'div', 'ul', 'ol'))
+
+# الوسوم النصية المدعومة داخل فقرات ReportLab
+_INLINE_TAGS = {'strong': 'b', 'b': 'b', 'em': 'i', 'i': 'i', 'u': 'u'}
+
+
+def html_to_flowables(content: str) -> List['Paragraph']:
+    """
+    تحويل HTML الناتج من مولد المحتوى إلى قائمة عناصر ReportLab في مرور واحد
+    كل فقرة أو عنوان أو عنصر قائمة يصبح عنصراً مستقلاً بدلاً من فقرة واحدة ضخمة
+    """
+    from reportlab.platypus import Paragraph
+
+    styles = get_styles()
+    flowables = []
+    buffer = []
+    block = 'p'
+    lists = []  # مكدس القوائم المفتوحة: [نوع القائمة، العداد]
+    inline = []  # الوسوم النصية المفتوحة حالياً
+
+    def flush():
+        # إغلاق الوسوم النصية المفتوحة ثم إعادة فتحها في الكتلة التالية
+        text = ''.join(buffer + [f'</{tag}>' for tag in reversed(inline)]).strip()
+        buffer.clear()
+        buffer.extend(f'<{tag}>' for tag in inline)
+        if not _MARKUP_RE.sub('', text).strip():
+            return
+        if block == 'li' and lists:
+            list_type, counter = lists[-1]
+            bullet = f'{counter}.' if list_type == 'ol' else '\u2022'
+            flowables.append(Paragraph(text, styles['li'], bulletText=bullet))
+        else:
+            flowables.append(Paragraph(text, styles.get(block, styles['p'])))
+
+    for match in _TOKEN_RE.finditer(content):
+        closing, tag, text = match.groups()
+        if text is not None:
+            buffer.append(html.escape(html.unescape(text), quote=False))
+            continue
+
+        tag = tag.lower()
+        if tag in _BLOCK_TAGS:
+            flush()
+            if closing:
+                if tag in ('ul', 'ol') and lists:
+                    lists.pop()
+                block = 'p'
+            else:
+                if tag in ('ul', 'ol'):
+                    lists.append([tag, 0])
+                elif tag == 'li' and lists:
+                    lists[-1][1] += 1
+                block = tag if tag in styles else 'p'
+        elif tag in _INLINE_TAGS:
+            rl_tag = _INLINE_TAGS[tag]
+            if not closing:
+                inline.append(rl_tag)
+                buffer.append(f'<{rl_tag}>')
+            elif rl_tag in inline:
+                # إغلاق الوسم مع أي وسوم مفتوحة بعده للحفاظ على التداخل الصحيح
+                while inline:
+                    open_tag = inline.pop()
+                    buffer.append(f'</{open_tag}>')
+                    if open_tag == rl_tag:
+                        break
+        elif tag == 'br':
+            buffer.append('<br/>')
+
+    flush()
+    return flowables
+
+
+def render_study_pdf(study: Dict[str, Any], sections: List[str],
+                     timings: Optional[Dict[str, float]] = None) -> bytes:
+    """
+    بناء ملف PDF للدراسة من بياناتها (ناتج Study.to_dict)
+    لا تعتمد على Flask أو قاعدة البيانات حتى يمكن تشغيلها في عملية منفصلة
+    يسجل زمن تحليل HTML وزمن التخطيط (doc.build) بالثواني في timings إن مُرر
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+    started = time.perf_counter()
+    styles = get_styles()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72,
+                          topMargin=72, bottomMargin=18)
+
+    # تحضير المحتوى
+    story = []
+
+    # العنوان والملخص يظهران دائماً، ثم باقي الأقسام المطلوبة بالترتيب
+    parts = [('title', 'عنوان الدراسة'), ('abstract', 'الملخص')]
+    parts += [(section, SECTION_TITLES[section]) for section in sections if section in SECTION_TITLES]
+
+    for section, title in parts:
+        content = study.get(f'{section}_content')
+        if content:
+            story.append(Paragraph(title, styles['section']))
+            story.extend(html_to_flowables(content))
+            story.append(Spacer(1, 12))
+
+    # بناء PDF
+    parsed = time.perf_counter()
+    doc.build(story)
+    if timings is not None:
+        timings['pdf_parse'] = parsed - started
+        timings['pdf_build'] = time.perf_counter() - parsed
+    return buffer.getvalue()
@@ -0,0 +1,169 @@
+import cProfile
+import hmac
+import itertools
+import os
+import pstats
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# ترويسة تفعيل تحليل الطلب - قيمتها يجب أن تطابق ADMIN_TOKEN
+PROFILE_HEADER = 'X-Profile'
+ADMIN_HEADER = 'X-Admin-Token'
+
+_UNSAFE_CHARS_RE = re.compile(r'[^A-Za-z0-9_-]+')
+
+# اسم الملف الذي ينشئه _save: METHOD.endpoint.<وقت البدء بالميلي ثانية>.<المدة>ms.prof
+_PROFILE_NAME_RE = re.compile(r'^[A-Z]+\.(?P<endpoint>.+)\.(?P<started>\d+)\.\d+ms\.prof$')
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """مقارنة رمز المسؤول بزمن ثابت - بدون ADMIN_TOKEN لا يقبل أي رمز"""
+    expected = os.environ.get('ADMIN_TOKEN')
+    return bool(expected and token and hmac.compare_digest(token, expected))
+
+
+class RequestProfiler:
+    """
+    WSGI middleware يشغل cProfile على الطلبات المختارة ويحفظ نتائجها كملفات pstats
+    يتم اختيار الطلب بترويسة المسؤول، أو لكل الطلبات (always)، أو طلب واحد من كل sample_rate
+    يحتفظ المجلد بآخر max_files ملف فقط
+    """
+
+    def __init__(self, app, directory: str, always: bool = False, sample_rate: int = 0, max_files: int = 200):
+        self.app = app
+        self.directory = directory
+        self.always = always
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self._counter = itertools.count(1)
+        # cProfile لا يدعم أكثر من محلل نشط في نفس الوقت في بعض الإصدارات
+        self._lock = threading.Lock()
+
+    def _should_profile(self, environ) -> bool:
+        if self.always:
+            return True
+        if is_admin_token(environ.get('HTTP_' + PROFILE_HEADER.upper().replace('-', '_'))):
+            return True
+        return bool(self.sample_rate) and next(self._counter) % self.sample_rate == 0
+
+    def __call__(self, environ, start_response):
+        if not self._should_profile(environ) or not self._lock.acquire(blocking=False):
+            return self.app(environ, start_response)
+
+        profiler = cProfile.Profile()
+        started = time.time()
+        try:
+            response = profiler.runcall(self.app, environ, start_response)
+        except BaseException:
+            self._lock.release()
+            self._save(profiler, environ, started, time.time() - started)
+            raise
+        # القفل يبقى محجوزاً حتى close() بعد انتهاء إرسال الرد
+        return _ProfiledResponse(self, response, profiler, environ, started)
+
+    def _save(self, profiler, environ, started: float, elapsed: float) -> None:
+        endpoint = _UNSAFE_CHARS_RE.sub('.', environ.get('PATH_INFO', '/')).strip('.') or 'root'
+        name = f"{environ.get('REQUEST_METHOD', 'GET')}.{endpoint}.{int(started * 1000)}.{int(elapsed * 1000)}ms.prof"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.directory, name))
+            self._rotate()
+        except OSError:
+            pass
+
+    def _rotate(self) -> None:
+        files = self.list_files()
+        for name in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def list_files(self, endpoint: Optional[str] = None) -> List[str]:
+        """ملفات التحليل من الأقدم إلى الأحدث، مع تصفية اختيارية حسب المسار (تتجاهل الملفات بأسماء أخرى)"""
+        try:
+            matches = [match for match in map(_PROFILE_NAME_RE.match, os.listdir(self.directory)) if match]
+        except OSError:
+            return []
+        if endpoint:
+            endpoint = _UNSAFE_CHARS_RE.sub('.', endpoint).strip('.')
+            matches = [match for match in matches if endpoint in match.group('endpoint')]
+        matches.sort(key=lambda match: int(match.group('started')))
+        return [match.string for match in matches]
+
+    def report(self, top: int = 30, endpoint: Optional[str] = None, sort: str = 'cumulative') -> Dict[str, Any]:
+        """تجميع ملفات التحليل في جدول أعلى الدوال حسب الزمن التراكمي (أو الذاتي)"""
+        files = self.list_files(endpoint)
+        if not files:
+            return {'profiles': 0, 'functions': []}
+        stats = pstats.Stats(*[os.path.join(self.directory, name) for name in files])
+        column = 3 if sort == 'cumulative' else 2
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][column], reverse=True)[:top]
+        return {
+            'profiles': len(files),
+            'sort': sort,
+            'functions': [{
+                'function': f'{filename}:{line}({name})',
+                'calls': calls,
+                'primitive_calls': primitive_calls,
+                'total_time': round(total_time, 6),
+                'cumulative_time': round(cumulative_time, 6)
+            } for (filename, line, name), (primitive_calls, calls, total_time, cumulative_time, _) in rows]
+        }
+
+
+class _ProfiledResponse:
+    """
+    تغليف الرد دون قراءته كاملاً في الذاكرة: المحلل يعمل أثناء إنتاج كل جزء فقط (لا أثناء إرساله)
+    فتبقى الردود المتدفقة متدفقة، وتحفظ النتائج في close() التي يستدعيها الخادم بعد انتهاء الرد
+    """
+
+    def __init__(self, middleware: RequestProfiler, response, profiler: cProfile.Profile, environ, started: float):
+        self._middleware = middleware
+        self._response = response
+        self._profiler = profiler
+        self._environ = environ
+        self._started = started
+        self._closed = False
+
+    def __iter__(self):
+        profiler = self._profiler
+        iterator = profiler.runcall(iter, self._response)
+        while True:
+            profiler.enable()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                profiler.disable()
+            yield chunk
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            close = getattr(self._response, 'close', None)
+            if close is not None:
+                self._profiler.runcall(close)
+        finally:
+            self._middleware._lock.release()
+            self._middleware._save(self._profiler, self._environ, self._started, time.time() - self._started)
+
+
+def init_profiling(app) -> RequestProfiler:
+    """تغليف التطبيق بمحلل الطلبات حسب متغيرات البيئة"""
+    profiler = RequestProfiler(
+        app.wsgi_app,
+        os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'aplus_profiles')),
+        always=os.environ.get('PROFILE_ALL') == '1',
+        sample_rate=int(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+        max_files=int(os.environ.get('PROFILE_MAX_FILES', 200))
+    )
+    app.wsgi_app = profiler
+    app.extensions['request_profiler'] = profiler
+    return profiler
@@ -0,0 +1,205 @@
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+import uuid
+from typing import Any, Dict, Optional
+
+from flask import Response, request
+from sqlalchemy import event
+
+from src.services.cache import LRUCache
+from src.services.compression import base_etag, compress_response, etag_variants, negotiated_encoding
+
+# الترويسات التي تحفظ مع جسم الرد
+CACHED_HEADERS = ('Content-Type', 'Content-Encoding', 'Vary', 'ETag', 'Last-Modified', 'Cache-Control')
+
+
+class ResponseCache:
+    """
+    ذاكرة مؤقتة لردود نقاط القراءة (الجسم المسلسل والترويسات) حسب المسار والمعاملات
+    يتم إبطالها بالكامل بعد كل commit يعدل الدراسات
+
+    ملف "الجيل" على القرص يجعل الإبطال يصل إلى جميع عمليات العمال،
+    ومع shared=True تحفظ الردود نفسها في المجلد فتستفيد منها باقي العمليات
+    """
+
+    def __init__(self, directory: str, maxsize: int = 512, ttl: Optional[float] = 300, shared: bool = False):
+        self.directory = directory
+        self.shared = shared
+        self._local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._generation_path = os.path.join(directory, 'generation')
+        self._lock = threading.Lock()
+        self._generation = None
+        self._generation_stat = None
+        self.shared_hits = 0
+        self.invalidations = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def generation(self) -> str:
+        """الجيل الحالي - يعاد قراءته فقط عند تغير الملف (استدعاء stat واحد)"""
+        try:
+            stat = os.stat(self._generation_path)
+            marker = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            marker = None
+        with self._lock:
+            if marker != self._generation_stat or self._generation is None:
+                try:
+                    with open(self._generation_path, encoding='utf-8') as f:
+                        self._generation = f.read().strip()
+                except OSError:
+                    self._generation = ''
+                self._generation_stat = marker
+            return self._generation
+
+    def _shared_path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.resp')
+
+    def get(self, key: str, generation: str) -> Optional[Dict[str, Any]]:
+        entry = self._local.get((generation, key))
+        if entry is not None:
+            return entry
+        if self.shared:
+            entry = self._read_shared(key, generation)
+            if entry is not None:
+                self.shared_hits += 1
+                self._local.set((generation, key), entry)
+                return entry
+        return None
+
+    def set(self, key: str, generation: str, body: bytes, headers: Dict[str, str]) -> None:
+        """تخزين رد بالجيل الذي قرئ قبل تنفيذ الاستعلام حتى لا يحفظ رد قديم بجيل جديد"""
+        entry = {'generation': generation, 'body': body, 'headers': headers}
+        self._local.set((generation, key), entry)
+        if self.shared:
+            self._write_shared(key, entry)
+
+    def _read_shared(self, key: str, generation: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._shared_path(key), 'rb') as f:
+                header, _, body = f.read().partition(b'\n\n')
+        except OSError:
+            return None
+        lines = header.decode('utf-8').split('\n')
+        if lines[0] != generation:
+            return None
+        headers = dict(line.split(': ', 1) for line in lines[1:] if ': ' in line)
+        return {'generation': generation, 'body': body, 'headers': headers}
+
+    def _write_shared(self, key: str, entry: Dict[str, Any]) -> None:
+        """كتابة ذرية: الجيل ثم الترويسات ثم سطر فارغ ثم الجسم"""
+        header = '\n'.join([entry['generation']] + [f'{name}: {value}' for name, value in entry['headers'].items()])
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header.encode('utf-8') + b'\n\n' + entry['body'])
+            os.replace(tmp_path, self._shared_path(key))
+        except OSError:
+            pass
+
+    def invalidate(self) -> None:
+        """إبطال جميع الردود في هذه العملية وباقي العمليات"""
+        self.invalidations += 1
+        self._local.clear()
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(uuid.uuid4().hex)
+            os.replace(tmp_path, self._generation_path)
+        except OSError:
+            pass
+        if self.shared:
+            # الملفات القديمة لم تعد صالحة - حذفها يبقي حجم المجلد محدوداً
+            for name in os.listdir(self.directory):
+                if name.endswith('.resp'):
+                    try:
+                        os.unlink(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._local.stats()
+        stats.update({
+            'shared': self.shared,
+            'shared_hits': self.shared_hits,
+            'invalidations': self.invalidations
+        })
+        return stats
+
+
+def cached_response(view):
+    """
+    تخزين رد نقطة القراءة (200 فقط) حسب المسار والمعاملات وترميز الضغط (Vary: Accept-Encoding)
+    الرد يخزن بعد ضغطه فلا يعاد ضغط نفس الجسم عند كل إصابة
+    عند الإصابة تتم مقارنة If-None-Match مع ETag المخزن دون الوصول إلى قاعدة البيانات
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        query = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+        key = f"{request.path}?{query}|{negotiated_encoding() or 'identity'}"
+        generation = response_cache.generation()
+        entry = response_cache.get(key, generation)
+        if entry is not None:
+            etag = base_etag(entry['headers'].get('ETag', '').strip('"'))
+            if etag and any(request.if_none_match.contains(value) for value in etag_variants(etag)):
+                response = Response(status=304)
+                for name in ('ETag', 'Last-Modified', 'Cache-Control', 'Vary'):
+                    if name in entry['headers']:
+                        response.headers[name] = entry['headers'][name]
+                return response
+            # الجسم مضغوط مسبقاً (Content-Encoding محفوظة) فيتخطاه compress_response
+            return Response(entry['body'], headers=entry['headers'])
+
+        response = view(*args, **kwargs)
+        # HEAD لا يضغط (compress_response يتخطاه) فلا يخزن تحت مفتاح الترميز
+        if getattr(response, 'status_code', None) == 200 and not response.is_streamed and request.method == 'GET':
+            response = compress_response(response)
+            headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+            response_cache.set(key, generation, response.get_data(), headers)
+        return response
+    return wrapper
+
+
+def track_invalidation(session, models):
+    """
+    إبطال الذاكرة المؤقتة بعد commit يضيف أو يعدل أو يحذف أحد النماذج المحددة
+    يشمل ذلك كائنات ORM وجمل insert/update/delete المباشرة (مثل upsert)
+    """
+    models = tuple(models)
+    tables = {model.__table__ for model in models}
+
+    def mark(session_instance):
+        session_instance.info['response_cache_dirty'] = True
+
+    @event.listens_for(session, 'after_flush')
+    def after_flush(session_instance, flush_context):
+        for instance in list(session_instance.new) + list(session_instance.dirty) + list(session_instance.deleted):
+            if isinstance(instance, models):
+                mark(session_instance)
+                return
+
+    @event.listens_for(session, 'do_orm_execute')
+    def do_orm_execute(state):
+        if state.is_insert or state.is_update or state.is_delete:
+            table = getattr(state.statement, 'table', None)
+            entity = state.bind_mapper.local_table if state.bind_mapper is not None else None
+            if table in tables or entity in tables:
+                mark(state.session)
+
+    @event.listens_for(session, 'after_commit')
+    def after_commit(session_instance):
+        if session_instance.info.pop('response_cache_dirty', False):
+            response_cache.invalidate()
+
+    @event.listens_for(session, 'after_rollback')
+    def after_rollback(session_instance):
+        session_instance.info.pop('response_cache_dirty', None)
+
+
+response_cache = ResponseCache(
+    os.environ.get('RESPONSE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'aplus_response_cache')),
+    maxsize=int(os.environ.get('RESPONSE_CACHE_SIZE', 512)),
+    shared=os.environ.get('RESPONSE_CACHE_SHARED') == '1'
+)
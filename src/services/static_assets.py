@@ -0,0 +1,167 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from src.services.image_variants import IMAGE_EXTENSIONS, ImageVariant, image_cache, plan_variants
+
+# صفحات HTML التي تخدم كواجهات التطبيق (المسار -> الملف)
+HTML_SHELLS = {'': 'index.html', 'writer': 'writer.html'}
+
+# أنواع المحتوى التي يستفيد ضغطها - الصور بصيغ JPEG/WebP مضغوطة مسبقاً
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml',
+                      'image/x-icon', 'image/vnd.microsoft.icon')
+
+# لا يحتفظ بنسخة gzip إلا إذا وفرت هذه النسبة على الأقل من الحجم
+MIN_GZIP_SAVING = 0.1
+
+# مدة التخزين المؤقت للملفات ذات الأسماء غير المبصومة (مثل favicon.ico)
+PLAIN_MAX_AGE = 3600
+
+# الملفات ذات الأسماء المبصومة لا تتغير أبداً
+IMMUTABLE_MAX_AGE = 31536000
+
+
+_IMG_RE = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+_ATTRIBUTE_RE = re.compile(r'([a-zA-Z-]+)="([^"]*)"')
+
+
+class Asset:
+    """ملف ثابت محمل في الذاكرة مع نسخته المضغوطة"""
+
+    __slots__ = ('body', 'gzip_body', 'mimetype', 'etag', 'immutable')
+
+    def __init__(self, body: bytes, mimetype: str, immutable: bool = False):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.immutable = immutable
+        self.gzip_body = None
+        if mimetype.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) <= len(body) * (1 - MIN_GZIP_SAVING):
+                self.gzip_body = compressed
+
+
+def fingerprint(name: str, body: bytes) -> str:
+    """إضافة بصمة المحتوى إلى اسم الملف: profilex.jpg -> profilex.3f2a9c1b.jpg"""
+    root, ext = os.path.splitext(name)
+    return f'{root}.{hashlib.sha256(body).hexdigest()[:8]}{ext}'
+
+
+class AssetManifest:
+    """
+    بناء الملفات الثابتة مرة واحدة عند التشغيل: أسماء مبصومة ونسخ gzip وجدول في الذاكرة
+    يتم الرد على الطلبات من الجدول مباشرة دون الوصول إلى نظام الملفات
+    نسخ الصور تعرف أسماؤها عند البناء لكنها ترمز عند أول طلب لكل نسخة
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.assets: Dict[str, Asset] = {}
+        self.fingerprints: Dict[str, str] = {}
+        self.variants: Dict[str, List[ImageVariant]] = {}
+        # اسم النسخة -> (محتوى الصورة الأصلية، النسخة) للنسخ التي لم ترمز بعد
+        self._pending_variants: Dict[str, Tuple[bytes, ImageVariant]] = {}
+        self._variants_lock = threading.Lock()
+        self.build()
+
+    def build(self) -> None:
+        assets = {}
+        fingerprints = {}
+        variants = {}
+        pending_variants = {}
+        shells = set(HTML_SHELLS.values())
+        files = {}
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                rel_path = os.path.relpath(path, self.directory).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    files[rel_path] = f.read()
+
+        for rel_path, body in files.items():
+            if rel_path in shells:
+                continue
+            mimetype = mimetypes.guess_type(rel_path)[0] or 'application/octet-stream'
+            hashed = fingerprint(rel_path, body)
+            fingerprints[rel_path] = hashed
+            assets[rel_path] = Asset(body, mimetype)
+            assets[hashed] = Asset(body, mimetype, immutable=True)
+            if rel_path.lower().endswith(IMAGE_EXTENSIONS):
+                variants[rel_path] = plan_variants(body)
+                for variant in variants[rel_path]:
+                    pending_variants[self._variant_name(hashed, variant)] = (body, variant)
+
+        self.fingerprints = fingerprints
+        self.variants = variants
+        self._pending_variants = pending_variants
+
+        # إعادة كتابة المراجع في صفحات HTML لتشير إلى الأسماء المبصومة ونسخ الصور
+        for route, name in HTML_SHELLS.items():
+            if name in files:
+                html = self._rewrite_images(files[name].decode('utf-8'))
+                html = self._rewrite_references(html, fingerprints)
+                assets[name] = assets[route] = Asset(html.encode('utf-8'), 'text/html; charset=utf-8')
+
+        self.assets = assets
+
+    @staticmethod
+    def _variant_name(hashed: str, variant: ImageVariant) -> str:
+        root, _ = os.path.splitext(hashed)
+        return f'{root}-{variant.width}w.{variant.extension}'
+
+    def _srcset(self, name: str, extension: str) -> str:
+        hashed = self.fingerprints[name]
+        return ', '.join(
+            f'{self._variant_name(hashed, variant)} {variant.width}w'
+            for variant in self.variants[name] if variant.extension == extension
+        )
+
+    def _rewrite_images(self, html: str) -> str:
+        """
+        تحويل وسوم <img> التي تحمل السمة sizes إلى <picture> بنسخ WebP و JPEG
+        فيختار المتصفح أصغر نسخة مناسبة لعرض الصورة على الشاشة
+        """
+        def replace(match):
+            tag = match.group(0)
+            attributes = dict(_ATTRIBUTE_RE.findall(tag))
+            name = attributes.get('src', '').lstrip('/')
+            if 'sizes' not in attributes or 'srcset' in attributes or name not in self.variants:
+                return tag
+            sizes = attributes['sizes']
+            img = tag.replace(f'sizes="{sizes}"', f'srcset="{self._srcset(name, "jpg")}" sizes="{sizes}"', 1)
+            return (f'<picture><source type="image/webp" srcset="{self._srcset(name, "webp")}" sizes="{sizes}">'
+                    f'{img}</picture>')
+        return _IMG_RE.sub(replace, html)
+
+    @staticmethod
+    def _rewrite_references(html: str, fingerprints: Dict[str, str]) -> str:
+        if not fingerprints:
+            return html
+        names = '|'.join(re.escape(name) for name in sorted(fingerprints, key=len, reverse=True))
+        pattern = re.compile(rf'(\b(?:src|href|srcset)=["\']/?)({names})(?=["\'\s,])')
+        return pattern.sub(lambda match: match.group(1) + fingerprints[match.group(2)], html)
+
+    def lookup(self, path: str) -> Optional[Asset]:
+        """الملف المطابق للمسار، أو صفحة index.html للمسارات غير المعروفة"""
+        asset = self.assets.get(path)
+        if asset is None and path in self._pending_variants:
+            asset = self._build_variant(path)
+        if asset is None:
+            asset = self.assets.get('')
+        return asset
+
+    def _build_variant(self, name: str) -> Asset:
+        """ترميز نسخة الصورة عند أول طلب لها (أو قراءتها من القرص) ثم إضافتها للجدول"""
+        with self._variants_lock:
+            asset = self.assets.get(name)
+            if asset is None:
+                body, variant = self._pending_variants[name]
+                asset = Asset(image_cache.get_variant(body, variant), variant.mimetype, immutable=True)
+                self.assets[name] = asset
+            return asset
+
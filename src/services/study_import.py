@@ -0,0 +1,132 @@
+import json
+import os
+import random
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from sqlalchemy.exc import IntegrityError
+
+from src.models.study import Study, db
+
+# عدد الدراسات في كل عملية إدراج (IMPORT_BATCH_SIZE)
+DEFAULT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+
+# الحد الأقصى لأخطاء الأسطر في التقرير - الباقي يحسب فقط
+MAX_REPORTED_ERRORS = 1000
+
+# حقول الإعداد (بصيغة الواجهة) وأعمدة جدول الدراسات المقابلة لها
+SETUP_COLUMNS = {
+    'studyType': 'study_type',
+    'fieldOfStudy': 'field_of_study',
+    'mainTopic': 'main_topic',
+    'problemDescription': 'problem_description',
+    'keywords': 'keywords'
+}
+
+# أعمدة إلزامية في الجدول غير مشمولة بالتحقق من بيانات الإعداد
+_REQUIRED_COLUMNS = ('fieldOfStudy',)
+
+
+class ImportReport:
+    """نتيجة الاستيراد: عدد الدراسات المضافة وأخطاء الأسطر مع أرقامها"""
+
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def add_error(self, line_number: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'error': error})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def _parse_line(line: Union[bytes, str], missing_setup_fields: Callable[[Dict], List[str]]) -> Dict[str, Any]:
+    """تحويل سطر JSON إلى صف في جدول الدراسات - تطلق ValueError عند بيانات غير صالحة"""
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        raise ValueError(f'Invalid JSON: {e}')
+    if not isinstance(record, dict):
+        raise ValueError('Each line must be a JSON object')
+    # كل سطر ينشئ دراسة جديدة بمعرف جديد - سطر يحمل id (مثلاً من ملف مصدر أو مكرر) يرفض
+    # بدلاً من تجاهل المعرف وإنشاء نسخة مكررة من نفس الدراسة بصمت
+    if record.get('id') is not None:
+        raise ValueError('id is assigned on import and must not be set')
+
+    # نفس قواعد التحقق من بيانات الإعداد في المعالج (_validate_setup_data)
+    missing = missing_setup_fields(record)
+    missing += [field for field in _REQUIRED_COLUMNS if not record.get(field) and field not in missing]
+    if missing:
+        raise ValueError(f"Missing setup fields: {', '.join(missing)}")
+
+    row = {}
+    for field, column in SETUP_COLUMNS.items():
+        value = record.get(field)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f'{field} must be a string')
+        row[column] = value
+    return row
+
+
+def _insert_chunk(rows: List[Dict[str, Any]], line_numbers: List[int], report: ImportReport) -> None:
+    """إدراج مجموعة صفوف بجملة واحدة، ثم صفاً صفاً إذا فشلت لتحديد الأسطر المسببة"""
+    rng = random.SystemRandom()
+    for row in rows:
+        row['seed'] = rng.getrandbits(31)
+    try:
+        db.session.execute(Study.__table__.insert(), rows)
+        db.session.commit()
+        report.imported += len(rows)
+        return
+    except IntegrityError:
+        db.session.rollback()
+
+    for row, line_number in zip(rows, line_numbers):
+        try:
+            db.session.execute(Study.__table__.insert(), [row])
+            db.session.commit()
+            report.imported += 1
+        except IntegrityError as e:
+            db.session.rollback()
+            report.add_error(line_number, str(e.orig))
+
+
+def import_studies(lines: Iterable[Union[bytes, str]], missing_setup_fields: Callable[[Dict], List[str]],
+                   batch_size: Optional[int] = None) -> ImportReport:
+    """
+    استيراد دراسات من أسطر JSONL (كائن JSON لكل سطر بنفس حقول إعداد المعالج)
+    يقرأ سطراً سطراً ويدرج كل batch_size دراسة بجملة insert واحدة ثم commit،
+    فيبقى استهلاك الذاكرة ثابتاً مهما كان حجم الملف
+    الأسطر غير الصالحة (ومنها الأسطر التي تحدد id) تتخطى وتسجل أرقامها في التقرير
+    """
+    batch_size = max(1, batch_size or DEFAULT_BATCH_SIZE)
+    report = ImportReport()
+    rows: List[Dict[str, Any]] = []
+    line_numbers: List[int] = []
+
+    for line_number, line in enumerate(lines, start=1):
+        if line_number == 1:
+            line = line.removeprefix(b'\xef\xbb\xbf' if isinstance(line, bytes) else '\ufeff')
+        if not line.strip():
+            continue
+        try:
+            rows.append(_parse_line(line, missing_setup_fields))
+            line_numbers.append(line_number)
+        except ValueError as e:
+            report.add_error(line_number, str(e))
+            continue
+        if len(rows) >= batch_size:
+            _insert_chunk(rows, line_numbers, report)
+            rows, line_numbers = [], []
+
+    if rows:
+        _insert_chunk(rows, line_numbers, report)
+    return report
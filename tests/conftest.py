@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# يجب تحديد المسارات قبل استيراد التطبيق (تقرأ عند تحميل الوحدات)
+_TMP_DIR = tempfile.mkdtemp(prefix='aplus_tests_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}"
+os.environ['PDF_CACHE_DIR'] = os.path.join(_TMP_DIR, 'pdf')
+os.environ['RESPONSE_CACHE_DIR'] = os.path.join(_TMP_DIR, 'responses')
+os.environ['IMAGE_CACHE_DIR'] = os.path.join(_TMP_DIR, 'images')
+os.environ['PROFILE_DIR'] = os.path.join(_TMP_DIR, 'profiles')
+os.environ['ADMIN_TOKEN'] = 'test-admin-token'
+os.environ.pop('METRICS_DIR', None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.main import app as flask_app, init_schema  # noqa: E402
+
+SETUP_DATA = {
+    'studyType': 'master',
+    'fieldOfStudy': 'education',
+    'mainTopic': 'أثر التعلم الإلكتروني على التحصيل الدراسي',
+    'problemDescription': 'ضعف التحصيل الدراسي لدى طلاب المرحلة الثانوية'
+}
+
+
+@pytest.fixture(scope='session')
+def app():
+    init_schema()
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def study_id(client):
+    """دراسة جديدة لكل اختبار"""
+    response = client.post('/api/generate', json={'section': 'setup', 'data': dict(SETUP_DATA)})
+    assert response.status_code == 200
+    return response.get_json()['study_id']
@@ -0,0 +1,55 @@
+import io
+import zipfile
+
+import pytest
+
+
+@pytest.mark.parametrize('sections', ['introduction', ['introduction', 3], ['bogus'], {'introduction': True}])
+def test_invalid_sections_rejected_before_streaming(client, study_id, sections):
+    response = client.post('/api/export/bulk', json={'study_ids': [study_id], 'sections': sections})
+    assert response.status_code == 400
+    assert response.mimetype == 'application/json'
+    assert response.get_json()['error'].startswith('sections must be a list of:')
+
+
+@pytest.mark.parametrize('study_ids', ['1', [1, 'a'], {'id': 1}])
+def test_invalid_study_ids_rejected(client, study_ids):
+    response = client.post('/api/export/bulk', json={'study_ids': study_ids})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'study_ids must be a list of integers'
+
+
+def test_empty_selection_rejected(client):
+    response = client.post('/api/export/bulk', json={'study_ids': []})
+    assert response.status_code == 400
+    response = client.post('/api/export/bulk', json={'filter': {'study_type': 'no-such-type'}})
+    assert response.status_code == 400
+
+
+def test_bulk_export_streams_zip(client, study_id, monkeypatch):
+    from src.services import bulk_export
+
+    # تجاوز مجمع العمليات: العرض الحقيقي يختبر في ReportLab نفسه
+    monkeypatch.setattr(bulk_export, 'render_study_pdf', lambda study, sections: b'%PDF-1.4 test')
+    monkeypatch.setattr(bulk_export.export_jobs, 'get_executor', lambda: _InlineExecutor())
+    response = client.post('/api/export/bulk', json={'study_ids': [study_id, study_id], 'sections': ['introduction']})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        names = archive.namelist()
+        assert len(names) == 1
+        assert archive.read(names[0]) == b'%PDF-1.4 test'
+
+
+class _InlineExecutor:
+    """منفذ متزامن داخل نفس العملية للاختبارات"""
+
+    def submit(self, function, *args):
+        from concurrent.futures import Future
+
+        future = Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
@@ -0,0 +1,104 @@
+import pytest
+
+from src.models import study as study_module
+from src.models.study import CONFLICT_RETRIES, ConcurrentUpdateError, StudySection, db, retry_on_conflict
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(study_module.time, 'sleep', lambda seconds: None)
+
+
+@pytest.fixture
+def always_conflicting(monkeypatch):
+    """كل كتابة للقسم تتعارض مع طلب آخر - يعيد عدد المحاولات"""
+    attempts = []
+
+    def upsert(cls, study_id, section, content, section_input=None):
+        attempts.append(section)
+        raise ConcurrentUpdateError(f'Section {section} of study {study_id} was modified concurrently')
+
+    monkeypatch.setattr(StudySection, 'upsert', classmethod(upsert))
+    return attempts
+
+
+def test_generate_returns_409_after_retries(client, study_id, always_conflicting):
+    response = client.post('/api/generate', json={'section': 'introduction', 'data': {'study_id': study_id}})
+    assert response.status_code == 409
+    body = response.get_json()
+    assert body['success'] is False
+    assert 'Concurrent update conflict' in body['error']
+    assert len(always_conflicting) == CONFLICT_RETRIES
+
+
+def test_batch_returns_409_after_retries(client, study_id, always_conflicting):
+    response = client.post('/api/generate/batch', json={
+        'sections': ['introduction', 'literature'], 'data': {'study_id': study_id}
+    })
+    assert response.status_code == 409
+    assert len(always_conflicting) == CONFLICT_RETRIES
+
+
+def test_stream_reports_conflict_event(client, study_id, always_conflicting):
+    response = client.post('/api/generate/stream', json={'section': 'introduction', 'data': {'study_id': study_id}})
+    body = response.get_data(as_text=True)
+    assert 'event: conflict' in body
+    assert '"status": 409' in body
+    assert 'event: done' not in body
+
+
+def test_conflict_is_retried(client, study_id, app_context, monkeypatch):
+    original = StudySection.upsert
+    calls = []
+
+    def flaky(study_id, section, content, *args):
+        calls.append(section)
+        if len(calls) == 1:
+            raise ConcurrentUpdateError('conflict')
+        return original(study_id, section, content, *args)
+
+    revision = retry_on_conflict(lambda: flaky(study_id, 'results', '<p>أ</p>'))
+    assert revision == 1
+    assert len(calls) == 2
+    assert db.session.get(StudySection, (study_id, 'results')).content == '<p>أ</p>'
+
+
+def test_stale_revision_is_rejected(client, study_id, app_context, monkeypatch):
+    StudySection.upsert(study_id, 'results', '<p>1</p>')
+    db.session.commit()
+
+    # طلب آخر يكتب القسم بعد قراءة المراجعة وقبل الكتابة المشروطة
+    query = db.session.query
+
+    def racing_query(*entities, **kwargs):
+        result = query(*entities, **kwargs)
+        if entities == (StudySection.content_zlib, StudySection.revision):
+            row = result.filter_by(study_id=study_id, section='results').first()
+            db.session.execute(db.update(StudySection).where(
+                StudySection.study_id == study_id, StudySection.section == 'results'
+            ).values(revision=StudySection.revision + 1))
+            return _Fixed(row)
+        return result
+
+    monkeypatch.setattr(db.session, 'query', racing_query)
+    with pytest.raises(ConcurrentUpdateError):
+        StudySection.upsert(study_id, 'results', '<p>2</p>')
+    db.session.rollback()
+
+
+def test_batch_unknown_study_is_404(client):
+    response = client.post('/api/generate/batch', json={'sections': ['introduction'], 'data': {'study_id': 999999}})
+    assert response.status_code == 404
+
+
+class _Fixed:
+    """نتيجة استعلام ثابتة (القراءة التي سبقت الكتابة المتزامنة)"""
+
+    def __init__(self, row):
+        self.row = row
+
+    def filter_by(self, **kwargs):
+        return self
+
+    def first(self):
+        return self.row
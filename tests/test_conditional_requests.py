@@ -0,0 +1,80 @@
+import gzip
+import json
+from datetime import datetime
+
+from src.models.study import Study, StudySection, db
+
+
+def _generate(client, study_id, section='introduction'):
+    response = client.post('/api/generate', json={'section': section, 'data': {'study_id': study_id}})
+    assert response.status_code == 200
+
+
+def test_study_etag_and_not_modified(client, study_id):
+    response = client.get(f'/api/study/{study_id}')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    response = client.get(f'/api/study/{study_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert response.data == b''
+
+
+def test_compressed_etag_matches_same_revision(client, study_id):
+    _generate(client, study_id)
+    response = client.get(f'/api/study/{study_id}', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'].endswith('-gzip"')
+    assert json.loads(gzip.decompress(response.data))['study']['id'] == study_id
+
+    # نسخة مضغوطة أو غير مضغوطة من نفس المحتوى تبقى صالحة
+    plain_etag = client.get(f'/api/study/{study_id}').headers['ETag']
+    for etag in (response.headers['ETag'], plain_etag):
+        cached = client.get(f'/api/study/{study_id}', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert cached.status_code == 304
+
+
+def test_section_etag_changes_after_write(client, study_id):
+    _generate(client, study_id)
+    response = client.get(f'/api/study/{study_id}/sections/introduction')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert client.get(f'/api/study/{study_id}/sections/introduction',
+                      headers={'If-None-Match': etag}).status_code == 304
+
+    _generate(client, study_id)
+    response = client.get(f'/api/study/{study_id}/sections/introduction', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_if_modified_since_ignored_for_sub_second_timestamps(client, study_id, app_context):
+    # تعديلان في نفس الثانية لا يميزهما Last-Modified - يجب الاعتماد على ETag
+    db.session.execute(db.update(Study).where(Study.id == study_id).values(
+        updated_at=datetime(2024, 1, 1, 12, 0, 0, 500000)
+    ))
+    db.session.commit()
+    response = client.get(f'/api/study/{study_id}',
+                          headers={'If-Modified-Since': 'Mon, 01 Jan 2024 12:00:00 GMT'})
+    assert response.status_code == 200
+
+
+def test_if_modified_since_whole_seconds(client, study_id, app_context):
+    db.session.execute(db.update(Study).where(Study.id == study_id).values(
+        updated_at=datetime(2024, 1, 1, 12, 0, 0)
+    ))
+    db.session.commit()
+    response = client.get(f'/api/study/{study_id}',
+                          headers={'If-Modified-Since': 'Mon, 01 Jan 2024 12:00:00 GMT'})
+    assert response.status_code == 304
+    response = client.get(f'/api/study/{study_id}',
+                          headers={'If-Modified-Since': 'Mon, 01 Jan 2024 11:59:59 GMT'})
+    assert response.status_code == 200
+
+
+def test_missing_section_is_not_cached_as_success(client, study_id, app_context):
+    assert client.get(f'/api/study/{study_id}/sections/results').status_code == 404
+    StudySection.upsert(study_id, 'results', '<p>النتائج</p>')
+    db.session.commit()
+    assert client.get(f'/api/study/{study_id}/sections/results').status_code == 200
@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip('reportlab')
+
+from src.services.pdf_exporter import html_to_flowables  # noqa: E402
+
+
+def _texts(content):
+    return [flowable.text for flowable in html_to_flowables(content)]
+
+
+def test_literal_less_than_is_kept():
+    assert _texts('<p>p < 0.05</p>') == ['p &lt; 0.05']
+
+
+def test_less_than_before_closing_tag():
+    # "<" قبل وسم الإغلاق مباشرة لا يجب أن يبتلع الوسم
+    assert _texts('<p>x<y</p><p>التالي</p>') == ['x&lt;y', 'التالي']
+
+
+def test_less_than_at_end_and_between_tags():
+    assert _texts('<p>a <</p>') == ['a &lt;']
+    assert _texts('<p><strong>1 <</strong> 2</p>') == ['<b>1 &lt;</b> 2']
+
+
+def test_blocks_and_inline_tags():
+    texts = _texts('<h3>عنوان</h3><p>نص <em>مائل</em></p><ul><li>أ</li><li>ب</li></ul>')
+    assert texts == ['عنوان', 'نص <i>مائل</i>', 'أ', 'ب']
+
+
+def test_entities_are_not_double_escaped():
+    assert _texts('<p>A &amp; B &lt; C</p>') == ['A &amp; B &lt; C']
@@ -0,0 +1,43 @@
+from src.models.study import StudySection, StudySectionRevision, db
+
+REVISIONS = 25
+
+
+def _content(index):
+    return f'<p>المراجعة رقم {index}</p>' + '<p>فقرة ثابتة تتكرر في كل مراجعة.</p>' * 20
+
+
+def test_delta_revisions_round_trip_across_keyframes(client, study_id, app_context):
+    for index in range(1, REVISIONS + 1):
+        assert StudySection.upsert(study_id, 'results', _content(index)) == index
+        db.session.commit()
+
+    rows = {row.revision: row for row in StudySectionRevision.list_for(study_id, 'results')}
+    assert sorted(rows) == list(range(1, REVISIONS + 1))
+    interval = StudySectionRevision.KEYFRAME_INTERVAL
+    for revision, row in rows.items():
+        assert row.is_delta == (revision % interval != 1)
+    # الفرق أصغر بكثير من المراجعة الكاملة
+    assert len(rows[2].data) < len(rows[1].data)
+
+    for index in range(1, REVISIONS + 1):
+        assert StudySectionRevision.get_content(study_id, 'results', index) == _content(index)
+    assert StudySectionRevision.get_content(study_id, 'results', REVISIONS + 1) is None
+
+
+def test_revision_api_and_restore(client, study_id, app_context):
+    for index in range(1, 13):
+        StudySection.upsert(study_id, 'results', _content(index))
+        db.session.commit()
+
+    response = client.get(f'/api/study/{study_id}/sections/results/revisions/11')
+    assert response.status_code == 200
+    assert response.get_json()['content'] == _content(11)
+
+    response = client.post(f'/api/study/{study_id}/sections/results/revisions/3/restore')
+    assert response.status_code == 200
+    assert response.get_json()['revision'] == 13
+    assert StudySectionRevision.get_content(study_id, 'results', 13) == _content(3)
+
+    response = client.get(f'/api/study/{study_id}/sections/results/revisions/99')
+    assert response.status_code == 404
@@ -0,0 +1,61 @@
+import io
+import json
+
+from src.models.study import Study, db
+
+from conftest import SETUP_DATA
+
+
+def _jsonl(*records):
+    return '\n'.join(record if isinstance(record, str) else json.dumps(record, ensure_ascii=False)
+                     for record in records).encode('utf-8')
+
+
+def test_import_with_bom_and_line_numbers(client, app_context):
+    before = db.session.query(Study).count()
+    body = b'\xef\xbb\xbf' + _jsonl(
+        SETUP_DATA,
+        '',
+        dict(SETUP_DATA, id=7),
+        '{not json',
+        dict(SETUP_DATA, mainTopic=''),
+        dict(SETUP_DATA, keywords=['a']),
+        dict(SETUP_DATA, mainTopic='موضوع آخر'),
+    )
+    response = client.post('/api/studies/import', data=body, content_type='application/x-ndjson')
+    report = response.get_json()
+
+    assert report['imported'] == 2
+    assert report['failed'] == 4
+    assert report['success'] is False
+    errors = {error['line']: error['error'] for error in report['errors']}
+    assert set(errors) == {3, 4, 5, 6}
+    assert 'id' in errors[3]
+    assert 'Invalid JSON' in errors[4]
+    assert 'mainTopic' in errors[5]
+    assert 'keywords must be a string' in errors[6]
+    assert db.session.query(Study).count() == before + 2
+
+
+def test_import_rejects_id_instead_of_duplicating(client, app_context):
+    before = db.session.query(Study).count()
+    response = client.post('/api/studies/import', data=_jsonl(dict(SETUP_DATA, id=1)))
+    report = response.get_json()
+    assert report['imported'] == 0
+    assert report['errors'] == [{'line': 1, 'error': 'id is assigned on import and must not be set'}]
+    assert db.session.query(Study).count() == before
+
+
+def test_import_multipart_in_small_batches(client, app_context):
+    body = _jsonl(*[dict(SETUP_DATA, mainTopic=f'موضوع {index}') for index in range(5)])
+    response = client.post('/api/studies/import?batch_size=2', data={'file': (io.BytesIO(body), 'studies.jsonl')},
+                           content_type='multipart/form-data')
+    report = response.get_json()
+    assert report == {'success': True, 'imported': 5, 'failed': 0, 'errors': [], 'errors_truncated': False}
+    seeds = [seed for (seed,) in db.session.query(Study.seed).filter(Study.main_topic.like('موضوع %'))]
+    assert all(seed is not None for seed in seeds)
+
+
+def test_import_requires_file_field(client):
+    response = client.post('/api/studies/import', data={}, content_type='multipart/form-data')
+    assert response.status_code == 400